@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark des normalisations de trans.py : version ligne à ligne (apply) vs vectorisée.
+Vérifie aussi que les deux versions donnent EXACTEMENT la même sortie.
+
+Usage :
+    python bench_trans.py --n-pharma 25000 --n-communes 35000
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+
+from trans import (norm_city, zfill_cp, map_cp_to_region_tuple,
+                   norm_city_series, zfill_cp_series, map_cp_to_region_columns,
+                   match_pharmacies_to_communes)
+from catchment import population_desservie
+from src.geography import DEP_TO_REG  # vax_forecast_project sur le PYTHONPATH (cf. README)
+
+DEPS2 = [d for d in DEP_TO_REG if len(d) == 2 and d.isdigit()]
+
+VILLES = ["Saint-Étienne", "  Besançon ", "Châlons-en-Champagne", "L'Haÿ-les-Roses", "Orléans",
+          "Île-d'Arz", "Œuilly", "Paris", "Cœuvres-et-Valsery", "Évry   Courcouronnes",
+          "Ajaccio", "Nîmes", "Agen", "Straße", None]
+
+
+def make_synthetic(n_pharma: int, n_communes: int, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    deps = np.array(DEPS2 + ["97", "00"])
+    cp = pd.Series(rng.choice(deps, n_pharma)).str.cat(
+        pd.Series(rng.integers(0, 100, n_pharma) * 10).astype(str).str.zfill(3))
+    # CP "sales" : 4 chiffres, espaces, vides
+    cp = cp.where(rng.random(n_pharma) > 0.05, cp.str.lstrip("0"))
+    cp = cp.where(rng.random(n_pharma) > 0.02, "CEDEX " + cp)
+    cp = cp.where(rng.random(n_pharma) > 0.01, None)
+    villes = pd.Series(rng.choice(np.array(VILLES, dtype=object), n_pharma))
+    pharma = pd.DataFrame({"Titre": [f"Pharmacie {i}" for i in range(n_pharma)],
+                           "Adresse_codepostal": cp.astype("string"),
+                           "Adresse_ville": villes})
+    communes = pd.Series(rng.choice(np.array(VILLES, dtype=object), n_communes))
+    return pharma, communes
+
+
+def make_synthetic_matching(n_pharma: int, n_communes: int, seed: int = 7):
+    """Communes (format explode_codes_postaux) + pharmacies dont ~15% de noms de ville bruités."""
+    rng = np.random.default_rng(seed)
+    syl = np.array(["SAINT ", "MONT", "VAL", "BEAU", "VILLE", "NEUF", "CHATEAU", "BOIS", "LA ", "FONT",
+                    "AINE", "RIEUX", "COURT", "MARTIN", "SUR ", "LOIRE", "BRIE", "GNY", "AC", "ANS"])
+    parts = rng.choice(syl, size=(n_communes, 4))
+    names = pd.Series(["".join(p).strip() for p in parts]) + " " + pd.Series(np.arange(n_communes) % 97).astype(str)
+    deps = np.array(DEPS2)
+    # ~6000 CP distincts, plusieurs communes par CP
+    cp = pd.Series(rng.choice(deps, n_communes)).str.cat(
+        pd.Series(rng.integers(0, 60, n_communes) * 10).astype(str).str.zfill(3))
+    communes = pd.DataFrame({"ville_norm": names, "cp5": cp,
+                             "code_insee": pd.Series(np.arange(n_communes)).astype(str).str.zfill(5),
+                             "population": rng.integers(100, 50_000, n_communes)})
+    pick = rng.integers(0, n_communes, n_pharma)
+    ville = communes["ville_norm"].to_numpy()[pick].copy()
+    noisy = rng.random(n_pharma) < 0.15
+    ville[noisy] = [v.replace("SAINT", "ST").replace(" ", "-", 1) + (" CEDEX" if i % 3 == 0 else "")
+                    for i, v in enumerate(ville[noisy])]
+    pharma = pd.DataFrame({"pharmacie": [f"Pharmacie {i}" for i in range(n_pharma)],
+                           "cp5": communes["cp5"].to_numpy()[pick], "ville_norm": ville})
+    return pharma, communes
+
+
+def _timeit(fn, repeat=3):
+    best = float("inf")
+    out = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n-pharma", type=int, default=25_000)
+    ap.add_argument("--n-communes", type=int, default=35_000)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    pharma, communes = make_synthetic(args.n_pharma, args.n_communes)
+
+    cases = {
+        "zfill_cp": (lambda: pharma["Adresse_codepostal"].apply(zfill_cp),
+                     lambda: zfill_cp_series(pharma["Adresse_codepostal"])),
+        "norm_city (pharmacies)": (lambda: pharma["Adresse_ville"].apply(norm_city),
+                                   lambda: norm_city_series(pharma["Adresse_ville"])),
+        "norm_city (communes)": (lambda: communes.apply(norm_city),
+                                 lambda: norm_city_series(communes)),
+    }
+    cp5 = zfill_cp_series(pharma["Adresse_codepostal"])
+    cols = ["region_insee", "region_code3", "region_name"]
+    cases["cp -> région"] = (
+        lambda: cp5.apply(map_cp_to_region_tuple).apply(pd.Series).set_axis(cols, axis=1),
+        lambda: map_cp_to_region_columns(cp5),
+    )
+
+    print(f"{'étape':<26}{'apply (s)':>12}{'vectorisé (s)':>15}{'gain':>8}")
+    for name, (old, new) in cases.items():
+        t_old, r_old = _timeit(old, args.repeat)
+        t_new, r_new = _timeit(new, args.repeat)
+        if isinstance(r_old, pd.DataFrame):
+            pd.testing.assert_frame_equal(r_old.astype(object), r_new.astype(object))
+        else:
+            pd.testing.assert_series_equal(r_old.astype(object), r_new.astype(object), check_names=False)
+        print(f"{name:<26}{t_old:>12.3f}{t_new:>15.3f}{t_old / max(t_new, 1e-9):>7.1f}x")
+    print("[OK] sorties identiques")
+
+    # Appariement pharmacies -> communes (jointure stricte + index trigrammes par CP)
+    pharma_m, communes_m = make_synthetic_matching(args.n_pharma, args.n_communes)
+    t_match, matched = _timeit(lambda: match_pharmacies_to_communes(pharma_m, communes_m), args.repeat)
+    print(f"\nmatch_pharmacies_to_communes : {t_match:.3f}s")
+    print(matched.groupby("match_method", dropna=False)["match_confidence"]
+                 .agg(["size", "mean", "min"]).rename(columns={"size": "n"}))
+
+    # Zones de chalandise (BallTree haversine, k=5) sur des coordonnées France métropolitaine
+    rng = np.random.default_rng(3)
+    communes_m["latitude_centre"] = rng.uniform(42.3, 51.1, len(communes_m))
+    communes_m["longitude_centre"] = rng.uniform(-4.8, 8.2, len(communes_m))
+    pharma_m["Adresse_latitude"] = rng.uniform(42.3, 51.1, len(pharma_m))
+    pharma_m["Adresse_longitude"] = rng.uniform(-4.8, 8.2, len(pharma_m))
+    t_catch, served = _timeit(lambda: population_desservie(communes_m, pharma_m, k=5, scale_km=5.0), args.repeat)
+    pop_tot = communes_m.drop_duplicates("code_insee")["population"].sum()
+    print(f"\npopulation_desservie (k=5) : {t_catch:.3f}s | population conservée : "
+          f"{served.sum():,.0f} / {pop_tot:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+Pré-calcul de l'index pharmacies pour le front Vaccibot.
+
+Lit Vaccibot_/pharmacies.csv UNE fois (au lieu de Papa.parse + regex HTML dans le navigateur) :
+  - parse les horaires (<li>Lundi : 08h30-20h30</li> ...) en plages [h_début, m_début, h_fin, m_fin]
+  - extrait les infos de prise de RDV (accès, téléphone, site)
+  - découpe en tuiles geohash (précision 4 ≈ 39 x 20 km) triées spatialement
+
+Sorties (JSON compact) :
+  Vaccibot_/data/pharmacies/index.json      -> {precision, fields, tiles: {gh: n}, cities: {VILLE: [gh...]}}
+  Vaccibot_/data/pharmacies/tiles/<gh>.json -> [[nom, adresse, ville, lat, lon, horaires[7], rdv], ...]
+
+Le bot ne charge alors que la tuile de l'utilisateur et ses voisines.
+
+Usage :
+    python build_pharmacy_index.py [--csv ../Vaccibot_/pharmacies.csv] [--out ../Vaccibot_/data/pharmacies]
+"""
+import argparse
+import html
+import json
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from trans import norm_city_series
+
+BASE_DIR = Path(__file__).resolve().parent
+DEFAULT_CSV = BASE_DIR.parent / "Vaccibot_" / "pharmacies.csv"
+DEFAULT_OUT = BASE_DIR.parent / "Vaccibot_" / "data" / "pharmacies"
+
+# Ordre identique à DAYS_FR côté JS (Date.getDay() : 0 = dimanche)
+DAYS_FR = ["Dimanche", "Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi", "Samedi"]
+FIELDS = ["name", "address", "city", "lat", "lon", "ranges", "booking"]
+
+_LI_RE = re.compile(r"<li>\s*(Lundi|Mardi|Mercredi|Jeudi|Vendredi|Samedi|Dimanche)\s*:\s*([^<]+?)\s*</li>", re.I)
+_RANGE_RE = re.compile(r"(\d{1,2})[:h]?(\d{0,2})\s*[-–]\s*(\d{1,2})[:h]?(\d{0,2})")
+_ACCESS_RE = re.compile(r"Accès\s*:\s*</strong>\s*([^<]+)", re.I)
+_PHONE_RE = re.compile(r"Téléphone pour la prise de rendez-vous\s*:\s*</strong>\s*([^<]+)", re.I)
+_URL_RE = re.compile(r"Site internet pour la prise de rendez-vous\s*:\s*</strong>\s*<a href=\"([^\"]+)\"", re.I)
+
+_GH32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+# ==============================
+# Helpers
+# ==============================
+def parse_ranges(s: str) -> list:
+    """Même logique que parseRanges() de Vaccibot_/src/utils.js."""
+    if not s:
+        return []
+    out = []
+    for part in re.split(r"[;,/|]+", re.sub(r"h", ":", str(s), flags=re.I)):
+        part = part.strip()
+        m = _RANGE_RE.search(part)
+        if not m:
+            continue
+        sh, sm, eh, em = m.groups()
+        out.append([int(sh), int(sm or 0), int(eh), int(em or 0)])
+    return out
+
+
+def parse_opening(cell: str) -> list:
+    """Blob HTML Modalites_accueil -> 7 listes de plages (index = Date.getDay())."""
+    per_day = [[] for _ in DAYS_FR]
+    if not isinstance(cell, str):
+        return per_day
+    for day, times in _LI_RE.findall(cell):
+        times = times.replace("&nbsp;", " ").replace("&#160;", " ").strip()
+        per_day[DAYS_FR.index(day.capitalize())] = parse_ranges(times)
+    return per_day
+
+
+def parse_booking(cell: str) -> dict:
+    """Accès (avec / sans RDV), téléphone et site de prise de RDV, si présents."""
+    if not isinstance(cell, str):
+        return {}
+    out = {}
+    for key, rx in (("access", _ACCESS_RE), ("phone", _PHONE_RE), ("url", _URL_RE)):
+        m = rx.search(cell)
+        if m:
+            out[key] = html.unescape(m.group(1)).strip()
+    return out
+
+
+def geohash_encode(lat: np.ndarray, lon: np.ndarray, precision: int = 4) -> np.ndarray:
+    """Geohash vectorisé (bits entrelacés lon/lat, base32)."""
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    lat_lo, lat_hi = np.full(lat.shape, -90.0), np.full(lat.shape, 90.0)
+    lon_lo, lon_hi = np.full(lon.shape, -180.0), np.full(lon.shape, 180.0)
+    codes = np.zeros((precision, lat.size), dtype=np.int64)
+    for bit in range(precision * 5):
+        if bit % 2 == 0:
+            mid = (lon_lo + lon_hi) / 2
+            b = lon >= mid
+            lon_lo, lon_hi = np.where(b, mid, lon_lo), np.where(b, lon_hi, mid)
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            b = lat >= mid
+            lat_lo, lat_hi = np.where(b, mid, lat_lo), np.where(b, lat_hi, mid)
+        codes[bit // 5] = (codes[bit // 5] << 1) | b
+    chars = np.array(list(_GH32))[codes]  # (precision, n)
+    return np.array(["".join(c) for c in chars.T]) if lat.size else np.array([], dtype=str)
+
+
+# ==============================
+# Build
+# ==============================
+def build_index(csv_path=DEFAULT_CSV, out_dir=DEFAULT_OUT, precision: int = 4) -> dict:
+    df = pd.read_csv(csv_path, sep=";", encoding="utf-8-sig", dtype=str)
+    lat = pd.to_numeric(df["Adresse_latitude"].str.replace(",", ".", regex=False), errors="coerce")
+    lon = pd.to_numeric(df["Adresse_longitude"].str.replace(",", ".", regex=False), errors="coerce")
+    df = df.assign(lat=lat.round(6), lon=lon.round(6)).dropna(subset=["lat", "lon"]).reset_index(drop=True)
+
+    # Tuile (précision p) + clé fine (p+3) pour trier spatialement l'intérieur des tuiles
+    fine = geohash_encode(df["lat"].to_numpy(), df["lon"].to_numpy(), precision + 3)
+    df["gh"] = [g[:precision] for g in fine]
+    df["gh_fine"] = fine
+    df = df.sort_values(["gh_fine", "Titre"]).reset_index(drop=True)
+
+    accueil = df["Modalites_accueil"] if "Modalites_accueil" in df.columns else pd.Series([None] * len(df))
+    records = zip(df["Titre"].fillna("Pharmacie"), df.get("Adresse_voie 1", pd.Series([""] * len(df))).fillna(""),
+                  df["Adresse_ville"].fillna(""), df["lat"], df["lon"],
+                  accueil.map(parse_opening), accueil.map(parse_booking))
+    rows = [[n, a, c, float(la), float(lo), r, b] for n, a, c, la, lo, r, b in records]
+
+    out_dir = Path(out_dir)
+    tiles_dir = out_dir / "tiles"
+    tiles_dir.mkdir(parents=True, exist_ok=True)
+    for old in tiles_dir.glob("*.json"):
+        old.unlink()
+
+    tiles = {}
+    for gh, idx in df.groupby("gh", sort=True).indices.items():
+        payload = [rows[i] for i in idx]
+        (tiles_dir / f"{gh}.json").write_text(json.dumps(payload, ensure_ascii=False, separators=(",", ":")),
+                                              encoding="utf-8")
+        tiles[gh] = len(payload)
+
+    # Recherche par ville (state.userData.lastCity) : ville normalisée -> tuiles
+    city_norm = norm_city_series(df["Adresse_ville"])
+    cities = (pd.DataFrame({"city": city_norm, "gh": df["gh"]}).dropna()
+                .drop_duplicates().groupby("city")["gh"].agg(sorted).to_dict())
+
+    index = {"precision": precision, "fields": FIELDS, "days": DAYS_FR,
+             "tiles": tiles, "cities": cities}
+    (out_dir / "index.json").write_text(json.dumps(index, ensure_ascii=False, separators=(",", ":")),
+                                        encoding="utf-8")
+    return {"pharmacies": len(rows), "tiles": len(tiles), "cities": len(cities)}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--csv", default=str(DEFAULT_CSV))
+    ap.add_argument("--out", default=str(DEFAULT_OUT))
+    ap.add_argument("--precision", type=int, default=4)
+    args = ap.parse_args()
+    stats = build_index(args.csv, args.out, args.precision)
+    print(f"[OK] {stats['pharmacies']} pharmacies -> {stats['tiles']} tuiles, {stats['cities']} villes ({args.out})")
+
+
+if __name__ == "__main__":
+    main()
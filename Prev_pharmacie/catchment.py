@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Zones de chalandise géographiques : chaque commune répartit sa population sur ses k pharmacies
+les plus proches (BallTree haversine), avec une décroissance exponentielle de la distance.
+Remplace la part égale "par commune" de trans.compute_stock_par_commune quand les coordonnées
+(Adresse_latitude/Adresse_longitude, latitude_centre/longitude_centre) sont disponibles.
+"""
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import BallTree
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def _coords(df: pd.DataFrame, lat_col: str, lon_col: str) -> np.ndarray:
+    lat = pd.to_numeric(df[lat_col].astype(str).str.replace(",", ".", regex=False), errors="coerce")
+    lon = pd.to_numeric(df[lon_col].astype(str).str.replace(",", ".", regex=False), errors="coerce")
+    return np.column_stack([lat.to_numpy(dtype=float), lon.to_numpy(dtype=float)])
+
+
+def build_pharmacy_tree(df_pharma: pd.DataFrame,
+                        lat_col: str = "Adresse_latitude",
+                        lon_col: str = "Adresse_longitude"):
+    """
+    BallTree (métrique haversine, radians) sur les pharmacies géolocalisées.
+    Retourne (tree, positions) où positions = index positionnels des pharmacies dans df_pharma.
+    """
+    xy = _coords(df_pharma, lat_col, lon_col)
+    ok = np.isfinite(xy).all(axis=1)
+    positions = np.flatnonzero(ok)
+    if not len(positions):
+        raise ValueError("Aucune pharmacie géolocalisée (latitude/longitude manquantes).")
+    return BallTree(np.radians(xy[ok]), metric="haversine"), positions
+
+
+def catchment_weights(df_communes: pd.DataFrame, df_pharma: pd.DataFrame,
+                      k: int = 5, scale_km: float = 5.0,
+                      commune_key: str = "code_insee",
+                      lat_col: str = "latitude_centre", lon_col: str = "longitude_centre",
+                      pharma_lat_col: str = "Adresse_latitude",
+                      pharma_lon_col: str = "Adresse_longitude") -> pd.DataFrame:
+    """
+    Table longue commune -> pharmacie : [commune_key, pharma_pos, distance_km, weight].
+    - pharma_pos : position (iloc) de la pharmacie dans df_pharma
+    - weight = exp(-d/scale_km), normalisé à 1 par commune (la population est conservée)
+    """
+    tree, positions = build_pharmacy_tree(df_pharma, pharma_lat_col, pharma_lon_col)
+    communes = df_communes.dropna(subset=[commune_key]).drop_duplicates(subset=[commune_key])
+    xy = _coords(communes, lat_col, lon_col)
+    ok = np.isfinite(xy).all(axis=1)
+    communes, xy = communes[ok], xy[ok]
+    k = int(min(k, len(positions)))
+
+    dist, idx = tree.query(np.radians(xy), k=k)  # (n_communes, k), triés par distance
+    dist_km = dist * EARTH_RADIUS_KM
+    w = np.exp(-dist_km / float(scale_km))
+    w_sum = w.sum(axis=1, keepdims=True)
+    # Commune très éloignée de tout (exp -> 0) : part égale entre ses k voisines
+    w = np.where(w_sum > 0, w / np.where(w_sum > 0, w_sum, 1.0), 1.0 / k)
+
+    return pd.DataFrame({
+        commune_key: np.repeat(communes[commune_key].to_numpy(), k),
+        "pharma_pos": positions[idx.ravel()],
+        "distance_km": dist_km.ravel(),
+        "weight": w.ravel(),
+    })
+
+
+def population_desservie(df_communes: pd.DataFrame, df_pharma: pd.DataFrame,
+                         weights: pd.DataFrame | None = None,
+                         commune_key: str = "code_insee", **kw) -> pd.Series:
+    """
+    Population attribuée à chaque pharmacie (Series alignée sur df_pharma.index).
+    Si df_pharma porte la commune de chaque pharmacie (colonne commune_key), la population de chaque commune
+    est d'abord partagée :
+    - pharmacie non géolocalisée : part égale de sa commune (population / nb de pharmacies de la commune) ;
+    - commune sans coordonnées : toute sa population à ses pharmacies, à parts égales ;
+    - le reste (part des pharmacies géolocalisées de la commune, toute la population si elle n'a pas de
+      pharmacie) est réparti sur les k pharmacies géolocalisées les plus proches (poids de catchment_weights).
+    La somme est la population totale, hors communes sans coordonnées ni pharmacie (attribuées à personne).
+    Sans colonne commune_key : répartition géographique seule, 0 pour les pharmacies non géolocalisées.
+    """
+    if weights is None:
+        weights = catchment_weights(df_communes, df_pharma, commune_key=commune_key, **kw)
+    pop = (df_communes.dropna(subset=[commune_key]).drop_duplicates(subset=[commune_key])
+                      .set_index(commune_key)["population"])
+    pop = pd.to_numeric(pop, errors="coerce").fillna(0.0)
+    located = np.isfinite(_coords(df_pharma,
+                                  kw.get("pharma_lat_col", "Adresse_latitude"),
+                                  kw.get("pharma_lon_col", "Adresse_longitude"))).all(axis=1)
+    out = np.zeros(len(df_pharma))
+    remainder = pop.copy()  # population de chaque commune passée par les zones de chalandise
+
+    if commune_key in df_pharma.columns:
+        commune = df_pharma[commune_key].to_numpy()
+        geo_communes = set(weights[commune_key].unique())
+        n = pd.Series(commune).value_counts()
+        n_equal = pd.Series(commune[~located]).value_counts()
+        no_coords = n.index[~n.index.isin(list(geo_communes))]
+        n_equal = n_equal.reindex(n.index, fill_value=0)
+        n_equal[no_coords] = n[no_coords]
+
+        part = (pop.reindex(n.index).fillna(0.0) / n).reindex(commune).to_numpy()
+        equal = ~located | pd.Series(commune).isin(no_coords).to_numpy()
+        out[equal] = np.nan_to_num(part[equal])
+        given = (pop.reindex(n.index).fillna(0.0) * n_equal / n)
+        remainder = remainder.sub(given.reindex(remainder.index).fillna(0.0))
+
+    served = weights[commune_key].map(remainder).to_numpy(dtype=float) * weights["weight"].to_numpy()
+    out += np.bincount(weights["pharma_pos"].to_numpy(), weights=served, minlength=len(df_pharma))
+    return pd.Series(out, index=df_pharma.index, name="population_desservie")
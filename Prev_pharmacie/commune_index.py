@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Index trigrammes des noms de communes, partitionné par code postal.
+Sert de repli à la jointure stricte (cp5, ville_norm) de trans.match_pharmacies_to_communes :
+pour une pharmacie non appariée, on ne compare son nom de ville qu'aux communes de son CP
+(ou de son département si le CP est inconnu), via des listes inversées trigramme -> communes.
+Le coût par requête dépend du nombre de communes partageant un trigramme dans la partition,
+pas du nombre total de communes.
+"""
+import re
+from collections import defaultdict
+import numpy as np
+import pandas as pd
+
+# Abréviations fréquentes dans les adresses de pharmacies
+_ABBREV = [(re.compile(r"\bSTE\b"), "SAINTE"), (re.compile(r"\bST\b"), "SAINT")]
+_CEDEX = re.compile(r"\bCEDEX\b.*$")
+_NON_ALNUM = re.compile(r"[^A-Z0-9]+")
+
+
+def clean_for_match(ville_norm: str) -> str:
+    """Nom normalisé (cf. trans.norm_city) -> forme de comparaison (sans CEDEX, ponctuation, abréviations)."""
+    if not isinstance(ville_norm, str):
+        return ""
+    s = _CEDEX.sub("", ville_norm)
+    s = _NON_ALNUM.sub(" ", s)
+    for pat, rep in _ABBREV:
+        s = pat.sub(rep, s)
+    return " ".join(s.split())
+
+
+def trigrams(s: str) -> frozenset:
+    """Trigrammes du nom, avec bordures (' PARIS ' -> ' PA', 'PAR', ...)."""
+    s = f" {s} "
+    return frozenset(s[i:i + 3] for i in range(len(s) - 2))
+
+
+class _Partition:
+    __slots__ = ("rows", "grams", "postings")
+
+    def __init__(self):
+        self.rows = []       # positions dans la table des communes
+        self.grams = []      # nb de trigrammes par commune
+        self.postings = defaultdict(list)  # trigramme -> ids locaux
+
+    def add(self, row, grams):
+        local = len(self.rows)
+        self.rows.append(row)
+        self.grams.append(len(grams))
+        for g in grams:
+            self.postings[g].append(local)
+
+    def best(self, grams):
+        """(position commune, score Dice) du meilleur candidat, ou (None, 0.0)."""
+        if not grams:
+            return None, 0.0
+        shared = defaultdict(int)
+        for g in grams:
+            for local in self.postings.get(g, ()):
+                shared[local] += 1
+        if not shared:
+            return None, 0.0
+        n = len(grams)
+        local, score = max(((loc, 2.0 * k / (n + self.grams[loc])) for loc, k in shared.items()),
+                           key=lambda t: t[1])
+        return self.rows[local], score
+
+
+class CommuneIndex:
+    """
+    Partitions trigrammes par CP et par département, construites à la demande :
+    seules les partitions touchées par des pharmacies non appariées sont indexées.
+    """
+
+    def __init__(self, df_communes_cp: pd.DataFrame):
+        self.table = df_communes_cp.reset_index(drop=True)
+        cp = self.table["cp5"].astype(str)
+        self._rows = {"cp": cp.groupby(cp).indices, "dep": cp.groupby(cp.str[:2]).indices}
+        self._parts = {"cp": {}, "dep": {}}
+        self._grams = {}
+        self._names = self.table["ville_norm"].to_numpy()
+
+    def _name_grams(self, row):
+        ville = self._names[row]
+        grams = self._grams.get(ville)
+        if grams is None:
+            grams = self._grams[ville] = trigrams(clean_for_match(ville))
+        return grams
+
+    def partition(self, level: str, key):
+        parts = self._parts[level]
+        part = parts.get(key)
+        if part is None:
+            rows = self._rows[level].get(key)
+            if rows is None:
+                return None
+            part = parts[key] = _Partition()
+            for row in rows:
+                part.add(int(row), self._name_grams(row))
+        return part
+
+
+def build_commune_index(df_communes_cp: pd.DataFrame) -> CommuneIndex:
+    """Index sur la sortie de trans.explode_codes_postaux (colonnes cp5, ville_norm, ...)."""
+    return CommuneIndex(df_communes_cp)
+
+
+def fuzzy_lookup(index: CommuneIndex, cp5: pd.Series, ville_norm: pd.Series, min_score: float = 0.5) -> pd.DataFrame:
+    """
+    Pour chaque (cp5, ville_norm), meilleure commune par similarité trigramme :
+    d'abord parmi les communes du CP, puis parmi celles du département si le CP est inconnu ou si son
+    meilleur score est < min_score (meilleur des deux scores retenu).
+    Retourne un DataFrame aligné sur cp5.index : [_row (position dans index.table ou -1), match_score].
+    """
+    rows = np.full(len(cp5), -1, dtype=np.int64)
+    scores = np.zeros(len(cp5), dtype=float)
+    cache = {}
+    for i, (cp, ville) in enumerate(zip(cp5.to_numpy(), ville_norm.to_numpy())):
+        key = (cp, ville)
+        hit = cache.get(key)
+        if hit is None:
+            grams = trigrams(clean_for_match(ville))
+            hit = (None, 0.0)
+            part = index.partition("cp", cp)
+            if part is not None:
+                hit = part.best(grams)
+            if (hit[0] is None or hit[1] < min_score) and isinstance(cp, str):
+                part = index.partition("dep", cp[:2])
+                if part is not None:
+                    cand = part.best(grams)
+                    if cand[1] > hit[1]:
+                        hit = cand
+            cache[key] = hit
+        if hit[0] is not None and hit[1] >= min_score:
+            rows[i], scores[i] = hit
+    return pd.DataFrame({"_row": rows, "match_score": scores}, index=cp5.index)
@@ -1,6 +1,20 @@
 import pandas as pd
+import numpy as np
 import re
 import unicodedata
+from commune_index import build_commune_index, fuzzy_lookup
+from catchment import population_desservie
+
+# Lecteur CSV et géographie partagés avec vax_forecast_project (détection encodage/séparateur + cache de profil) :
+# vax_forecast_project doit être sur le PYTHONPATH (cf. README, requirements.txt)
+try:
+    from src.csv_reader import read_csv_sniffed
+    from src.geography import DEFAULT as GEO
+except ModuleNotFoundError as e:
+    if e.name != "src":  # dépendance manquante de src (pyarrow...) : erreur d'origine
+        raise
+    raise ModuleNotFoundError("Prev_pharmacie dépend de vax_forecast_project (package src) : "
+                              "export PYTHONPATH=../vax_forecast_project") from e
 
 # ==============================
 # Helpers
@@ -29,63 +43,83 @@ def zfill_cp(x) -> str:
     digits = re.sub(r"\D", "", s)
     return digits.zfill(5) if digits else None
 
-# Mapping département (2 digits CP) -> région (INSEE, code3, nom)
-DEPT2_TO_REGION = {
-    "75": ("11","IDF","Île-de-France"), "77": ("11","IDF","Île-de-France"),
-    "78": ("11","IDF","Île-de-France"), "91": ("11","IDF","Île-de-France"),
-    "92": ("11","IDF","Île-de-France"), "93": ("11","IDF","Île-de-France"),
-    "94": ("11","IDF","Île-de-France"), "95": ("11","IDF","Île-de-France"),
-    "18": ("24","CVL","Centre-Val de Loire"), "28": ("24","CVL","Centre-Val de Loire"),
-    "36": ("24","CVL","Centre-Val de Loire"), "37": ("24","CVL","Centre-Val de Loire"),
-    "41": ("24","CVL","Centre-Val de Loire"), "45": ("24","CVL","Centre-Val de Loire"),
-    "21": ("27","BFC","Bourgogne-Franche-Comté"), "25": ("27","BFC","Bourgogne-Franche-Comté"),
-    "39": ("27","BFC","Bourgogne-Franche-Comté"), "58": ("27","BFC","Bourgogne-Franche-Comté"),
-    "70": ("27","BFC","Bourgogne-Franche-Comté"), "71": ("27","BFC","Bourgogne-Franche-Comté"),
-    "89": ("27","BFC","Bourgogne-Franche-Comté"), "90": ("27","BFC","Bourgogne-Franche-Comté"),
-    "14": ("28","NOR","Normandie"), "27": ("28","NOR","Normandie"),
-    "50": ("28","NOR","Normandie"), "61": ("28","NOR","Normandie"),
-    "76": ("28","NOR","Normandie"),
-    "02": ("32","HDF","Hauts-de-France"), "59": ("32","HDF","Hauts-de-France"),
-    "60": ("32","HDF","Hauts-de-France"), "62": ("32","HDF","Hauts-de-France"),
-    "80": ("32","HDF","Hauts-de-France"),
-    "08": ("44","GES","Grand Est"), "10": ("44","GES","Grand Est"),
-    "51": ("44","GES","Grand Est"), "52": ("44","GES","Grand Est"),
-    "54": ("44","GES","Grand Est"), "55": ("44","GES","Grand Est"),
-    "57": ("44","GES","Grand Est"), "67": ("44","GES","Grand Est"),
-    "68": ("44","GES","Grand Est"), "88": ("44","GES","Grand Est"),
-    "44": ("52","PDL","Pays de la Loire"), "49": ("52","PDL","Pays de la Loire"),
-    "53": ("52","PDL","Pays de la Loire"), "72": ("52","PDL","Pays de la Loire"),
-    "85": ("52","PDL","Pays de la Loire"),
-    "22": ("53","BRE","Bretagne"), "29": ("53","BRE","Bretagne"),
-    "35": ("53","BRE","Bretagne"), "56": ("53","BRE","Bretagne"),
-    "16": ("75","NAQ","Nouvelle-Aquitaine"), "17": ("75","NAQ","Nouvelle-Aquitaine"),
-    "19": ("75","NAQ","Nouvelle-Aquitaine"), "23": ("75","NAQ","Nouvelle-Aquitaine"),
-    "24": ("75","NAQ","Nouvelle-Aquitaine"), "33": ("75","NAQ","Nouvelle-Aquitaine"),
-    "40": ("75","NAQ","Nouvelle-Aquitaine"), "47": ("75","NAQ","Nouvelle-Aquitaine"),
-    "64": ("75","NAQ","Nouvelle-Aquitaine"), "79": ("75","NAQ","Nouvelle-Aquitaine"),
-    "86": ("75","NAQ","Nouvelle-Aquitaine"), "87": ("75","NAQ","Nouvelle-Aquitaine"),
-    "09": ("76","OCC","Occitanie"), "11": ("76","OCC","Occitanie"),
-    "12": ("76","OCC","Occitanie"), "30": ("76","OCC","Occitanie"),
-    "31": ("76","OCC","Occitanie"), "32": ("76","OCC","Occitanie"),
-    "34": ("76","OCC","Occitanie"), "46": ("76","OCC","Occitanie"),
-    "48": ("76","OCC","Occitanie"), "65": ("76","OCC","Occitanie"),
-    "66": ("76","OCC","Occitanie"), "81": ("76","OCC","Occitanie"),
-    "82": ("76","OCC","Occitanie"),
-    "01": ("84","ARA","Auvergne-Rhône-Alpes"), "07": ("84","ARA","Auvergne-Rhône-Alpes"),
-    "26": ("84","ARA","Auvergne-Rhône-Alpes"), "38": ("84","ARA","Auvergne-Rhône-Alpes"),
-    "42": ("84","ARA","Auvergne-Rhône-Alpes"), "43": ("84","ARA","Auvergne-Rhône-Alpes"),
-    "63": ("84","ARA","Auvergne-Rhône-Alpes"), "69": ("84","ARA","Auvergne-Rhône-Alpes"),
-    "73": ("84","ARA","Auvergne-Rhône-Alpes"), "74": ("84","ARA","Auvergne-Rhône-Alpes"),
-    "04": ("93","PAC","Provence-Alpes-Côte d'Azur"), "05": ("93","PAC","Provence-Alpes-Côte d'Azur"),
-    "06": ("93","PAC","Provence-Alpes-Côte d'Azur"), "13": ("93","PAC","Provence-Alpes-Côte d'Azur"),
-    "83": ("93","PAC","Provence-Alpes-Côte d'Azur"), "84": ("93","PAC","Provence-Alpes-Côte d'Azur"),
-    "20": ("94","COR","Corse"),
-}
+# ==============================
+# Versions vectorisées (mêmes sorties que les helpers ligne à ligne)
+# ==============================
+def _build_accent_table() -> dict:
+    """
+    Table str.translate unique : caractère accentué -> caractère de base.
+    Couvre Latin-1 / Latin étendu A-B + les diacritiques combinants (supprimés).
+    """
+    table = {}
+    for cp in range(0x00C0, 0x0250):
+        ch = chr(cp)
+        base = strip_accents(ch)
+        if base != ch:
+            table[cp] = base
+    for cp in range(0x0300, 0x0370):  # diacritiques combinants (catégorie Mn)
+        table[cp] = None
+    return table
+
+_ACCENT_TABLE = _build_accent_table()
+_NON_ASCII = r"[^\x00-\x7F]"
+
+def strip_accents_series(s: pd.Series) -> pd.Series:
+    """Équivalent vectorisé de s.apply(strip_accents)."""
+    s = s.where(s.isna(), s.astype(str))
+    out = s.str.translate(_ACCENT_TABLE)
+    # Filet: caractères hors table (autres alphabets, ligatures...) -> helper unicode
+    rest = out.str.contains(_NON_ASCII, regex=True, na=False)
+    if rest.any():
+        out.loc[rest] = s.loc[rest].map(strip_accents)
+    return out
+
+def _on_uniques(s: pd.Series, fn, keep_na: bool = True) -> pd.Series:
+    """
+    Applique fn (Series -> Series) sur les valeurs uniques de s puis redistribue.
+    Villes et CP se répètent énormément : quelques milliers d'uniques pour des dizaines de milliers de lignes.
+    keep_na=True : les manquants sont renvoyés tels quels, sinon None.
+    """
+    codes, uniques = pd.factorize(s)
+    out = np.empty(len(s), dtype=object)
+    if len(uniques):
+        out[:] = fn(pd.Series(uniques, dtype=object)).to_numpy(dtype=object)[codes]
+    na = codes == -1
+    out[na] = s.to_numpy(dtype=object)[na] if keep_na else None
+    return pd.Series(out, index=s.index, name=s.name, dtype=object)
+
+def norm_city_series(s: pd.Series) -> pd.Series:
+    """Équivalent vectorisé de s.apply(norm_city)."""
+    return _on_uniques(s, lambda u: strip_accents_series(u).str.upper().str.strip()
+                                    .str.replace(r"\s+", " ", regex=True))
+
+def _zfill_cp_uniques(u: pd.Series) -> pd.Series:
+    u = u.astype(str)
+    out = u.str.zfill(5)
+    # Hors cas isdigit() : chiffres seuls puis zfill (None si aucun chiffre)
+    dirty = ~u.str.isdigit()
+    if dirty.any():
+        digits = u[dirty].str.replace(r"\D", "", regex=True)
+        out[dirty] = digits.str.zfill(5).where(digits != "", None)
+    return out
 
+def zfill_cp_series(s: pd.Series) -> pd.Series:
+    """Équivalent vectorisé de s.apply(zfill_cp) (None si aucun chiffre)."""
+    return _on_uniques(s, _zfill_cp_uniques, keep_na=False)
+
+# Département (préfixe du CP) -> région (INSEE, code3, nom) : référentiel partagé src.geography
 def map_cp_to_region_tuple(cp5: str):
     if not cp5 or pd.isna(cp5):
         return (None, None, None)
-    return DEPT2_TO_REGION.get(cp5[:2], (None, None, None))
+    i = GEO.id_from_cp(cp5)
+    return (None, None, None) if i is None else (GEO.insee[i], GEO.code[i], GEO.name[i])
+
+def map_cp_to_region_columns(cp5: pd.Series) -> pd.DataFrame:
+    """
+    Équivalent vectorisé de cp5.apply(map_cp_to_region_tuple).apply(pd.Series) :
+    un lookup par CP distinct, reprojeté par tableau.
+    """
+    return GEO.to_columns(cp5, "cp")
 
 # ==============================
 # 1) Préparer pharmacies
@@ -98,11 +132,11 @@ def prepare_pharmacies_commune(df_pharma: pd.DataFrame) -> pd.DataFrame:
 
     out = df_pharma.copy()
     out = out.rename(columns={col_nom: "pharmacie"})
-    out["cp5"] = out[col_cp].apply(zfill_cp)
-    out["ville_norm"] = out[col_vil].apply(norm_city)
+    out["cp5"] = zfill_cp_series(out[col_cp])
+    out["ville_norm"] = norm_city_series(out[col_vil])
 
     # Région (pour info/colonnes demandées)
-    out[["region_insee","region_code3","region_name"]] = out["cp5"].apply(map_cp_to_region_tuple).apply(pd.Series)
+    out[["region_insee","region_code3","region_name"]] = map_cp_to_region_columns(out["cp5"])
     return out
 
 # ==============================
@@ -117,25 +151,25 @@ def explode_codes_postaux(df_villes: pd.DataFrame) -> pd.DataFrame:
     # Normaliser la ville pour la jointure
     # On privilégie nom_standard s'il existe, sinon nom_standard_majuscule ou nom_sans_accent
     if "nom_standard" in base.columns:
-        base["ville_norm"] = base["nom_standard"].apply(norm_city)
+        base["ville_norm"] = norm_city_series(base["nom_standard"])
     elif "nom_standard_majuscule" in base.columns:
-        base["ville_norm"] = base["nom_standard_majuscule"].apply(norm_city)
+        base["ville_norm"] = norm_city_series(base["nom_standard_majuscule"])
     else:
-        base["ville_norm"] = base["nom_sans_accent"].apply(norm_city)
+        base["ville_norm"] = norm_city_series(base["nom_sans_accent"])
 
     # Préparer les CP (colonne 'codes_postaux' ou 'code_postal')
     if "codes_postaux" in base.columns and base["codes_postaux"].notna().any():
         # Extraire toutes les séquences de 5 chiffres (robuste aux séparateurs différents)
-        base["_all_cp"] = base["codes_postaux"].astype(str).apply(lambda s: re.findall(r"\b\d{5}\b", s))
+        base["_all_cp"] = base["codes_postaux"].astype(str).str.findall(r"\b\d{5}\b")
     elif "code_postal" in base.columns:
-        base["_all_cp"] = base["code_postal"].astype(str).apply(lambda s: re.findall(r"\b\d{5}\b", s))
+        base["_all_cp"] = base["code_postal"].astype(str).str.findall(r"\b\d{5}\b")
     else:
         # Pas de CP -> pas de jointure possible par CP (très rare sur un bon fichier INSEE)
         base["_all_cp"] = [[] for _ in range(len(base))]
 
     exploded = base.explode("_all_cp", ignore_index=True)
     exploded = exploded.rename(columns={"_all_cp": "cp5"})
-    exploded["cp5"] = exploded["cp5"].apply(zfill_cp)
+    exploded["cp5"] = zfill_cp_series(exploded["cp5"])
     # Garder les colonnes utiles
     keep_cols = [
         "ville_norm", "cp5", "code_insee", "population", "reg_code", "reg_nom",
@@ -147,7 +181,18 @@ def explode_codes_postaux(df_villes: pd.DataFrame) -> pd.DataFrame:
 # ==============================
 # 3) Jointure pharmacie -> commune
 # ==============================
-def match_pharmacies_to_communes(df_pharma: pd.DataFrame, df_communes_cp: pd.DataFrame) -> pd.DataFrame:
+def match_pharmacies_to_communes(df_pharma: pd.DataFrame, df_communes_cp: pd.DataFrame,
+                                 fuzzy_min_score: float = 0.5) -> pd.DataFrame:
+    """
+    Apparie chaque pharmacie à une commune, en 3 passes :
+      a) jointure stricte (cp5 + ville_norm)                -> match_method='exact', confiance 1.0
+      b) similarité trigrammes sur les communes du même CP  -> 'fuzzy', confiance = score Dice
+         (puis du même département si le CP est inconnu ou si son meilleur score est < fuzzy_min_score ;
+          la commune du département n'est retenue que si elle fait mieux)
+      c) commune la plus peuplée du CP                      -> 'cp_max_pop', confiance = part de
+         cette commune dans la population du CP
+    Colonnes ajoutées : match_method, match_confidence.
+    """
     # 3.a Jointure stricte (cp5 + ville_norm)
     merged = df_pharma.merge(
         df_communes_cp,
@@ -155,13 +200,32 @@ def match_pharmacies_to_communes(df_pharma: pd.DataFrame, df_communes_cp: pd.Dat
         how="left",
         suffixes=("","_commune")
     )
+    merged["match_method"] = np.where(merged["population"].notna(), "exact", None)
+    merged["match_confidence"] = np.where(merged["population"].notna(), 1.0, 0.0)
+    commune_cols = [c for c in df_communes_cp.columns if c not in ("cp5", "ville_norm") and c in merged.columns]
 
-    # 3.b Fallback: si pas de match, tenter par cp5 seul -> prendre la commune la plus peuplée sur ce CP
+    # 3.b Fallback flou : index trigrammes partitionné par CP
+    missing = merged["population"].isna()
+    if missing.any():
+        index = build_commune_index(df_communes_cp)
+        hits = fuzzy_lookup(index, merged.loc[missing, "cp5"], merged.loc[missing, "ville_norm"],
+                            min_score=fuzzy_min_score)
+        hits = hits[hits["_row"] >= 0]
+        if len(hits):
+            found = index.table.iloc[hits["_row"].to_numpy()]
+            for col in commune_cols:
+                merged.loc[hits.index, col] = found[col].to_numpy()
+            merged.loc[hits.index, "match_method"] = "fuzzy"
+            merged.loc[hits.index, "match_confidence"] = hits["match_score"].to_numpy()
+
+    # 3.c Fallback: si pas de match, tenter par cp5 seul -> prendre la commune la plus peuplée sur ce CP
     missing = merged["population"].isna()
     if missing.any():
-        # Meilleure commune par CP (max population)
+        # Meilleure commune par CP (max population) + sa part dans la population du CP
+        pop_cp = df_communes_cp.groupby("cp5")["population"].transform("sum")
         best_by_cp = (
             df_communes_cp
+            .assign(share_best=(df_communes_cp["population"] / pop_cp.replace(0, np.nan)).fillna(0.0))
             .sort_values("population", ascending=False)
             .drop_duplicates(subset=["cp5"])
             .rename(columns={
@@ -170,7 +234,7 @@ def match_pharmacies_to_communes(df_pharma: pd.DataFrame, df_communes_cp: pd.Dat
                 "population": "population_best"
             })
         )
-        merged = merged.merge(best_by_cp[["cp5","ville_norm_best","code_insee_best","population_best"]],
+        merged = merged.merge(best_by_cp[["cp5","ville_norm_best","code_insee_best","population_best","share_best"]],
                               on="cp5", how="left")
 
         # Remplir les trous
@@ -178,14 +242,30 @@ def match_pharmacies_to_communes(df_pharma: pd.DataFrame, df_communes_cp: pd.Dat
                                  ("code_insee_best","code_insee")]:
             merged.loc[missing & merged[col_dst].isna(), col_dst] = merged.loc[missing & merged[col_dst].isna(), col_src]
 
+        filled = missing & merged["population_best"].notna()
+        merged.loc[filled, "match_method"] = "cp_max_pop"
+        merged.loc[filled, "match_confidence"] = merged.loc[filled, "share_best"]
+
         # Si ville_norm manquante côté communes, garder la ville pharma
         merged["ville_norm"] = merged["ville_norm"]
 
         # Nettoyage colonnes auxiliaires
-        merged = merged.drop(columns=["ville_norm_best","code_insee_best","population_best"], errors="ignore")
+        merged = merged.drop(columns=["ville_norm_best","code_insee_best","population_best","share_best"], errors="ignore")
 
     return merged
 
+# Colonnes finales des calculs de stock
+STOCK_FINAL_COLS = [
+    "pharmacie",
+    "cp5",
+    "region_code3", "region_insee", "region_name",
+    "code_insee",           # commune
+    "ville_norm",           # nom commune normalisé
+    "population",           # population de la commune
+    "n_pharmacies_commune",
+    "stock_potentiel_vaccins"
+]
+
 # ==============================
 # 4) Calcul stock au niveau COMMUNE
 # ==============================
@@ -213,50 +293,91 @@ def compute_stock_par_commune(df_matched: pd.DataFrame,
         out["stock_total_commune_cible"] / out["n_pharmacies_commune"].replace({0: pd.NA})
     ).round().fillna(0).astype(int)
 
-    # Colonnes finales
-    final_cols = [
-        "pharmacie",
-        "cp5",
-        "region_code3", "region_insee", "region_name",
-        "code_insee",           # commune
-        "ville_norm",           # nom commune normalisé
-        "population",           # population de la commune
-        "n_pharmacies_commune",
-        "stock_potentiel_vaccins"
-    ]
-    return out[final_cols].sort_values(["code_insee","pharmacie"])
-
-
-# -- Pharmacies (extrait fourni) :
-df_pharma = pd.read_csv("data/raw/Classeur1.csv", sep=";", encoding="cp1252", dtype={"Adresse_codepostal":"string"})
-
-# -- df_villes : doit contenir (au moins) code_insee, population, reg_code, reg_nom, codes_postaux/code_postal, nom_standard*
-df_villes = pd.read_csv("data/raw/communes-france-2025.csv", dtype={"reg_code":"string","code_postal":"string"})
+    return out[STOCK_FINAL_COLS].sort_values(["code_insee","pharmacie"])
 
-# 1) Prépare pharmacies + région
-dfP = prepare_pharmacies_commune(df_pharma)
+# ==============================
+# 4 bis) Calcul stock par ZONE DE CHALANDISE (k pharmacies les plus proches)
+# ==============================
+def compute_stock_par_catchment(df_matched: pd.DataFrame,
+                                df_communes_cp: pd.DataFrame,
+                                target_coverage=0.50,
+                                doses_per_person=1.0,
+                                buffer_factor=1.10,
+                                k=5,
+                                scale_km=5.0) -> pd.DataFrame:
+    """
+    Variante géographique de compute_stock_par_commune : la population de chaque commune est
+    répartie sur ses k pharmacies les plus proches (poids exp(-d/scale_km)), cf. catchment.py.
+    Les pharmacies sans coordonnées gardent la part égale de leur commune (retirée de la population
+    répartie géographiquement) ; une commune sans coordonnées revient à ses propres pharmacies.
+    Ajoute la colonne population_desservie (utilisée par fusion_previs pour la répartition).
+    """
+    out = df_matched.reset_index(drop=True)
+    out["n_pharmacies_commune"] = out.groupby("code_insee")["code_insee"].transform("size")
+    out["population_desservie"] = population_desservie(df_communes_cp, out, k=k, scale_km=scale_km)
 
-# 2) Explose INSEE villes par codes postaux
-communes_cp = explode_codes_postaux(df_villes)
+    out["stock_potentiel_vaccins"] = (
+        out["population_desservie"]
+        * target_coverage
+        * doses_per_person
+        * buffer_factor
+    ).round().astype(int)
+
+    return out[STOCK_FINAL_COLS + ["population_desservie"]].sort_values(["code_insee","pharmacie"])
+
+
+def main():
+    # -- Pharmacies (extrait fourni) :
+    df_pharma = pd.read_csv("data/raw/Classeur1.csv", sep=";", encoding="cp1252", dtype={"Adresse_codepostal":"string"})
+
+    # -- df_villes : doit contenir (au moins) code_insee, population, reg_code, reg_nom, codes_postaux/code_postal, nom_standard*
+    df_villes = read_csv_sniffed("data/raw/communes-france-2025.csv",
+                                 dtype={"reg_code":"string","code_postal":"string","code_insee":"string"})
+
+    # 1) Prépare pharmacies + région
+    dfP = prepare_pharmacies_commune(df_pharma)
+
+    # 2) Explose INSEE villes par codes postaux
+    communes_cp = explode_codes_postaux(df_villes)
+
+    # 3) Jointure pharmacie -> commune (stricte, puis floue par CP, puis commune la plus peuplée du CP)
+    matched = match_pharmacies_to_communes(dfP, communes_cp)
+    print("[INFO] Appariement pharmacies -> communes :")
+    print(matched.groupby("match_method", dropna=False)["match_confidence"]
+                 .agg(["size", "mean", "min"]).rename(columns={"size": "n"}))
+
+    # 4) Calcul du stock : zone de chalandise si coordonnées dispo,
+    #    sinon à l'échelle de la commune (équitable entre pharmacies de la même commune)
+    geo_ok = ({"Adresse_latitude","Adresse_longitude"} <= set(matched.columns)
+              and {"latitude_centre","longitude_centre"} <= set(communes_cp.columns))
+    if geo_ok:
+        result = compute_stock_par_catchment(
+            matched, communes_cp,
+            target_coverage=0.50,
+            doses_per_person=1.0,
+            buffer_factor=1.08,
+            k=5,                    # 5 pharmacies les plus proches par commune
+            scale_km=5.0            # décroissance exp(-d/5km)
+        )
+    else:
+        result = compute_stock_par_commune(
+            matched,
+            target_coverage=0.50,   # 50% de couverture
+            doses_per_person=1.0,   # 1 dose/grippe
+            buffer_factor=1.08      # +8% de marge
+        )
+    result.drop(columns=['cp5', 'region_insee','region_name', 'code_insee', 'ville_norm'], inplace=True)
+    f = result.loc[:, ~result.columns.str.contains("^Unnamed")]
 
-# 3) Jointure pharmacie -> commune
-matched = match_pharmacies_to_communes(dfP, communes_cp)
+    # 2️⃣ Convertir toutes les colonnes numériques en int (sans erreur si NaN)
+    for col in result.select_dtypes(include="number").columns:
+        result[col] = result[col].fillna(0).astype(int)
 
-# 4) Calcul du stock à l'échelle de la commune (équitable entre pharmacies de la même commune)
-result = compute_stock_par_commune(
-    matched,
-    target_coverage=0.50,   # 50% de couverture
-    doses_per_person=1.0,   # 1 dose/grippe
-    buffer_factor=1.08      # +8% de marge
-)
-result.drop(columns=['cp5', 'region_insee','region_name', 'code_insee', 'ville_norm'], inplace=True)
-f = result.loc[:, ~result.columns.str.contains("^Unnamed")]
 
-# 2️⃣ Convertir toutes les colonnes numériques en int (sans erreur si NaN)
-for col in result.select_dtypes(include="number").columns:
-    result[col] = result[col].fillna(0).astype(int)
+    result.to_csv('data/processed/pharma_clean.csv')
 
+    print(result)
 
-result.to_csv('data/processed/pharma_clean.csv')
 
-print(result)
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,16 @@
 // src/actions.js
 import { state } from "./state.js";
 import { botReply } from "./ui.js";
-import { ensurePharmaciesLoaded, findNearest, lineForPharmacy } from "./pharmacy.js";
+import { ensurePharmaciesNear, ensurePharmaciesForCity, findNearest, lineForPharmacy } from "./pharmacy.js";
 import { specialistFor } from "./specialists.js";
 import { openMapsQueryAroundLatLon, openDoctolibCity } from "./links.js";
 
 
 export async function proposeNearbyPharmacies(){
-  await ensurePharmaciesLoaded();
-
   const { userData } = state;
 
   if (userData.location) {
+    await ensurePharmaciesNear(userData.location.latitude, userData.location.longitude);
     const list = findNearest(userData.location.latitude, userData.location.longitude, 3);
     if (list.length){
       let text = "Voici des pharmacies proches où vous pouvez vous faire vacciner 💉 :<br>";
@@ -22,6 +21,7 @@ export async function proposeNearbyPharmacies(){
   }
 
   if (userData.lastCity){
+    await ensurePharmaciesForCity(userData.lastCity);
     const match = state.pharmacies
       .filter(p => p.city && p.city.toLowerCase().includes(userData.lastCity.toLowerCase()))
       .slice(0, 3);
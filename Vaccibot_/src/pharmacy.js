@@ -97,6 +97,92 @@ export function ensurePharmaciesLoaded(){
     : loadCSV().then(d => (state.pharmacies = d));
 }
 
+// ---------- Index pré-calculé (Prev_pharmacie/build_pharmacy_index.py) ----------
+// data/pharmacies/index.json + tuiles geohash : on ne télécharge que les tuiles utiles.
+const INDEX_URL = "data/pharmacies/index.json";
+const TILE_URL = gh => `data/pharmacies/tiles/${gh}.json`;
+const GH32 = "0123456789bcdefghjkmnpqrstuvwxyz";
+
+let indexPromise = null;
+const loadedTiles = new Set();
+
+function loadIndex(){
+  if (!indexPromise) {
+    indexPromise = fetch(INDEX_URL)
+      .then(r => (r.ok ? r.json() : null))
+      .catch(() => null);
+  }
+  return indexPromise;
+}
+
+function geohash(lat, lon, precision){
+  let latR = [-90, 90], lonR = [-180, 180], gh = "", ch = 0;
+  for (let bit = 0; bit < precision * 5; bit++) {
+    const r = bit % 2 === 0 ? lonR : latR;
+    const v = bit % 2 === 0 ? lon : lat;
+    const mid = (r[0] + r[1]) / 2;
+    ch <<= 1;
+    if (v >= mid) { ch |= 1; r[0] = mid; } else { r[1] = mid; }
+    if (bit % 5 === 4) { gh += GH32[ch]; ch = 0; }
+  }
+  return gh;
+}
+
+// Tuile de (lat, lon) + voisines sur `ring` cellules dans chaque direction
+function tilesAround(lat, lon, precision, ring = 1){
+  const lonBits = Math.ceil(precision * 5 / 2), latBits = Math.floor(precision * 5 / 2);
+  const dLat = 180 / 2 ** latBits, dLon = 360 / 2 ** lonBits;
+  const out = new Set();
+  for (let i = -ring; i <= ring; i++) {
+    for (let j = -ring; j <= ring; j++) {
+      const la = Math.max(-89.999, Math.min(89.999, lat + i * dLat));
+      const lo = ((lon + j * dLon + 540) % 360) - 180;
+      out.add(geohash(la, lo, precision));
+    }
+  }
+  return [...out];
+}
+
+function normCity(s){
+  return String(s || "").normalize("NFD").replace(/[\u0300-\u036f]/g, "")
+    .toUpperCase().trim().replace(/\s+/g, " ");
+}
+
+function rowToPharmacy([name, address, city, lat, lon, ranges, booking]){
+  const todayRanges = ranges[new Date().getDay()] || [];
+  return { name, address, city, lat, lon, hours: { ranges }, todayRanges, booking };
+}
+
+async function loadTiles(index, ghs){
+  const todo = ghs.filter(gh => index.tiles[gh] && !loadedTiles.has(gh));
+  todo.forEach(gh => loadedTiles.add(gh));
+  const chunks = await Promise.all(todo.map(gh =>
+    fetch(TILE_URL(gh)).then(r => (r.ok ? r.json() : [])).catch(() => [])
+  ));
+  for (const rows of chunks) state.pharmacies.push(...rows.map(rowToPharmacy));
+}
+
+// Charge les pharmacies autour d'une position (élargit une fois si rien autour)
+export async function ensurePharmaciesNear(lat, lon){
+  const index = await loadIndex();
+  if (!index) return ensurePharmaciesLoaded();
+  await loadTiles(index, tilesAround(lat, lon, index.precision, 1));
+  if (!state.pharmacies.length) await loadTiles(index, tilesAround(lat, lon, index.precision, 2));
+  return state.pharmacies;
+}
+
+// Charge les tuiles des villes dont le nom contient la saisie
+export async function ensurePharmaciesForCity(city){
+  const index = await loadIndex();
+  if (!index) return ensurePharmaciesLoaded();
+  const q = normCity(city);
+  const ghs = Object.entries(index.cities)
+    .filter(([name]) => name.includes(q))
+    .flatMap(([, tiles]) => tiles);
+  await loadTiles(index, [...new Set(ghs)]);
+  return state.pharmacies;
+}
+
 export function findNearest(lat, lon, limit=3){
   return state.pharmacies
     .map(p=>({...p, distance:distanceKm(lat,lon,p.lat,p.lon)}))
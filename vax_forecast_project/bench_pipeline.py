@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks des chemins chauds de la pipeline sur données synthétiques à l'échelle voulue
+(src.synthetic : régions/départements, pharmacies, années d'historique, écrites en parquet).
+
+Cas : génération, chargement des sources, table de features, rolling CV (par série / global),
+baseline, réconciliation, calibration + export réassort, mise à jour hebdomadaire du nowcast, cube de
+scénarios what-if, backtest multi-origines, PL de réassort, panel pharmacie, répartition par pharmacie et simulation de stock
+(Prev_pharmacie/fusion_previs.py) ;
+démarrage à froid de la CLI (startup.*, budget 300 ms) et import des modules de chaque commande (import.*).
+Chaque cas : meilleur temps sur --repeat exécutions. Résultats ajoutés à reports/bench_history.jsonl
+et comparés au dernier run de mêmes paramètres (régression si > --tolerance).
+
+Usage :
+    python bench_pipeline.py --departements --pharmacies 20000 --years 5
+    python bench_pipeline.py --only features baseline --repeat 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE.parent / "Prev_pharmacie"))  # fusion_previs (répartition / simulation de stock)
+
+from src.config import REPORTS_DIR
+from src.synthetic import synthetic_tables, write_tables
+
+HISTORY = REPORTS_DIR / "bench_history.jsonl"
+STARTUP_BUDGET_S = 0.3  # démarrage à froid de la CLI (`vaxfc <commande> --help`), toutes commandes
+CLI_COMMANDS = ("features", "train", "nowcast", "scenarios", "backtest", "plan", "allocate", "serve")
+# modules chargés par chaque sous-commande avant son travail (coût des dépendances, cf. src/cli.py)
+COMMAND_MODULES = {"features": "src.feature_engineering", "train": "src.train_pipeline",
+                   "nowcast": "src.nowcast", "scenarios": "src.scenarios", "backtest": "src.backtest",
+                   "plan": "src.opt.plan_reassort", "serve": "src.serve"}
+
+
+def _timeit(fn, repeat=3):
+    best = float("inf")
+    out = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def _rows(out):
+    if isinstance(out, tuple):
+        out = out[0]
+    if isinstance(out, dict):
+        return len(out)
+    return int(out.shape[0]) if hasattr(out, "shape") and len(out.shape) else None
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _python(*argv):
+    """Processus Python neuf (démarrage à froid) lancé depuis la racine du projet."""
+    def run():
+        subprocess.run([sys.executable, *argv], cwd=BASE, capture_output=True, check=True)
+    return run
+
+
+def build_cases(args, workdir: Path) -> dict:
+    """{nom: (préparation, fonction chronométrée)} ; préparation exécutée une fois, hors chrono."""
+    params = dict(n_regions=args.regions, departements=args.departements,
+                  n_pharmacies=args.pharmacies, years=args.years, seed=args.seed)
+    tables = synthetic_tables(**params)
+    cfg = write_tables(tables, workdir)
+    os.environ["VAXFC_DATA_SOURCES"] = str(cfg)  # lu à l'import de src.data_ingestion
+
+    from src import data_ingestion
+    from src.feature_engineering import build_feature_table
+    from src.models.gbdt_demand import rolling_cv_fit_predict, global_rolling_cv_fit_predict
+    from src.models.baselines import seasonal_naive_future
+    from src.models.pharmacy_demand import build_panel, design_matrix
+    from src.hts import topdown_proportions, reconcile_topdown, reconcile_bottomup
+    from src.opt.optimize_inventory import lp_replenishment
+    from src.train_pipeline import _calibrate_scale_after_model, _write_reassort_csv_from_latest
+    from src.nowcast import NowcastState
+    from src.scenarios import PRESETS, Scenario, scenario_cube
+    from src.backtest import read_predictions, run_backtest
+    from fusion_previs import repartition_par_pharmacie, simulate_stock
+
+    gran = "departement" if args.departements else "region"
+    state = {}
+
+    def features():
+        X = build_feature_table(save=False, granularity=gran)
+        state["X"] = X
+        return X
+
+    def prepare_models():
+        X = state.get("X")
+        if X is None:
+            X = features()
+        keys = list(X.attrs["GROUP_COLS"])
+        state["keys"] = keys
+        first = X[keys].drop_duplicates().head(args.cv_series)
+        state["X_sub"] = X.merge(first, on=keys)
+        state["X_sub"].attrs = X.attrs
+
+        # prévisions factices sur les H mois suivants (schéma des sorties de l'ensemble)
+        rng = np.random.default_rng(0)
+        nxt = (pd.Timestamp.now(tz="Europe/Paris").to_period("M").to_timestamp()
+               + pd.offsets.MonthBegin(1)).tz_localize(None)
+        months = pd.DataFrame({"date": pd.date_range(nxt, periods=args.horizon, freq="MS")})
+        fine = X[keys].drop_duplicates().merge(months, how="cross")
+        fine["yhat"] = rng.uniform(20, 80, len(fine))
+        state["fine_fc"] = fine
+        state["pop"] = X[[*keys, "population"]].drop_duplicates(keys)
+        if "dep" in keys:
+            reg_fc = reconcile_bottomup(fine, state["pop"], on_fine=keys, on=("region", "age_band"))
+        else:
+            reg_fc = fine
+        state["reg_fc"] = reg_fc
+        state["fc_path"], state["feat_path"] = workdir / "forecast.parquet", workdir / "features.parquet"
+        reg_fc.to_parquet(state["fc_path"], index=False)
+        X.to_parquet(state["feat_path"], index=False)
+
+    def prepare_pharma():
+        if "reg_fc" not in state:
+            prepare_models()
+        pharma = tables["pharmacies"]
+        pop_region = state["pop"].groupby("region", as_index=False)["population"].sum()
+        rm = (state["reg_fc"].groupby(["date", "region"], as_index=False)["yhat"].sum()
+              .merge(pop_region, on="region", how="left"))
+        rm["stock_prev_total"] = rm["yhat"] * rm["population"] / 100000.0
+        state["region_month"] = rm
+        state["alloc"] = repartition_par_pharmacie(pharma, rm)
+
+    def lp():
+        last = state["fine_fc"][state["fine_fc"]["date"] == state["fine_fc"]["date"].max()]
+        nodes = last[state["keys"][:-1]].astype(str).agg("-".join, axis=1)
+        mean = last.assign(node=nodes.to_numpy()).groupby("node")["yhat"].sum().to_dict()
+        p90 = {k: v * 1.2 for k, v in mean.items()}
+        return lp_replenishment(list(mean), mean, p90, capacity=0.8 * sum(p90.values()))
+
+    def topdown():
+        fc = state["fine_fc"]
+        nat = fc.groupby("date", as_index=False)["yhat"].sum().rename(columns={"yhat": "national_total"})
+        props = topdown_proportions(fc, on=state["keys"], target="yhat")
+        return reconcile_topdown(nat, props, on=state["keys"])
+
+    def export():
+        cal = _calibrate_scale_after_model(state["fc_path"], state["feat_path"], workdir / "forecast_cal.parquet")
+        _write_reassort_csv_from_latest(cal, state["feat_path"], workdir / "reassort.csv")
+        return cal
+
+    def prepare_nowcast():
+        if "X" not in state:
+            features()
+        X, keys = state["X"], list(state["X"].attrs["GROUP_COLS"])
+        oof, _, models, _ = global_rolling_cv_fit_predict(X, group_cols=keys, min_train_months=8,
+                                                          horizon_months=args.horizon)
+        bundle = {"strategy": "global", "group_cols": keys, "models": models,
+                  "series": list(oof[keys].drop_duplicates().itertuples(index=False, name=None))}
+        frames, _ = data_ingestion.load_all_sources(granularity=gran)
+        state["nowcast"] = NowcastState(X, frames["incidence"], frames["urgences"], bundle)
+        state["week"] = 0
+
+    def nowcast_update():
+        # une semaine de plus à chaque appel (Sentinelles + OSCOUR), valeurs perturbées
+        nc = state["nowcast"]
+        state["week"] += 1
+        rng = np.random.default_rng(state["week"])
+        inc = nc.incidence[nc.incidence["date"] == nc.incidence["date"].max()]
+        urg = nc.urgences[nc.urgences["date"] == nc.urgences["date"].max()]
+        inc = inc.assign(date=inc["date"] + pd.Timedelta(days=7),
+                         incidence_per_100k=inc["incidence_per_100k"] * rng.uniform(0.8, 1.5, len(inc)))
+        urg = urg.assign(date=urg["date"] + pd.Timedelta(days=7),
+                         er_visits=urg["er_visits"] * rng.uniform(0.8, 1.5, len(urg)))
+        return nc.update(inc, urg)
+
+    def backtest():
+        # 4 modèles (dont un ensemble) × 6 origines, cellules en parallèle, run repris de zéro à chaque appel
+        run_backtest(["lgbm_global:n_estimators=200", "seasonal_naive", "naive",
+                      "ens=ensemble:lgbm_global=0.7,seasonal_naive=0.3"], horizon=args.horizon, n_origins=6,
+                     features=state["X"], name="bench", out_dir=workdir / "backtests", reset=True)
+        return read_predictions(workdir / "backtests" / "bench")  # lignes = prédictions stockées
+
+    cases = {
+        "generate": (None, lambda: write_tables(synthetic_tables(**params), workdir / "gen")),
+        "load_sources": (None, lambda: (data_ingestion.REGISTRY.clear(),
+                                        data_ingestion.load_all_sources(granularity=gran)[0])[1]),
+        "features": (None, features),
+        "rolling_cv_per_series": (prepare_models, lambda: rolling_cv_fit_predict(
+            state["X_sub"], group_cols=state["keys"], min_train_months=8, horizon_weeks=args.horizon)),
+        "rolling_cv_global": (prepare_models, lambda: global_rolling_cv_fit_predict(
+            state["X"], group_cols=state["keys"], min_train_months=8, horizon_months=args.horizon)),
+        "baseline": (prepare_models, lambda: seasonal_naive_future(state["X"], group_cols=state["keys"], target="y")),
+        "reconcile_topdown": (prepare_models, topdown),
+        "reconcile_bottomup": (prepare_models, lambda: reconcile_bottomup(
+            state["fine_fc"], state["pop"], on_fine=state["keys"], on=("region", "age_band"))
+            if "dep" in state["keys"] else None),
+        "calibrate_export": (prepare_models, export),
+        "nowcast_update": (prepare_nowcast, nowcast_update),
+        # presets + 15 variantes d'intensité : 20 scénarios scorés en un predict
+        "scenario_cube": (prepare_nowcast, lambda: scenario_cube(state["nowcast"], [
+            *PRESETS.values(), *(Scenario(f"x{k:.1f}", incidence_scale=k) for k in np.linspace(0.5, 2.0, 15))
+        ]).yhat.reshape(-1)),  # lignes = scénario × série × mois
+        "backtest": (features, backtest),
+        "lp_replenishment": (prepare_models, lp),
+    }
+    cases["startup.cli"] = (None, _python("-m", "src", "--help"))
+    for cmd in CLI_COMMANDS:
+        cases[f"startup.{cmd}"] = (None, _python("-m", "src", cmd, "--help"))
+    for cmd, module in COMMAND_MODULES.items():
+        cases[f"import.{cmd}"] = (None, _python("-c", f"import {module}"))
+    if args.pharmacies:
+        def panel():
+            p = build_panel(tables["pharmacy_dispensing"])
+            T = p.Y.shape[1]
+            return design_matrix(p, np.arange(max(T - 13, 0), T - 1), np.arange(1, args.horizon + 1), max_target=T - 1)
+
+        cases.update({
+            "pharmacy_panel_design": (None, panel),
+            "pharmacy_allocation": (prepare_pharma, lambda: repartition_par_pharmacie(
+                tables["pharmacies"], state["region_month"])),
+            "stock_simulation": (prepare_pharma, lambda: simulate_stock(state["alloc"], tables["pharmacies"])),
+        })
+    return cases, params
+
+
+def _previous(params: dict):
+    if not HISTORY.exists():
+        return None
+    prev = None
+    for line in HISTORY.read_text(encoding="utf-8").splitlines():
+        try:
+            rec = json.loads(line)
+        except ValueError:
+            continue
+        if rec.get("params") == params:
+            prev = rec
+    return prev
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--regions", type=int, default=13)
+    ap.add_argument("--departements", action="store_true", help="séries département × âge")
+    ap.add_argument("--pharmacies", type=int, default=5_000)
+    ap.add_argument("--years", type=float, default=3.0)
+    ap.add_argument("--horizon", type=int, default=6)
+    ap.add_argument("--cv-series", type=int, default=3, help="séries pour le rolling CV par série")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--only", nargs="+", metavar="CAS")
+    ap.add_argument("--tolerance", type=float, default=0.20, help="régression si temps > (1+tol) × précédent")
+    ap.add_argument("--no-save", action="store_true", help="n'ajoute pas le run à l'historique")
+    ap.add_argument("--fail-on-regression", action="store_true")
+    args = ap.parse_args()
+    os.environ.setdefault("VAXFC_TRACE", "off")
+
+    with tempfile.TemporaryDirectory(prefix="vaxfc_bench_") as tmp:
+        cases, gen_params = build_cases(args, Path(tmp))
+        params = {**gen_params, "horizon": args.horizon, "cv_series": args.cv_series}
+        selected = args.only or list(cases)
+        unknown = set(selected) - set(cases)
+        if unknown:
+            raise SystemExit(f"Cas inconnus: {sorted(unknown)} (disponibles: {', '.join(cases)})")
+
+        prev = (_previous(params) or {}).get("results", {})
+        results, regressions = {}, []
+        print(f"{'cas':<24}{'meilleur (s)':>14}{'lignes':>10}{'préc. (s)':>12}{'écart':>9}")
+        for name in selected:
+            prepare, fn = cases[name]
+            if prepare is not None:
+                prepare()
+            best, out = _timeit(fn, args.repeat)
+            results[name] = {"best_s": round(best, 6), "rows": _rows(out)}
+            old = prev.get(name, {}).get("best_s")
+            delta = f"{100 * (best / old - 1):+8.1f}%" if old else ""
+            # seuil absolu (10 ms) : pas d'alerte sur le bruit des cas très courts
+            if old and best > old * (1 + args.tolerance) and best - old > 0.01:
+                regressions.append(name)
+                delta += "  <- régression"
+            if name.startswith("startup.") and best > STARTUP_BUDGET_S:
+                delta += f"  <- > {STARTUP_BUDGET_S * 1000:.0f} ms"
+                regressions.append(name)
+            rows = results[name]["rows"]
+            print(f"{name:<24}{best:>14.4f}{rows if rows is not None else '':>10}"
+                  f"{f'{old:.4f}' if old else '':>12}{delta}")
+
+    if not args.no_save:
+        HISTORY.parent.mkdir(parents=True, exist_ok=True)
+        rec = {"ts": pd.Timestamp.now().isoformat(timespec="seconds"), "commit": _commit(),
+               "params": params, "repeat": args.repeat, "results": results}
+        with open(HISTORY, "a", encoding="utf-8") as f:
+            f.write(json.dumps(rec) + "\n")
+        print(f"\nHistorique : {HISTORY}")
+    if regressions:
+        print(f"[WARN] régressions : {', '.join(regressions)}")
+        if args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
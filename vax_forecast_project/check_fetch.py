@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Vérification hors ligne de src/fetch.py contre un serveur HTTP local (http.server, port éphémère) :
+200 complet, 304 (If-None-Match), reprise 206 (Range + If-Range), If-Range périmé -> 200 complet,
+.part déjà complet -> 416 -> .part supprimé et téléchargement complet.
+Chaque cas vérifie le statut rendu, le contenu du fichier et les réponses envoyées par le serveur.
+
+Usage :
+    python check_fetch.py
+"""
+import json
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from src.fetch import fetch
+
+PAYLOAD = b"date;region;valeur\n" + b"".join(b"2026-%02d-01;IDF;%d\n" % (m, m * 7) for m in range(1, 13)) * 50
+ETAG = '"v1"'
+LAST_MODIFIED = "Mon, 05 Oct 2026 08:00:00 GMT"
+
+
+class Source(BaseHTTPRequestHandler):
+    sent = []  # statuts envoyés, dans l'ordre
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b"", headers=()):
+        self.sent.append(status)
+        self.send_response(status)
+        for k, v in (("ETag", ETAG), ("Last-Modified", LAST_MODIFIED), ("Content-Length", str(len(body))), *headers):
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.headers.get("If-None-Match") == ETAG:
+            return self._send(304)
+        rng = self.headers.get("Range")
+        if rng and self.headers.get("If-Range", ETAG) == ETAG:
+            start = int(rng.removeprefix("bytes=").rstrip("-"))
+            if start >= len(PAYLOAD):
+                return self._send(416, headers=[("Content-Range", f"bytes */{len(PAYLOAD)}")])
+            return self._send(206, PAYLOAD[start:],
+                              [("Content-Range", f"bytes {start}-{len(PAYLOAD) - 1}/{len(PAYLOAD)}")])
+        self._send(200, PAYLOAD)
+
+
+def _partial(out: Path, url: str, data: bytes, etag: str):
+    """Simule un téléchargement interrompu : .part + métadonnées de reprise."""
+    part = out.with_name(out.name + ".part")
+    part.write_bytes(data)
+    part.with_name(part.name + ".json").write_text(json.dumps({"url": url, "etag": etag, "last_modified": None}))
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Source)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/source.csv"
+    cases = {}
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+
+            def check(name, out, mirror, expected_status, expected_sent, **kw):
+                Source.sent.clear()
+                res = fetch(url, out, mirror=mirror, **kw)
+                leftovers = [p.name for p in out.parent.glob(out.name + ".part*")]
+                ok = (res.status == expected_status and out.read_bytes() == PAYLOAD
+                      and Source.sent == expected_sent and not leftovers)
+                cases[name] = ok
+                print(f"{'OK ' if ok else 'ÉCHEC'} {name:<28} statut={res.status:<13} serveur={Source.sent}"
+                      + (f" restes={leftovers}" if leftovers else ""))
+
+            mirror, out = tmp / "mirror", tmp / "raw" / "source.csv"
+            check("200 complet", out, mirror, "downloaded", [200])
+            check("304 non modifié", out, mirror, "not_modified", [304])
+
+            mirror2, out2 = tmp / "mirror2", tmp / "raw2" / "source.csv"
+            out2.parent.mkdir()
+            _partial(out2, url, PAYLOAD[:1000], ETAG)
+            check("206 reprise", out2, mirror2, "downloaded", [206])
+
+            mirror3, out3 = tmp / "mirror3", tmp / "raw3" / "source.csv"
+            out3.parent.mkdir()
+            _partial(out3, url, b"contenu d'une ancienne version", '"v0"')
+            check("If-Range périmé -> 200", out3, mirror3, "downloaded", [200])
+
+            mirror4, out4 = tmp / "mirror4", tmp / "raw4" / "source.csv"
+            out4.parent.mkdir()
+            _partial(out4, url, PAYLOAD, ETAG)
+            check(".part complet -> 416 -> 200", out4, mirror4, "downloaded", [416, 200])
+    finally:
+        server.shutdown()
+    if not all(cases.values()):
+        sys.exit(f"échecs : {[k for k, v in cases.items() if not v]}")
+    print("[OK] fetch : tous les cas hors ligne passent")
+
+
+if __name__ == "__main__":
+    main()
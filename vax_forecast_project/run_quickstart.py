@@ -4,80 +4,54 @@ Quickstart exécutable sur données synthétiques pour valider la pipeline end-t
 2) Construit features
 3) Entraîne GBDT + réconciliation
 4) Produit un plan de réassort
+Étapes enchaînées par src.dag : une étape dont les intrants n'ont pas changé est sautée.
 """
-import numpy as np, pandas as pd
-from datetime import datetime, timedelta
-from pathlib import Path
-from src.config import RAW_DIR, PROCESSED_DIR, REGIONS, AGE_BANDS, FREQ
-from src.train_pipeline import run_pipeline
+import pandas as pd
+from src.config import RAW_DIR, REGIONS
+from src.synthetic import synthetic_tables
+from src.dag import Stage, run_dag
+from src.data_ingestion import source_files
+from src.train_pipeline import run_pipeline, FEATURES_PATH, METRICS_PATH, FORECAST_CAL_PATH, REASSORT_CSV_PATH
 from src.opt.plan_reassort import make_plan
 
-def gen_synthetic():
-    np.random.seed(42)
-    start = pd.Timestamp("2022-07-04")  # lundi
-    dates = pd.date_range(start, periods=130, freq=FREQ)  # ~2.5 saisons
-    # Région mapping
-    regions = REGIONS
-    pd.DataFrame({"region":regions, "region_name":[f"REG-{r}" for r in regions]}).to_csv(RAW_DIR/"synthetic_regions.csv", index=False)
-
-    # Population par âge
-    pop_rows = []
-    for r in regions:
-        base = 1_000_000 + 300_000*np.random.rand()
-        for a in AGE_BANDS:
-            w = {"0-17":0.2,"18-64":0.6,"65+":0.2}[a]
-            pop_rows.append({"region":r, "age_band":a, "population": int(base*w)})
-    pd.DataFrame(pop_rows).to_csv(RAW_DIR/"synthetic_insee_population.csv", index=False)
-
-    # Incidence Sentinelles
-    inc_rows = []
-    for r in regions:
-        seasonal = np.sin(np.linspace(0,6*np.pi,len(dates))) * 50 + 80
-        noise = np.random.randn(len(dates))*10
-        vals = np.clip(seasonal+noise, 0, None)
-        for d,v in zip(dates, vals):
-            inc_rows.append({"date":d, "region":r, "incidence_per_100k": v})
-    pd.DataFrame(inc_rows).to_csv(RAW_DIR/"synthetic_sentinelles.csv", index=False)
+# table de src.synthetic -> CSV du quickstart
+SYNTHETIC_FILES = {name: RAW_DIR / f"synthetic_{stem}.csv" for name, stem in (
+    ("region_mapping", "regions"), ("insee_population", "insee_population"), ("sentinelles", "sentinelles"),
+    ("meteo", "meteo"), ("oscour", "oscour"), ("vaccination", "vaccination"))}
 
-    # Météo
-    met_rows = []
-    for r in regions:
-        base = 12 + 8*np.sin(np.linspace(0,2*np.pi,len(dates)))  # saisonnalité
-        noise = np.random.randn(len(dates))*2
-        t = base + noise
-        for d,v in zip(dates, t):
-            met_rows.append({"date":d, "region":r, "tmean": v})
-    pd.DataFrame(met_rows).to_csv(RAW_DIR/"synthetic_meteo.csv", index=False)
-
-    # Urgences OSCOUR
-    urg_rows = []
-    for r in regions:
-        for a in AGE_BANDS:
-            mu = {"0-17":5,"18-64":8,"65+":15}[a]
-            vals = np.maximum(0, (mu + np.random.randn(len(dates))*2)).astype(int)
-            for d,v in zip(dates, vals):
-                urg_rows.append({"date":d,"region":r,"age_band":a,"er_visits":v,"admissions":int(v*0.2)})
-    pd.DataFrame(urg_rows).to_csv(RAW_DIR/"synthetic_oscour.csv", index=False)
-
-    # Vaccination (doses): dépend de l'incidence lissée (proxy comportement)
-    vax_rows = []
-    inc = pd.read_csv(RAW_DIR/"synthetic_sentinelles.csv", parse_dates=["date"])
-    for r in regions:
-        inc_r = inc[inc["region"]==r].sort_values("date")
-        inc_ma = inc_r["incidence_per_100k"].rolling(2).mean().fillna(method="bfill").values
-        for a in AGE_BANDS:
-            mult = {"0-17":0.5,"18-64":1.0,"65+":1.8}[a]
-            base = 50*mult + (inc_ma*0.3*mult)
-            noise = np.random.randn(len(dates))*5
-            y = np.maximum(0, base + noise)
-            for d,yy in zip(inc_r["date"].values, y):
-                vax_rows.append({"date": d, "region": r, "age_band": a, "doses": float(yy)})
-    pd.DataFrame(vax_rows).to_csv(RAW_DIR/"synthetic_vaccination.csv", index=False)
+def gen_synthetic():
+    """13 régions × 130 semaines (~2.5 saisons) depuis le 2022-07-04 (lundi), générateur vectorisé."""
+    tables = synthetic_tables(n_regions=len(REGIONS), years=130 / 52, start="2022-07-04", seed=42)
+    tables["region_mapping"] = tables["region_mapping"][["region", "region_name"]]
+    for name, path in SYNTHETIC_FILES.items():
+        tables[name].to_csv(path, index=False)
+
+def quickstart_stages(capacity=120000):
+    """synthetic ➜ pipeline ➜ plan"""
+    def synthetic(results):
+        gen_synthetic()
+
+    def pipeline(results):
+        return run_pipeline()
+
+    def plan(results):
+        return make_plan(capacity=capacity)
+
+    return [
+        Stage("qs_synthetic", synthetic, outputs=list(SYNTHETIC_FILES.values()), code=[gen_synthetic, synthetic_tables]),
+        Stage("qs_pipeline", pipeline, inputs=[*SYNTHETIC_FILES.values(), *source_files()],
+              outputs=[FEATURES_PATH, METRICS_PATH, FORECAST_CAL_PATH], code=[run_pipeline],
+              params={"month": str(pd.Timestamp.now(tz="Europe/Paris").to_period("M"))}),
+        Stage("qs_plan", plan, inputs=[FORECAST_CAL_PATH], outputs=[REASSORT_CSV_PATH],
+              code=[make_plan], params={"capacity": capacity}),
+    ]
 
 def main():
-    gen_synthetic()
-    res = run_pipeline()
-    plan = make_plan(capacity=120000)
+    results, _ = run_dag(quickstart_stages(capacity=120000))
+    res = results["qs_pipeline"] or {"metrics": pd.read_csv(METRICS_PATH).head(10).to_dict(orient="records")}
+    plan = results["qs_plan"]
+    if plan is None:
+        plan = pd.read_csv(REASSORT_CSV_PATH)
     print("Aperçu métriques par série:", res["metrics"])
     print("Plan de réassort (dernière semaine):")
     print(plan.head())
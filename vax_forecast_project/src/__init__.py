@@ -0,0 +1,5 @@
+"""
+Package de la pipeline vaxfc (python -m src). Paquet régulier (et non namespace) : un autre
+répertoire src/ du sys.path ne s'y fusionne pas quand Prev_pharmacie importe src.csv_reader,
+src.geography et src.artifacts (vax_forecast_project sur le PYTHONPATH, cf. Prev_pharmacie/README.md).
+"""
@@ -0,0 +1,133 @@
+"""
+Artefacts inter-étapes en tables Arrow, partagés en mémoire dans le processus.
+- publish(path, df) : la table Arrow est gardée en mémoire (clé = chemin) et écrite sur disque
+  seulement si l'artefact doit persister (sortie d'étape du DAG, fichier consommé ailleurs) :
+  .parquet (sorties publiées), .arrow (Arrow IPC non compressé, intermédiaires de data/interim), .csv (exports)
+- table(path) / frame(path) : table en mémoire si le fichier n'a pas changé depuis (mtime, taille),
+  sinon relecture mappée en mémoire (parquet memory_map, IPC mmap ; CSV converti une fois en IPC
+  dans data/interim/arrow_cache puis mmap) ; pas de re-parsing par chaque étape consommatrice.
+- Tables Arrow immuables : partageables entre étapes parallèles ; frame() donne à chaque
+  consommateur son propre DataFrame (conversion mémoire, sans décodage ni IO).
+- df.attrs suivent la table (métadonnée PANDAS_ATTRS, la même que pandas.to_parquet / read_parquet).
+- pandas n'est pas importé ici (chargé par pyarrow à la conversion) : serve démarre sans lui.
+"""
+import hashlib
+import json
+import threading
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+from .config import INTERIM_DIR
+
+CACHE_DIR = INTERIM_DIR / "arrow_cache"
+ATTRS_KEY = b"PANDAS_ATTRS"
+
+_lock = threading.Lock()
+_tables = {}  # chemin -> (version du fichier ou None si non persisté, pa.Table)
+
+
+def file_version(path: Path):
+    st = Path(path).stat()
+    return (st.st_mtime_ns, st.st_size)
+
+
+def to_table(df) -> pa.Table:
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if df.attrs:
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                               ATTRS_KEY: json.dumps(df.attrs)})
+    return table
+
+
+def to_frame(table: pa.Table):
+    df = table.to_pandas()
+    meta = table.schema.metadata or {}
+    if ATTRS_KEY in meta:
+        df.attrs = json.loads(meta[ATTRS_KEY])
+    return df
+
+
+def _write_ipc(table: pa.Table, path: Path):
+    tmp = path.with_suffix(".tmp")
+    with pa.OSFile(tmp.as_posix(), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    tmp.replace(path)
+
+
+def _read_ipc(path: Path) -> pa.Table:
+    return pa.ipc.open_file(pa.memory_map(Path(path).as_posix(), "r")).read_all()
+
+
+def _csv_cache(path: Path, version, cache_dir: Path) -> Path:
+    tag = hashlib.sha1(Path(path).resolve().as_posix().encode()).hexdigest()[:8]
+    return Path(cache_dir) / f"{path.stem}.{tag}.{version[0]}.{version[1]}.arrow"
+
+
+def load_table(path: Path, cache_dir: Path = CACHE_DIR) -> pa.Table:
+    """
+    Parquet -> lecture mmap ; .arrow -> IPC mmap ; CSV -> cache Arrow IPC (une conversion par version) puis mmap.
+    cache_dir : répertoire du cache IPC des CSV (data/interim/arrow_cache de ce projet par défaut ;
+    un projet consommateur passe le sien).
+    """
+    path = Path(path)
+    if path.suffix == ".parquet":
+        return pq.read_table(path, memory_map=True)
+    if path.suffix == ".arrow":
+        return _read_ipc(path)
+    ipc = _csv_cache(path, file_version(path), cache_dir)
+    if not ipc.exists():
+        ipc.parent.mkdir(parents=True, exist_ok=True)
+        for old in ipc.parent.glob(f"{ipc.name.rsplit('.', 3)[0]}.*.arrow"):  # versions précédentes du CSV
+            old.unlink(missing_ok=True)
+        _write_ipc(pacsv.read_csv(path), ipc)
+    return _read_ipc(ipc)
+
+
+def publish(path: Path, df, persist: bool = True) -> pa.Table:
+    """Rend `df` disponible aux étapes suivantes sous `path` ; écrit le fichier si persist."""
+    path = Path(path)
+    table = to_table(df)
+    version = None
+    if persist:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.suffix == ".parquet":
+            pq.write_table(table, path)
+        elif path.suffix == ".arrow":
+            _write_ipc(table, path)
+        elif path.suffix == ".csv":
+            df.to_csv(path, index=False)  # hors processus : converti en IPC à la première lecture (load_table)
+        else:
+            raise ValueError(f"Format d'artefact non géré: {path.suffix}")
+        version = file_version(path)
+    with _lock:
+        _tables[path.as_posix()] = (version, table)
+    return table
+
+
+def table(path: Path) -> pa.Table:
+    """Table de l'artefact : mémoire si à jour, sinon relue (mmap) et gardée pour les lectures suivantes."""
+    path = Path(path)
+    key = path.as_posix()
+    with _lock:
+        entry = _tables.get(key)
+    if entry is not None:
+        version, t = entry
+        if version is None or (path.exists() and file_version(path) == version):
+            return t
+    version = file_version(path)
+    t = load_table(path)
+    with _lock:
+        _tables[key] = (version, t)
+    return t
+
+
+def frame(path: Path):
+    return to_frame(table(path))
+
+
+def clear():
+    with _lock:
+        _tables.clear()
@@ -0,0 +1,509 @@
+"""
+Backtest multi-origines, hors pipeline : compare des modèles (LightGBM global / par série, baselines,
+Prophet, ensembles pondérés) sur les mêmes origines, horizons et séries.
+- Modèles décrits par des ModelSpec ('nom=type:param=valeur,...') : hyperparamètres LightGBM réglables,
+  sans toucher à la pipeline (gbdt_demand garde les siens).
+- Table de features figée une fois en tableaux numpy (.npy) dans le dossier du run ; chaque cellule
+  (modèle, origine) s'exécute dans un processus qui les ouvre en mmap, en lecture seule (pages partagées).
+- Origine o : apprentissage sur les mois < o (cible observée), prévision des mois o .. o + H - 1 ;
+  step = 1 pour le mois de l'origine.
+- Features de la cible (doses_per_100k_lag* / _ma*) reconstruites depuis la cible dense : lagL = mois t - L,
+  maW = moyenne des mois t - W .. t - 1 (la table inclut le mois t lui-même dans ses moyennes mobiles).
+  Aux lignes à prévoir, elles ne lisent que l'historique < o complété des prévisions des pas précédents
+  (prévision récursive des LightGBM) : aucune valeur observée après l'origine.
+- Exogènes (incidence, température, urgences) : *_lag* / *_ma* de la table, valeurs observées y compris
+  après l'origine (exogènes « oracle », borne haute d'une prévision parfaite des exogènes).
+- Mois observés : jusqu'au dernier mois avec des doses (toutes séries) et avant le mois courant ;
+  au-delà, build_feature_table remplit 0 dose (y = 0) : cible NaN ici, ni apprise ni évaluée.
+- Séries évaluées à une origine : au moins `min_train` mois observés avant elle (les mêmes pour tous les modèles).
+- Prédictions stockées en parquet partitionné reports/backtests/<run>/predictions/model=<nom>/<origine>.parquet
+  [origin, date, step, *clés, y, yhat] ; une cellule déjà écrite n'est pas recalculée (run interrompu repris).
+  Ensembles : combinaison des prédictions stockées de leurs membres, sans réentraînement.
+- Classements (leaderboard) sur les cellules (origine, série, mois) prévues par TOUS les modèles.
+"""
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .config import PROCESSED_DIR, REPORTS_DIR
+from .models.gbdt_demand import _select_features
+from .norm_cache import file_digest
+from .tracing import span, traced
+from .utils import smape
+
+BACKTEST_DIR = REPORTS_DIR / "backtests"
+FEATURES_PATH = PROCESSED_DIR / "features.parquet"
+# mêmes valeurs que les modèles de validation de gbdt_demand
+LGBM_PARAMS = dict(random_state=123, n_estimators=500, learning_rate=0.05, max_depth=-1, num_leaves=31,
+                   subsample=0.9, colsample_bytree=0.9, verbose=-1)
+KINDS = ("lgbm_global", "lgbm_per_series", "seasonal_naive", "naive", "prophet", "ensemble")
+TARGET = "doses_per_100k"  # source des *_lag* / *_ma* de la cible dans la table
+PROTOCOL = "target-recursive/observed-months"  # run.json : prédictions d'un autre protocole non reprises
+COST = {"prophet": 3, "lgbm_per_series": 2, "lgbm_global": 1}  # cellules coûteuses soumises en premier
+
+
+# =========================
+# Modèles
+# =========================
+@dataclass
+class ModelSpec:
+    name: str
+    kind: str
+    params: dict = field(default_factory=dict)   # hyperparamètres (LightGBM, Prophet)
+    members: dict = field(default_factory=dict)  # ensemble : {nom du membre: poids}
+
+
+def _value(text: str):
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    return {"true": True, "false": False}.get(text.lower(), text)
+
+
+def parse_model(text: str) -> ModelSpec:
+    """
+    'type' ou 'nom=type' ou 'nom=type:n_estimators=300,learning_rate=0.03' ;
+    ensemble : 'nom=ensemble:lgbm_global=0.7,seasonal_naive=0.3' (noms des membres = poids).
+    """
+    head, _, spec = text.partition(":")
+    name, _, kind = head.rpartition("=")
+    name, kind = name or kind, kind
+    if kind not in KINDS:
+        raise ValueError(f"Modèle inconnu: {kind!r} ({', '.join(KINDS)})")
+    if not re.fullmatch(r"[\w.-]+", name):
+        raise ValueError(f"Nom de modèle invalide: {name!r} (lettres, chiffres, _ . -)")
+    kw = dict(item.partition("=")[::2] for item in spec.split(",")) if spec else {}
+    if kind == "ensemble":
+        if not kw:
+            raise ValueError(f"Ensemble {name!r} sans membres (nom=ensemble:membre=poids,...)")
+        return ModelSpec(name, kind, members={k: float(v) for k, v in kw.items()})
+    return ModelSpec(name, kind, params={k: _value(v) for k, v in kw.items()})
+
+
+# =========================
+# Tableau de features partagé
+# =========================
+@dataclass
+class FeatureArray:
+    X: np.ndarray             # [lignes, F + K] float32 : features puis codes des clés (catégorielles)
+    y: np.ndarray             # [lignes] float64, NaN hors historique
+    t: np.ndarray             # [lignes] int32 : indice du mois dans `months`
+    s: np.ndarray             # [lignes] int32 : indice de la série dans `series`
+    Y: np.ndarray             # [séries, mois] float64 : cible dense (baselines), NaN si non observée
+    columns: list             # noms des colonnes de X
+    keys: list
+    series: pd.DataFrame      # valeurs des clés (str) par série
+    months: pd.DatetimeIndex
+
+    @property
+    def n_features(self) -> int:
+        return len(self.columns) - len(self.keys)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, features=None) -> "FeatureArray":
+        """Table de features (attrs GROUP_COLS, FEATURE_COLS) ; NaN des features -> médiane de la série."""
+        keys = list(df.attrs.get("GROUP_COLS", ["region", "age_band"]))
+        features = _select_features(df, features)
+        df = df.sort_values([*keys, "date"]).reset_index(drop=True)
+        feats = df[features].fillna(df.groupby(keys)[features].transform("median"))
+        ser = pd.MultiIndex.from_frame(df[keys].astype(str))
+        codes, uniques = pd.factorize(ser, sort=True)
+        months = pd.DatetimeIndex(np.sort(df["date"].unique()))
+        t = months.get_indexer(df["date"]).astype(np.int32)
+        cat = np.column_stack([pd.factorize(df[k].astype(str), sort=True)[0] for k in keys])
+        X = np.column_stack([feats.to_numpy(dtype=np.float32), cat.astype(np.float32)])
+        y = df["y"].where(df["date"] <= _last_observed(df)).to_numpy(dtype=float)
+        Y = np.full((len(uniques), len(months)), np.nan)
+        Y[codes, t] = y
+        columns = [*features, *(f"{k}_cat" for k in keys)]
+        _fill_target(X, Y, codes, t, _target_columns(columns))
+        series = pd.DataFrame(list(uniques), columns=keys)
+        return cls(X, y, t, codes.astype(np.int32), Y, columns, keys, series, months)
+
+    def save(self, path: Path) -> Path:
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        for name in ("X", "y", "t", "s", "Y"):
+            np.save(path / f"{name}.npy", getattr(self, name))
+        meta = {"columns": self.columns, "keys": self.keys, "series": self.series.to_dict("list"),
+                "months": [str(m.date()) for m in self.months]}
+        (path / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+        return path
+
+    @classmethod
+    def open(cls, path: Path) -> "FeatureArray":
+        """Tableaux en mmap lecture seule : les processus d'un même run partagent les pages."""
+        path = Path(path)
+        meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+        arrays = {name: np.load(path / f"{name}.npy", mmap_mode="r") for name in ("X", "y", "t", "s", "Y")}
+        return cls(**arrays, columns=meta["columns"], keys=meta["keys"],
+                   series=pd.DataFrame(meta["series"]), months=pd.DatetimeIndex(meta["months"]))
+
+
+def _last_observed(df: pd.DataFrame) -> pd.Timestamp:
+    """Dernier mois réellement observé : dernier mois avec des doses (toutes séries), antérieur au mois courant."""
+    current = pd.Timestamp.now(tz="Europe/Paris").to_period("M").to_timestamp().tz_localize(None)
+    total = df.groupby("date")["doses" if "doses" in df.columns else "y"].sum(min_count=1)
+    with_doses = total.index[total.fillna(0) > 0]
+    last = with_doses.max() if len(with_doses) else current
+    return min(last, current - pd.offsets.MonthBegin(1))
+
+
+def _target_columns(columns) -> list:
+    """[(indice, "lag" | "ma", n)] des *_lag* / *_ma* de la cible parmi `columns`."""
+    found = (re.fullmatch(rf"{TARGET}_(lag|ma)(\d+)", c) for c in columns)
+    return [(j, m[1], int(m[2])) for j, m in enumerate(found) if m]
+
+
+def _fill_target(X, Y, s, t, cols):
+    """Colonnes `cols` des lignes (série s, mois t) de X depuis Y [séries, mois] ; NaN sans valeur."""
+    for j, kind, n in cols:
+        if kind == "lag":
+            X[:, j] = np.where(t >= n, Y[s, np.maximum(t - n, 0)], np.nan)
+        else:
+            win = t[:, None] + np.arange(-n, 0)[None, :]
+            vals = np.where(win >= 0, Y[s[:, None], np.maximum(win, 0)], np.nan)
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)  # fenêtre vide -> NaN
+                X[:, j] = np.nanmean(vals, axis=1)
+
+
+def _recursive(A, rows, origin, predict):
+    """
+    Prévision pas à pas des lignes `rows` (mois >= origin) : avant chaque mois, les features de la cible
+    sont recalculées depuis l'historique < origin complété des prévisions des mois précédents.
+    """
+    cols = _target_columns(A.columns)
+    Yh = np.array(A.Y)
+    Yh[:, origin:] = np.nan
+    s, t = A.s[rows], A.t[rows]
+    X = np.array(A.X[rows])
+    out = np.full(len(rows), np.nan)
+    for month in np.unique(t):
+        m = t == month
+        Xm = X[m]
+        _fill_target(Xm, Yh, s[m], t[m], cols)
+        out[m] = predict(Xm)
+        Yh[s[m], month] = out[m]
+    return out
+
+
+# =========================
+# Prévisionnistes : (A, lignes d'apprentissage, lignes à prévoir, origine, **params) -> yhat
+# =========================
+def _lgbm(params):
+    from lightgbm import LGBMRegressor
+    return LGBMRegressor(**{**LGBM_PARAMS, **params})
+
+
+def _lgbm_global(A, train, test, origin, **params):
+    """Un modèle pour toutes les séries, clés en catégorielles natives (cf. global_rolling_cv_fit_predict)."""
+    model = _lgbm(params)
+    model.fit(A.X[train], A.y[train], categorical_feature=list(range(A.n_features, A.X.shape[1])))
+    return _recursive(A, test, origin, model.predict)
+
+
+def _lgbm_per_series(A, train, test, origin, **params):
+    """Un modèle par série (cf. rolling_cv_fit_predict) ; cible constante -> sa valeur."""
+    F = A.n_features
+    out = np.full(len(test), np.nan)
+    s_train, s_test = A.s[train], A.s[test]
+    for s in np.unique(s_test):
+        tr, te = train[s_train == s], s_test == s
+        y = A.y[tr]
+        if np.std(y) < 1e-6:
+            out[te] = y[-1]
+            continue
+        model = _lgbm(params)
+        model.fit(A.X[tr, :F], y)
+        out[te] = _recursive(A, test[te], origin, lambda X: model.predict(X[:, :F]))
+    return out
+
+
+def _last(A, series, origin, n):
+    """Moyenne des n dernières valeurs observées avant l'origine, par série."""
+    out = np.empty(len(series))
+    for i, s in enumerate(series):
+        hist = A.Y[s, :origin]
+        out[i] = hist[~np.isnan(hist)][-n:].mean()
+    return out
+
+
+def _seasonal_naive(A, train, test, origin):
+    """Valeur 12 mois plus tôt si connue à l'origine, sinon moyenne des 3 derniers mois (cf. seasonal_naive_future)."""
+    s, t = A.s[test], A.t[test]
+    lag12 = np.where(t - 12 >= 0, A.Y[s, np.maximum(t - 12, 0)], np.nan)
+    lag12[t - 12 >= origin] = np.nan
+    series, inv = np.unique(s, return_inverse=True)
+    return np.where(np.isnan(lag12), _last(A, series, origin, 3)[inv], lag12)
+
+
+def _naive(A, train, test, origin):
+    """Dernière valeur observée avant l'origine."""
+    series, inv = np.unique(A.s[test], return_inverse=True)
+    return _last(A, series, origin, 1)[inv]
+
+
+def _prophet(A, train, test, origin, **params):
+    """Prophet par série (saisonnalité annuelle) sur l'historique mensuel avant l'origine."""
+    import logging
+    from prophet import Prophet  # dépendance optionnelle, import différé : plusieurs secondes
+    logging.getLogger("cmdstanpy").disabled = True  # une ligne INFO par ajustement sinon
+    kw = {"yearly_seasonality": True, "weekly_seasonality": False, "daily_seasonality": False, **params}
+    out = np.full(len(test), np.nan)
+    s_train, s_test = A.s[train], A.s[test]
+    for s in np.unique(s_test):
+        tr, te = train[s_train == s], s_test == s
+        m = Prophet(**kw)
+        m.fit(pd.DataFrame({"ds": A.months[A.t[tr]], "y": A.y[tr]}))
+        out[te] = m.predict(pd.DataFrame({"ds": A.months[A.t[test[te]]]}))["yhat"].to_numpy()
+    return out
+
+
+FORECASTERS = {"lgbm_global": _lgbm_global, "lgbm_per_series": _lgbm_per_series,
+               "seasonal_naive": _seasonal_naive, "naive": _naive, "prophet": _prophet}
+
+
+# =========================
+# Cellules (modèle, origine)
+# =========================
+_ARRAY = None  # FeatureArray du processus (ouvert par _init_worker)
+
+
+def _init_worker(array_dir: str):
+    global _ARRAY
+    _ARRAY = FeatureArray.open(array_dir)
+
+
+def _cell_rows(A, origin: int, horizon: int, min_train: int):
+    """Lignes d'apprentissage et à prévoir d'une origine (séries avec >= min_train mois observés avant elle)."""
+    observed = ~np.isnan(A.y)
+    n_train = np.count_nonzero(~np.isnan(A.Y[:, :origin]), axis=1)
+    ok = (n_train >= max(min_train, 1))[A.s]
+    train = np.flatnonzero(observed & ok & (A.t < origin))
+    test = np.flatnonzero(observed & ok & (A.t >= origin) & (A.t < origin + horizon))
+    return train, test
+
+
+def _write_parquet(df: pd.DataFrame, path: Path):
+    """Écriture atomique : un fichier présent est toujours complet (reprise d'un run interrompu)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def _run_cell(spec: ModelSpec, origin: int, horizon: int, min_train: int, path: str, params: dict) -> dict:
+    A = _ARRAY
+    t0 = time.perf_counter()
+    rec = {"model": spec.name, "origin": str(A.months[origin].date())}
+    try:
+        train, test = _cell_rows(A, origin, horizon, min_train)
+        yhat = FORECASTERS[spec.kind](A, train, test, origin, **params) if len(test) else np.empty(0)
+        out = A.series.iloc[A.s[test]].reset_index(drop=True)
+        out.insert(0, "step", (A.t[test] - origin + 1).astype(np.int8))
+        out.insert(0, "date", A.months[A.t[test]])
+        out.insert(0, "origin", A.months[origin])
+        out["y"], out["yhat"] = A.y[test], np.asarray(yhat, dtype=float)
+        _write_parquet(out, Path(path))
+        rec.update(status="ok", rows=len(out))
+    except Exception as e:
+        rec.update(status="error", rows=0, error=f"{type(e).__name__}: {e}")
+    rec["seconds"] = round(time.perf_counter() - t0, 3)
+    return rec
+
+
+def default_origins(A: FeatureArray, horizon: int, n: int = 12, every: int = 1, min_train: int = 12) -> list:
+    """Les `n` dernières origines (espacées de `every` mois) dont l'horizon complet est observé."""
+    last = int(A.t[~np.isnan(A.y)].max()) - horizon + 1
+    return [o for o in range(last - (n - 1) * every, last + 1, every) if o >= min_train]
+
+
+# =========================
+# Stockage et classements
+# =========================
+def _cell_path(run_dir: Path, model: str, month) -> Path:
+    return run_dir / "predictions" / f"model={model}" / f"{pd.Timestamp(month):%Y-%m}.parquet"
+
+
+def read_predictions(run_dir: Path, models=None) -> pd.DataFrame:
+    """Prédictions stockées [model, origin, date, step, *clés, y, yhat] (tous modèles par défaut)."""
+    import pyarrow.dataset as ds
+    path = Path(run_dir) / "predictions"
+    if not path.exists():
+        return pd.DataFrame()
+    data = ds.dataset(path, format="parquet", partitioning="hive")
+    flt = ds.field("model").isin(list(models)) if models else None
+    return data.to_table(filter=flt).to_pandas()
+
+
+def _ensemble(run_dir: Path, spec: ModelSpec, keys: list, origins: list) -> list:
+    """Combinaison pondérée des prédictions stockées des membres, par origine (cellules communes aux membres)."""
+    on = ["origin", "date", "step", *keys, "y"]
+    recs = []
+    for month in origins:
+        path = _cell_path(run_dir, spec.name, month)
+        if path.exists():
+            continue
+        t0 = time.perf_counter()
+        parts = [pd.read_parquet(_cell_path(run_dir, m, month)).rename(columns={"yhat": m})
+                 for m in spec.members if _cell_path(run_dir, m, month).exists()]
+        if len(parts) < len(spec.members):
+            recs.append({"model": spec.name, "origin": f"{month:%Y-%m-%d}", "status": "error", "rows": 0,
+                         "error": "prédictions de membres absentes"})
+            continue
+        out = parts[0]
+        for p in parts[1:]:
+            out = out.merge(p, on=on)
+        out["yhat"] = sum(w * out[m] for m, w in spec.members.items())
+        out = out.drop(columns=list(spec.members))
+        _write_parquet(out, path)
+        recs.append({"model": spec.name, "origin": f"{month:%Y-%m-%d}", "status": "ok", "rows": len(out),
+                     "seconds": round(time.perf_counter() - t0, 3)})
+    return recs
+
+
+def _scores(g: pd.DataFrame) -> pd.Series:
+    err = g["yhat"] - g["y"]
+    return pd.Series({"n": len(g), "SMAPE": smape(g["y"], g["yhat"]), "MAE": err.abs().mean(),
+                      "RMSE": np.sqrt((err ** 2).mean()), "bias": err.mean()})
+
+
+def leaderboard(preds: pd.DataFrame, keys: list, by=()) -> pd.DataFrame:
+    """
+    SMAPE / MAE / RMSE / biais par modèle (et par `by` : step, origin, clés...) sur les cellules
+    (origine, mois, série) prévues par tous les modèles ; rang 1 = meilleur SMAPE du groupe.
+    """
+    by = list(by)
+    cols = ["model", *by, "n", "SMAPE", "MAE", "RMSE", "bias", "rank"]
+    preds = preds[np.isfinite(preds["yhat"])]
+    if preds.empty:
+        return pd.DataFrame(columns=cols)
+    cell = ["origin", "date", *keys]
+    n_models = preds["model"].nunique()
+    common = preds.groupby(cell, observed=True)["model"].transform("nunique") == n_models
+    board = (preds[common].groupby(["model", *by], observed=True)[["y", "yhat"]]
+             .apply(_scores).reset_index())
+    board["n"] = board["n"].astype(int)
+    board["rank"] = board.groupby(by)["SMAPE"].rank(method="min").astype(int) if by else \
+        board["SMAPE"].rank(method="min").astype(int)
+    return board.sort_values([*by, "rank"]).reset_index(drop=True)[cols]
+
+
+# =========================
+# Run
+# =========================
+def _digest(features) -> str:
+    if isinstance(features, pd.DataFrame):
+        return f"frame:{pd.util.hash_pandas_object(features, index=False).sum():x}"
+    return file_digest(features)["sha256"]
+
+
+def _prepare_run(run_dir: Path, digest: str, horizon: int, min_train: int, specs: list, reset: bool):
+    """run.json du run ; prédictions d'un modèle dont la spec a changé supprimées (recalculées)."""
+    meta_path = run_dir / "run.json"
+    if reset and run_dir.exists():
+        shutil.rmtree(run_dir)
+    meta = json.loads(meta_path.read_text(encoding="utf-8")) if meta_path.exists() else {}
+    setup = {"features": digest, "horizon": horizon, "min_train": min_train, "protocol": PROTOCOL}
+    if meta and {k: meta.get(k) for k in setup} != setup:
+        raise ValueError(f"Run {run_dir.name!r} calculé avec d'autres features / horizon / min_train / protocole : "
+                         "choisir un autre nom ou --reset")
+    models = meta.get("models", {})
+    for spec in specs:
+        if spec.name in models and models[spec.name] != asdict(spec):
+            shutil.rmtree(run_dir / "predictions" / f"model={spec.name}", ignore_errors=True)
+        models[spec.name] = asdict(spec)
+    run_dir.mkdir(parents=True, exist_ok=True)
+    meta_path.write_text(json.dumps({**setup, "models": models}, indent=1), encoding="utf-8")
+
+
+@traced("backtest.run")
+def run_backtest(models, origins=None, horizon: int = 6, n_origins: int = 12, every: int = 1,
+                 min_train: int = 12, workers: int | None = None, name: str = "default",
+                 features=FEATURES_PATH, out_dir: Path = BACKTEST_DIR, reset: bool = False) -> pd.DataFrame:
+    """
+    models : ModelSpec ou textes parse_model ; origins : mois ('2025-10' ou Timestamp), défaut
+    default_origins ; workers : processus (défaut : nombre de CPU ; 1 = dans le processus courant) ;
+    features : chemin de la table ou DataFrame. Écrit dans out_dir/<name>/ : predictions/ (parquet
+    partitionné), cells.jsonl (statut et durée de chaque cellule), leaderboard*.csv.
+    Retourne le classement global.
+    """
+    specs = [parse_model(m) if isinstance(m, str) else m for m in models]
+    names = [s.name for s in specs]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Noms de modèles en double : {names}")
+    for s in specs:
+        missing = set(s.members) - {m.name for m in specs if m.kind != "ensemble"}
+        if missing:
+            raise ValueError(f"Ensemble {s.name!r} : membres absents de la liste des modèles {sorted(missing)}")
+    run_dir = Path(out_dir) / name
+    frame = features if isinstance(features, pd.DataFrame) else pd.read_parquet(features)
+    _prepare_run(run_dir, _digest(features), horizon, min_train, specs, reset)
+
+    with span("backtest.array") as sp:
+        A = FeatureArray.from_frame(frame)
+        array_dir = A.save(run_dir / "array")
+        sp.rows(frame)
+    if origins is None:
+        origins = default_origins(A, horizon, n_origins, every, min_train)
+    else:
+        origins = [int(A.months.get_loc(pd.Timestamp(o).to_period("M").to_timestamp())) for o in origins]
+
+    workers = workers or os.cpu_count() or 1
+    cells = [(spec, o) for spec in specs if spec.kind != "ensemble" for o in origins
+             if not _cell_path(run_dir, spec.name, A.months[o]).exists()]
+    cells.sort(key=lambda c: -COST.get(c[0].kind, 0))
+    threads = max(1, (os.cpu_count() or 1) // workers)  # LightGBM : pas de sur-souscription des coeurs
+
+    def args(spec, o):
+        params = {"n_jobs": threads, **spec.params} if spec.kind.startswith("lgbm") else spec.params
+        return spec, o, horizon, min_train, str(_cell_path(run_dir, spec.name, A.months[o])), params
+
+    log = open(run_dir / "cells.jsonl", "a", encoding="utf-8")
+
+    def done(rec, k):
+        log.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        log.flush()
+        msg = f"{rec['rows']} lignes" if rec["status"] == "ok" else rec["error"]
+        print(f"[backtest] {k}/{len(cells)} {rec['model']} {rec['origin'][:7]} {rec['status']} : "
+              f"{msg} ({rec.get('seconds', 0):.1f}s)")
+
+    with span("backtest.cells", cells=len(cells), workers=workers), log:
+        if workers <= 1:
+            _init_worker(str(array_dir))
+            for k, (spec, o) in enumerate(cells, 1):
+                done(_run_cell(*args(spec, o)), k)
+        elif cells:
+            # spawn : processus neufs (pas de fork d'un parent ayant déjà lancé OpenMP / LightGBM)
+            with ProcessPoolExecutor(min(workers, len(cells)), mp_context=multiprocessing.get_context("spawn"),
+                                     initializer=_init_worker, initargs=(str(array_dir),)) as ex:
+                futures = [ex.submit(_run_cell, *args(spec, o)) for spec, o in cells]
+                for k, fut in enumerate(as_completed(futures), 1):
+                    done(fut.result(), k)
+        for spec in specs:
+            if spec.kind == "ensemble":
+                for rec in _ensemble(run_dir, spec, A.keys, [A.months[o] for o in origins]):
+                    log.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+    with span("backtest.leaderboard"):
+        months = set(A.months[origins])
+        preds = read_predictions(run_dir, names)
+        preds = preds[preds["origin"].isin(months)] if not preds.empty else preds
+        boards = {suffix: leaderboard(preds, A.keys, by) for suffix, by in
+                  (("", ()), ("_by_step", ("step",)), ("_by_origin", ("origin",)))}
+        for suffix, board in boards.items():
+            board.to_csv(run_dir / f"leaderboard{suffix}.csv", index=False)
+    return boards[""]
@@ -0,0 +1,173 @@
+"""
+CLI vaxfc (python -m src <commande>) :
+  features  table de features mensuelle (data/processed/features.parquet)
+  train     pipeline mensuelle en DAG (région / département) ou maille pharmacie
+  nowcast   intègre les nouvelles semaines Sentinelles / OSCOUR et re-score l'horizon (sans réentraîner)
+  scenarios prévisions what-if (épidémie précoce / tardive / sévère...) en un cube scénario × série × mois
+  backtest  comparaison de modèles sur plusieurs origines (cellules en parallèle, classements)
+  plan      plan de réassort par PL (capacité totale)
+  allocate  répartition par pharmacie + simulation de stock (Prev_pharmacie/fusion_previs.py)
+  serve     service HTTP de requêtes sur les sorties
+Seule la bibliothèque standard est importée ici : chaque sous-commande importe ses dépendances
+(pandas, LightGBM, MLflow, pulp, pyarrow) au moment de s'exécuter, donc `--help` et les erreurs
+d'arguments répondent sans les charger.
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+PHARMA_DIR = BASE_DIR.parent / "Prev_pharmacie"
+GRANULARITY_CHOICES = ("region", "departement", "pharmacie")
+
+
+def _set_env(args):
+    # lus à l'import de src.config / dans pipeline_stages : à poser avant les imports différés
+    if getattr(args, "granularity", None):
+        os.environ["FORECAST_GRANULARITY"] = args.granularity
+    if getattr(args, "horizon", None):
+        os.environ["FORECAST_HORIZON_MONTHS"] = str(args.horizon)
+
+
+def cmd_features(args):
+    from .feature_engineering import build_feature_table
+    X = build_feature_table(save=not args.no_save, granularity=args.granularity)
+    print(f"features: {len(X)} lignes × {X.shape[1]} colonnes (maille {X.attrs['GRANULARITY']})")
+
+
+def cmd_train(args):
+    from . import train_pipeline
+    if train_pipeline.GRANULARITY == "pharmacie":
+        print(train_pipeline.run_pipeline_pharmacies())
+    else:
+        force = True if args.force == [] else (args.force or ())
+        print(train_pipeline.run_pipeline_ensemble(only=args.only, force=force, max_workers=args.workers))
+
+
+def cmd_nowcast(args):
+    from .nowcast import NowcastState
+    from .reassort import next_month
+    state = NowcastState.from_pipeline() if args.reset else NowcastState.load()
+    if state.horizon_start != next_month():
+        print(f"[nowcast] état du run mensuel prévoyant à partir de {state.horizon_start:%Y-%m} : relancer `vaxfc train`")
+    fc = state.update_files(sentinelles=args.sentinelles, oscour=args.oscour)
+    state.save()
+    out = state.publish()
+    u = state.last_update
+    print(f"nowcast au {state.asof:%Y-%m-%d} : {u['weeks']} semaine(s) reçue(s), {u['series']} série(s) "
+          f"re-scorée(s) en {u['seconds']:.2f}s -> {out} ({len(fc)} lignes)")
+
+
+def cmd_scenarios(args):
+    from . import artifacts
+    from .nowcast import NowcastState
+    from .scenarios import PRESETS, parse_scenario, scenario_cube
+    cube = scenario_cube(NowcastState.load(), [parse_scenario(s) for s in (args.scenario or PRESETS)])
+    artifacts.publish(args.out, cube.to_frame())
+    print(f"doses prévues par scénario (toutes séries) -> {args.out}")
+    print(cube.doses().round(0).to_string())
+
+
+def cmd_backtest(args):
+    from .backtest import run_backtest
+    board = run_backtest(args.model, origins=args.origins, horizon=args.horizon, n_origins=args.n_origins,
+                         every=args.every, min_train=args.min_train, workers=args.workers, name=args.name,
+                         features=args.features, reset=args.reset)
+    print(board.to_string(index=False))
+
+
+def cmd_plan(args):
+    from .opt.plan_reassort import make_plan
+    print(make_plan(capacity=args.capacity).to_string(index=False))
+
+
+def cmd_allocate(args):
+    sys.path.insert(0, str(PHARMA_DIR))
+    from fusion_previs import main as allocate
+    allocate(forecast_path=args.forecast, pharma_path=args.pharma, communes_path=args.communes,
+             out_dir=args.out_dir)
+
+
+def cmd_serve(args):
+    from . import serve
+    serve.main(["--host", args.host, "--port", str(args.port), "--cache-size", str(args.cache_size),
+                "--reload-every", str(args.reload_every)])
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(prog="vaxfc", description="Prévision de la demande vaccinale & réassort")
+    sub = ap.add_subparsers(dest="command", required=True, metavar="COMMANDE")
+
+    p = sub.add_parser("features", help="construit la table de features")
+    p.add_argument("--granularity", choices=GRANULARITY_CHOICES[:2], help="défaut : env FORECAST_GRANULARITY")
+    p.add_argument("--no-save", action="store_true", help="n'écrit pas features.parquet")
+    p.set_defaults(func=cmd_features)
+
+    p = sub.add_parser("train", help="pipeline features ➜ modèles ➜ calibration ➜ exports")
+    p.add_argument("--granularity", choices=GRANULARITY_CHOICES, help="défaut : env FORECAST_GRANULARITY")
+    p.add_argument("--horizon", type=int, help="mois prévus (défaut : env FORECAST_HORIZON_MONTHS ou 6)")
+    p.add_argument("--only", nargs="+", metavar="ETAPE",
+                   help="étapes visées (et leur amont si périmé) : features lgbm baseline ensemble calibrate reassort")
+    p.add_argument("--force", nargs="*", metavar="ETAPE", help="ré-exécute ces étapes même à jour (sans nom : toutes)")
+    p.add_argument("--workers", type=int, default=2, help="étapes exécutées en parallèle")
+    p.set_defaults(func=cmd_train)
+
+    p = sub.add_parser("nowcast", help="nouvelles semaines Sentinelles / OSCOUR ➜ prévision re-scorée")
+    p.add_argument("--sentinelles", type=Path, help="semaines Sentinelles reçues (format sentinelles_norm)")
+    p.add_argument("--oscour", type=Path, help="semaines OSCOUR reçues (format oscour_norm)")
+    p.add_argument("--reset", action="store_true", help="repart des sorties du dernier run mensuel")
+    p.set_defaults(func=cmd_nowcast)
+
+    p = sub.add_parser("scenarios", help="prévisions what-if sur des trajectoires d'incidence / température")
+    p.add_argument("--scenario", nargs="+", metavar="SCENARIO",
+                   help="presets (central early late severe mild) ou nom:scale=1.3,shift=1,tmean=-0.5 "
+                        "(défaut : tous les presets)")
+    p.add_argument("--out", type=Path, default=BASE_DIR / "data" / "processed" / "forecast_scenarios.parquet")
+    p.set_defaults(func=cmd_scenarios)
+
+    p = sub.add_parser("backtest", help="backtest multi-origines de plusieurs modèles ➜ classements")
+    p.add_argument("--model", nargs="+", metavar="MODELE",
+                   default=["lgbm_global", "seasonal_naive", "naive", "ens=ensemble:lgbm_global=0.7,seasonal_naive=0.3"],
+                   help="type, nom=type ou nom=type:param=valeur,... (lgbm_global lgbm_per_series seasonal_naive naive "
+                        "prophet) ; ensemble : nom=ensemble:membre=poids,...")
+    p.add_argument("--origins", nargs="+", metavar="AAAA-MM", help="origines (défaut : les --n-origins dernières)")
+    p.add_argument("--n-origins", type=int, default=12)
+    p.add_argument("--every", type=int, default=1, help="mois entre deux origines par défaut")
+    p.add_argument("--horizon", type=int, default=6, help="mois prévus par origine")
+    p.add_argument("--min-train", type=int, default=12, help="mois observés requis avant l'origine")
+    p.add_argument("--workers", type=int, help="processus (défaut : nombre de CPU)")
+    p.add_argument("--name", default="default", help="run (reports/backtests/<nom>/, repris s'il existe)")
+    p.add_argument("--features", type=Path, default=BASE_DIR / "data" / "processed" / "features.parquet")
+    p.add_argument("--reset", action="store_true", help="efface les prédictions du run avant de commencer")
+    p.set_defaults(func=cmd_backtest)
+
+    p = sub.add_parser("plan", help="plan de réassort par région (PL sous capacité)")
+    p.add_argument("--capacity", type=float, default=50000, help="doses disponibles au total")
+    p.set_defaults(func=cmd_plan)
+
+    p = sub.add_parser("allocate", help="répartition par pharmacie + simulation de stock")
+    p.add_argument("--forecast", default=BASE_DIR / "data" / "processed" / "reassort_plan_from_latest.csv",
+                   type=Path, help="export de la pipeline (défaut : data/processed/reassort_plan_from_latest.csv)")
+    p.add_argument("--pharma", default=PHARMA_DIR / "data" / "processed" / "pharma_clean.csv", type=Path)
+    p.add_argument("--communes", default=PHARMA_DIR / "data" / "raw" / "communes-france-2025.csv", type=Path)
+    p.add_argument("--out-dir", default=PHARMA_DIR, type=Path, help="défaut : Prev_pharmacie/ (lu par serve)")
+    p.set_defaults(func=cmd_allocate)
+
+    p = sub.add_parser("serve", help="service HTTP de requêtes (prévisions, réassort, stocks)")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--cache-size", type=int, default=512)
+    p.add_argument("--reload-every", type=float, default=2.0)
+    p.set_defaults(func=cmd_serve)
+    return ap
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    _set_env(args)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
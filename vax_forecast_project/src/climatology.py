@@ -0,0 +1,104 @@
+"""
+Climatologies région × période (semaine ISO ou mois) partagées par les loaders
+(data_ingestion : futur Sentinelles / météo) et par feature_engineering (complétion de la grille).
+- profil : UNE agrégation groupby (region, période) pour toutes les régions
+- tendance récente : ratio (n dernières valeurs) / (climatologie correspondante), borné, en un passage
+- cache par version de la source (empreinte du contenu) : un même historique n'est agrégé qu'une fois
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+PERIODS = {
+    "week": lambda d: d.dt.isocalendar().week.astype(int),
+    "month": lambda d: d.dt.month.astype(int),
+}
+CACHE_SIZE = 32
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def _fingerprint(hist: pd.DataFrame, value_col: str) -> int:
+    """Version du contenu (region, date, valeur) : change dès qu'une ligne change."""
+    h = pd.util.hash_pandas_object(hist[["region", "date", value_col]], index=False).to_numpy()
+    return hash((len(h), int(h.sum(dtype=np.uint64)), int(np.bitwise_xor.reduce(h)) if len(h) else 0))
+
+
+def _cached(kind, hist, value_col, params, compute):
+    key = (kind, value_col, params, _fingerprint(hist, value_col))
+    with _lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    out = compute()
+    with _lock:
+        _cache[key] = out
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return out
+
+
+def profile(hist: pd.DataFrame, value_col: str, period: str = "month") -> pd.DataFrame:
+    """Moyenne par (region, période) -> [region, period, clim]."""
+    def compute():
+        p = PERIODS[period](hist["date"])
+        return (hist.groupby([hist["region"], p.rename("period")])[value_col]
+                    .mean().rename("clim").reset_index())
+    return _cached("profile", hist, value_col, period, compute)
+
+
+def trend_factors(hist: pd.DataFrame, value_col: str, period: str = "week",
+                  last_n: int = 8, bounds=(0.7, 1.3)) -> pd.Series:
+    """
+    Facteur de tendance par région = moyenne des `last_n` dernières valeurs / moyenne de la
+    climatologie aux mêmes périodes (1.0 si non calculable), borné à `bounds`.
+    """
+    def compute():
+        clim = profile(hist, value_col, period)
+        tail = hist.sort_values(["region", "date"]).groupby("region").tail(last_n)
+        tail = tail.assign(period=PERIODS[period](tail["date"])).merge(clim, on=["region", "period"], how="left")
+        num = tail.groupby("region")[value_col].mean()
+        den = tail["clim"].replace(0, np.nan).groupby(tail["region"]).mean()
+        ratio = (num / den).where(den > 0).fillna(1.0)
+        return ratio.clip(*bounds).rename("trend")
+    return _cached("trend", hist, value_col, (period, last_n, tuple(bounds)), compute)
+
+
+def project(hist: pd.DataFrame, value_col: str, grid: pd.DataFrame, period: str = "month",
+            trend: pd.Series | None = None) -> pd.Series:
+    """
+    Valeurs climatologiques (× tendance éventuelle) pour une grille [region, date].
+    Période sans climatologie -> moyenne des valeurs projetées de la région.
+    """
+    clim = profile(hist, value_col, period)
+    g = grid[["region", "date"]].assign(period=PERIODS[period](grid["date"]))
+    vals = g.merge(clim, on=["region", "period"], how="left")["clim"]
+    vals = vals.fillna(vals.groupby(g["region"].to_numpy()).transform("mean"))
+    if trend is not None:
+        vals = vals * g["region"].map(trend).fillna(1.0).to_numpy()
+    return pd.Series(vals.to_numpy(), index=grid.index, name=value_col)
+
+
+def extend_future(hist: pd.DataFrame, value_col: str, future_dates, period: str = "month",
+                  trend: pd.Series | None = None) -> pd.DataFrame:
+    """Historique + dates futures (toutes régions de l'historique) projetées par climatologie."""
+    future_dates = pd.DatetimeIndex(future_dates)
+    if not len(future_dates):
+        return hist
+    regions = hist["region"].unique()
+    fut = pd.MultiIndex.from_product([future_dates, regions], names=["date", "region"]).to_frame(index=False)
+    fut[value_col] = project(hist, value_col, fut, period, trend)
+    return pd.concat([hist, fut[["date", "region", value_col]]], ignore_index=True).sort_values(["region", "date"])
+
+
+def fill_grid(hist: pd.DataFrame, value_col: str, regions, dates, period: str = "month") -> pd.DataFrame:
+    """Grille complète region × date : valeur observée, sinon climatologie (région × période)."""
+    grid = pd.MultiIndex.from_product([regions, dates], names=["region", "date"]).to_frame(index=False)
+    out = grid.merge(hist[["region", "date", value_col]], on=["region", "date"], how="left")
+    clim = profile(hist, value_col, period)
+    fill = grid.assign(period=PERIODS[period](grid["date"])).merge(clim, on=["region", "period"], how="left")["clim"]
+    out[value_col] = out[value_col].fillna(fill)
+    return out[["date", "region", value_col]]
@@ -2,6 +2,7 @@
 Configuration centrale du projet.
 Toutes les routes et constantes sont définies ici.
 """
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parents[1]  # dossier racine (un cran au-dessus de src)
@@ -20,6 +21,11 @@ REGIONS = ["IDF","CVL","BFC","NAQ","OCC","PAC","ARA","HDF","NOR","BRE","PDL","CO
 AGE_BANDS = ["0-17","18-64","65+"]  # exemples
 FREQ = "W-MON"  # hebdo (semaine finissant le lundi)
 
+# Maille des séries prévues : "region" (région × âge) ou "departement" (département × âge) ;
+# "pharmacie" : pipeline dédiée (train_pipeline.run_pipeline_pharmacies), hors table de features
+GRANULARITIES = {"region": ["region"], "departement": ["region", "dep"]}
+GRANULARITY = os.environ.get("FORECAST_GRANULARITY", "region")
+
 # Pour MLflow (modifiable)
 MLFLOW_TRACKING_URI = (BASE_DIR / "mlruns").as_posix()
 EXPERIMENT_NAME = "vax_demand_forecast"
@@ -0,0 +1,141 @@
+"""
+Lecture CSV rapide avec détection du "dialecte" (encodage + séparateur) sur les premiers Ko.
+Remplace les boucles essai/erreur (4 encodages x 4 séparateurs en engine="python", ou ';' puis ',')
+par UNE lecture avec le moteur C (ou pyarrow).
+Le profil détecté est mis en cache par fichier (chemin + taille + mtime) dans un fichier
+.csv_profiles.json placé à côté du CSV : les exécutions suivantes ne re-sniffent pas.
+Utilisé par download_open_data, data_ingestion et Prev_pharmacie (fusion_previs, trans).
+"""
+import csv
+import json
+import os
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+SAMPLE_BYTES = 64 * 1024
+CANDIDATE_SEPS = [",", ";", "\t", "|"]
+PROFILE_CACHE_NAME = ".csv_profiles.json"
+
+_lock = threading.Lock()
+_mem_cache = {}  # (path, size, mtime_ns) -> profil
+
+
+def _stat_key(path: Path):
+    st = path.stat()
+    return (path.resolve().as_posix(), st.st_size, st.st_mtime_ns)
+
+
+def _detect_encoding(raw: bytes) -> str:
+    if raw.startswith(b"\xef\xbb\xbf"):
+        return "utf-8-sig"
+    # l'échantillon peut couper un caractère multi-octets : on tolère la fin
+    for enc in ("utf-8", "cp1252"):
+        try:
+            raw[:-4].decode(enc) if len(raw) == SAMPLE_BYTES else raw.decode(enc)
+            return enc
+        except UnicodeDecodeError:
+            continue
+    return "latin-1"
+
+
+def _detect_sep(text: str, truncated: bool = False) -> str:
+    lines = text.splitlines()
+    if truncated and len(lines) > 2:
+        lines = lines[:-1]  # dernière ligne coupée par l'échantillon
+    lines = [l for l in lines[:50] if l.strip()]
+    sample = "\n".join(lines)
+    try:
+        return csv.Sniffer().sniff(sample, delimiters="".join(CANDIDATE_SEPS)).delimiter
+    except csv.Error:
+        pass
+    # Repli: séparateur le plus fréquent dans l'en-tête et stable sur les lignes suivantes
+    header = lines[0] if lines else ""
+    best, best_score = ",", -1
+    for sep in CANDIDATE_SEPS:
+        n = next(csv.reader([header], delimiter=sep), [])
+        counts = [len(r) for r in csv.reader(lines[1:20], delimiter=sep)]
+        stable = all(c == len(n) for c in counts) if counts else True
+        score = (len(n) - 1) * (2 if stable else 1)
+        if score > best_score:
+            best, best_score = sep, score
+    return best
+
+
+def sniff_profile(path) -> dict:
+    """Détecte {encoding, sep} d'un CSV à partir de ses premiers Ko."""
+    path = Path(path)
+    with open(path, "rb") as f:
+        raw = f.read(SAMPLE_BYTES)
+    enc = _detect_encoding(raw)
+    text = raw.decode(enc, errors="ignore")
+    return {"encoding": enc, "sep": _detect_sep(text, truncated=len(raw) == SAMPLE_BYTES)}
+
+
+def _disk_cache_path(path: Path) -> Path:
+    return path.parent / PROFILE_CACHE_NAME
+
+
+def _load_disk_cache(path: Path) -> dict:
+    try:
+        return json.loads(_disk_cache_path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_disk_cache(path: Path, entries: dict):
+    tmp = _disk_cache_path(path).with_suffix(f".{os.getpid()}.tmp")
+    try:
+        tmp.write_text(json.dumps(entries, indent=1), encoding="utf-8")
+        tmp.replace(_disk_cache_path(path))
+    except OSError:
+        pass  # répertoire en lecture seule: le cache mémoire suffit
+
+
+def _store_profile(path: Path, key, prof: dict):
+    disk = _load_disk_cache(path)
+    disk[path.name] = {"size": key[1], "mtime_ns": key[2], **prof}
+    _save_disk_cache(path, disk)
+    _mem_cache[key] = prof
+
+
+def get_profile(path, refresh: bool = False) -> dict:
+    """Profil en cache (mémoire puis disque) tant que taille/mtime du fichier n'ont pas changé."""
+    path = Path(path)
+    key = _stat_key(path)
+    with _lock:
+        if not refresh and key in _mem_cache:
+            return _mem_cache[key]
+        entry = _load_disk_cache(path).get(path.name)
+        if not refresh and entry and entry.get("size") == key[1] and entry.get("mtime_ns") == key[2]:
+            prof = {"encoding": entry["encoding"], "sep": entry["sep"]}
+            _mem_cache[key] = prof
+        else:
+            prof = sniff_profile(path)
+            _store_profile(path, key, prof)
+        return prof
+
+
+def read_csv_sniffed(path, dtype=None, engine: str = "c", **kw) -> pd.DataFrame:
+    """
+    Lit un CSV en une passe avec le profil détecté/caché.
+    - engine="c" (défaut) ou "pyarrow" (UTF-8 seulement ; sinon repli sur "c").
+    - dtype: types explicites (ex: {"reg_code": "string"}) pour éviter l'inférence coûteuse/erronée.
+    Si l'encodage détecté sur l'échantillon casse plus loin dans le fichier, on bascule
+    sur cp1252 (puis latin-1) et on mémorise ce profil corrigé.
+    """
+    path = Path(path)
+    prof = get_profile(path)
+    while True:
+        eng = engine if (engine != "pyarrow" or prof["encoding"].startswith("utf-8")) else "c"
+        try:
+            return pd.read_csv(path, sep=prof["sep"], encoding=prof["encoding"], engine=eng,
+                               dtype=dtype, **kw)
+        except UnicodeDecodeError:
+            if prof["encoding"] == "latin-1":
+                raise
+            fallback = "cp1252" if prof["encoding"].startswith("utf-8") else "latin-1"
+            prof = {**prof, "encoding": fallback}
+            with _lock:
+                _store_profile(path, _stat_key(path), prof)
@@ -0,0 +1,169 @@
+"""
+Exécution de la pipeline en DAG d'étapes avec cache par empreinte des intrants.
+- Chaque étape (Stage) déclare ses fichiers d'entrée (inputs) et de sortie (outputs) ;
+  les dépendances entre étapes s'en déduisent (une étape dépend de celles qui produisent ses inputs).
+- clé d'une étape = sha256(code de l'étape, paramètres, contenu des inputs) ; si la clé et les sorties
+  sont inchangées depuis la dernière exécution, l'étape est sautée.
+- Les étapes prêtes (amont terminé) s'exécutent en parallèle (pool de threads : LightGBM/pandas/IO
+  relâchent le GIL), ex : membres LGBM et baseline de l'ensemble.
+- État persistant dans PROCESSED_DIR/.dag_state.json (empreintes par (taille, mtime), cf. norm_cache).
+"""
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+from .config import PROCESSED_DIR
+from .norm_cache import file_digest, code_version
+from .tracing import span, in_context
+
+STATE_FILE = PROCESSED_DIR / ".dag_state.json"
+
+_lock = threading.Lock()
+
+
+@dataclass
+class Stage:
+    name: str
+    run: Callable[[dict], object]              # run(results) ; results = {étape amont: valeur retournée, None si sautée}
+    inputs: list = field(default_factory=list)   # fichiers lus (un fichier absent compte comme tel dans la clé)
+    outputs: list = field(default_factory=list)  # fichiers écrits (une sortie peut rester absente, ex: pas de futur)
+    after: list = field(default_factory=list)    # dépendances explicites (en plus de celles déduites des fichiers)
+    code: list = field(default_factory=list)     # fonctions/modules dont le source entre dans la clé
+    params: dict = field(default_factory=dict)   # paramètres (env, horizon, mois courant...) entrant dans la clé
+
+
+def _load_state(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_state(path: Path, state: dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state, indent=1, sort_keys=True), encoding="utf-8")
+    tmp.replace(path)
+
+
+def _digests(paths, known: dict) -> dict:
+    """{chemin: file_digest ou None si absent} ; sha256 repris de `known` si (taille, mtime) inchangés."""
+    out = {}
+    for p in paths:
+        p = Path(p)
+        out[p.as_posix()] = file_digest(p, known.get(p.as_posix())) if p.exists() else None
+    return out
+
+
+def _same_content(a: dict, b: dict) -> bool:
+    """Mêmes fichiers au même contenu (sha256), quels que soient leurs (taille, mtime)."""
+    def sha(d):
+        return {p: v and v["sha256"] for p, v in (d or {}).items()}
+    return sha(a) == sha(b)
+
+
+def _stage_key(stage: Stage, inputs: dict) -> str:
+    parts = [code_version(stage.run, *stage.code), json.dumps(stage.params, sort_keys=True, default=str)]
+    parts += [f"{p}={d['sha256'] if d else '-'}" for p, d in sorted(inputs.items())]
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+
+def _dependencies(stages: list) -> dict:
+    producers = {Path(o).as_posix(): s.name for s in stages for o in s.outputs}
+    names = {s.name for s in stages}
+    deps = {}
+    for s in stages:
+        d = {producers[Path(i).as_posix()] for i in s.inputs if Path(i).as_posix() in producers}
+        unknown = set(s.after) - names
+        if unknown:
+            raise ValueError(f"Étape {s.name}: dépendances inconnues {sorted(unknown)}")
+        deps[s.name] = (d | set(s.after)) - {s.name}
+    return deps
+
+
+def _upstream(targets, deps: dict) -> set:
+    seen, todo = set(), list(targets)
+    while todo:
+        n = todo.pop()
+        if n not in seen:
+            seen.add(n)
+            todo.extend(deps[n])
+    return seen
+
+
+def run_dag(stages: list, only=None, force=(), max_workers: int = 2, state_file: Path = STATE_FILE):
+    """
+    Exécute les étapes (ordre topologique, parallèle dès que possible).
+    - only  : noms des étapes visées ; seules elles et leur amont sont considérées (amont sauté si à jour)
+    - force : noms des étapes à ré-exécuter même à jour (True = toutes)
+    Retourne (results, report) : {étape: valeur retournée ou None si sautée},
+    {étape: {"status": "ran"|"skipped", "seconds": s}}.
+    """
+    by_name = {s.name: s for s in stages}
+    if len(by_name) != len(stages):
+        raise ValueError("Noms d'étapes en double")
+    deps = _dependencies(stages)
+    unknown = set(only or ()) - set(by_name)
+    if unknown:
+        raise ValueError(f"Étapes inconnues: {sorted(unknown)}")
+    todo = _upstream(only, deps) if only else set(by_name)
+    forced = set(by_name) if force is True else set(force or ())
+
+    results, report = {}, {}
+
+    def _execute(name):
+        with span(f"stage.{name}") as sp:
+            value, status, seconds = _run_stage(name)
+            sp.set(status=status)
+        return value, status, seconds
+
+    def _run_stage(name):
+        stage = by_name[name]
+        t0 = time.perf_counter()
+        with _lock:
+            entry = _load_state(state_file).get(name, {})
+        inputs = _digests(stage.inputs, entry.get("inputs", {}))
+        key = _stage_key(stage, inputs)
+        outputs = _digests(stage.outputs, entry.get("outputs", {}))
+        if name not in forced and entry.get("key") == key and _same_content(outputs, entry.get("outputs")):
+            if outputs != entry.get("outputs") or inputs != entry.get("inputs"):
+                with _lock:  # fichiers touchés mais contenu identique: on mémorise les nouveaux stat
+                    state = _load_state(state_file)
+                    state[name] = {"key": key, "inputs": inputs, "outputs": outputs}
+                    _save_state(state_file, state)
+            return None, "skipped", time.perf_counter() - t0
+        value = stage.run(results)
+        outputs = _digests(stage.outputs, {})
+        with _lock:
+            state = _load_state(state_file)
+            state[name] = {"key": key, "inputs": inputs, "outputs": outputs}
+            _save_state(state_file, state)
+        return value, "ran", time.perf_counter() - t0
+
+    done, running = set(), {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while todo or running:
+            for name in sorted(n for n in todo if deps[n] <= done):
+                todo.discard(name)
+                running[pool.submit(in_context(_execute), name)] = name
+            if not running:
+                raise ValueError(f"Cycle entre étapes: {sorted(todo)}")
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                name = running.pop(fut)
+                try:
+                    value, status, seconds = fut.result()
+                except Exception:
+                    todo.clear()  # plus rien de neuf ; on attend les étapes en cours puis on relève
+                    wait(running)
+                    raise
+                results[name] = value
+                report[name] = {"status": status, "seconds": round(seconds, 3)}
+                print(f"[dag] {name}: {status} ({seconds:.1f}s)")
+                done.add(name)
+    return results, report
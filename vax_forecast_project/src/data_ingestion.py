@@ -1,16 +1,35 @@
 """
 Ingestion & nettoyage (INSEE, Sentinelles, OSCOUR, Météo, Vaccination)
 Standardise la colonne 'region' en codes courts (IDF, ARA, ...).
+
+Registre des sources (REGISTRY) : la config YAML et le mapping régions sont lus une fois,
+chaque fichier est lu une fois, et chaque source normalisée est mémoïsée par
+(fichiers, mtime/taille, arguments). Un fichier modifié sur disque invalide ses entrées.
+Les loaders renvoient des copies : les appelants peuvent les modifier sans effet de bord.
+
+Maille département (FORECAST_GRANULARITY=departement) : population, urgences et vaccination gardent
+leur colonne 'dep' quand la source la fournit ; les départements absents sont complétés depuis la
+région (taux recopiés, effectifs répartis au prorata de la population). Incidence et météo restent
+régionales (jointes sur la région du département).
 """
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import yaml
 import pandas as pd
 import numpy as np
-from .config import CONF_DIR, BASE_DIR, AGE_BANDS
+from .config import CONF_DIR, BASE_DIR, AGE_BANDS, GRANULARITIES, GRANULARITY
+from .csv_reader import read_csv_sniffed
+from . import climatology
+from .geography import RegionLookup
+from .tracing import span, in_context
+
+# VAXFC_DATA_SOURCES : autre fichier de sources (ex: jeux synthétiques des benchmarks)
+CONFIG_PATH = Path(os.environ.get("VAXFC_DATA_SOURCES", CONF_DIR / "data_sources.yaml"))
 
-def load_config():
-    with open(CONF_DIR / "data_sources.yaml", "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
 
 def _as_abs(path_or_url: str) -> str:
     p = Path(path_or_url)
@@ -18,10 +37,119 @@ def _as_abs(path_or_url: str) -> str:
         return path_or_url
     return (BASE_DIR / p).as_posix()
 
+
+def _file_version(path):
+    """(mtime_ns, taille) d'un fichier local ; None si absent (ou URL)."""
+    try:
+        st = Path(path).stat()
+    except (OSError, ValueError):
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _read_table(pathlike, **kw):
+    """
+    Lit une source tabulaire. Pour un CSV local, préfère le parquet voisin écrit par
+    download_open_data (cache des normalisations) s'il est au moins aussi récent que le CSV.
+    Une source déclarée directement en .parquet est lue telle quelle.
+    """
+    if pathlike.startswith(("http://","https://")):
+        return pd.read_csv(pathlike, encoding="utf-8", **kw)
+    if not kw and pathlike.endswith(".parquet"):
+        return pd.read_parquet(pathlike)
+    pq = Path(pathlike).with_suffix(".parquet")
+    if not kw and pq.exists() and pq.stat().st_mtime_ns >= Path(pathlike).stat().st_mtime_ns:
+        return pd.read_parquet(pq)
+    return read_csv_sniffed(pathlike, **kw)
+
+
+class SourceRegistry:
+    """Config, mapping régions, fichiers lus et sources normalisées, partagés par tous les loaders."""
+
+    def __init__(self, config_path=CONFIG_PATH):
+        self.config_path = Path(config_path)
+        self._lock = threading.RLock()
+        self._key_locks = {}
+        self._cfg = (None, None)     # (version, dict)
+        self._lookup = (None, None)  # (version du mapping régions, RegionLookup)
+        self._tables = {}            # chemin -> (version, DataFrame)
+        self._frames = {}            # (loader, versions, args) -> DataFrame
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def config(self) -> dict:
+        version = _file_version(self.config_path)
+        with self._lock:
+            if self._cfg[0] != version or self._cfg[1] is None:
+                with open(self.config_path, "r", encoding="utf-8") as f:
+                    self._cfg = (version, yaml.safe_load(f))
+            return self._cfg[1]
+
+    def region_lookup(self) -> RegionLookup:
+        """Référentiel géographique compilé sur le mapping régions de la config (recompilé s'il change)."""
+        version = _file_version(_as_abs(self.config()["region_mapping"]))
+        hit = self._lookup
+        if hit[0] != version or hit[1] is None:
+            hit = (version, RegionLookup(_load_region_map()))  # hors verrou global (lecture mémoïsée)
+            with self._lock:
+                self._lookup = hit
+        return hit[1]
+
+    def table(self, pathlike, **kw) -> pd.DataFrame:
+        """Fichier lu une fois par version (les lectures avec options ne sont pas mémoïsées)."""
+        path = _as_abs(pathlike)
+        if kw or path.startswith(("http://","https://")):
+            return _read_table(path, **kw)
+        version = _file_version(path)
+        with self._key_lock(("table", path)):
+            hit = self._tables.get(path)
+            if hit is None or hit[0] != version:
+                hit = self._tables[path] = (version, _read_table(path))
+        return hit[1].copy()
+
+    def frame(self, name, cfg_keys, builder, args=(), kwargs=None) -> pd.DataFrame:
+        """Source normalisée `builder(*args, **kwargs)`, mémoïsée tant que ses fichiers n'ont pas changé."""
+        kwargs = kwargs or {}
+        cfg = self.config()
+        versions = tuple(_file_version(_as_abs(cfg[k])) for k in (*cfg_keys, "region_mapping") if k in cfg)
+        key = (name, versions, args, tuple(sorted(kwargs.items())))
+        with self._key_lock(key):
+            out = self._frames.get(key)
+            if out is None:
+                out = self._frames[key] = builder(*args, **kwargs)
+        return out.copy()
+
+    def clear(self):
+        with self._lock:
+            self._cfg = (None, None)
+            self._lookup = (None, None)
+            self._tables.clear()
+            self._frames.clear()
+
+
+REGISTRY = SourceRegistry()
+
+
+def _memoized(*cfg_keys):
+    """Mémoïse un loader dans REGISTRY ; cfg_keys = entrées de data_sources.yaml dont il dépend."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            return REGISTRY.frame(fn.__name__, cfg_keys, fn, args, kwargs)
+        wrapper.cfg_keys = cfg_keys
+        return wrapper
+    return deco
+
+
+def load_config():
+    return REGISTRY.config()
+
 def read_csv(pathlike, **kw):
-    pathlike = _as_abs(pathlike)
-    return pd.read_csv(pathlike, encoding="utf-8", **kw)
+    return REGISTRY.table(pathlike, **kw)
 
+@_memoized()
 def _load_region_map():
     cfg = load_config()
     rm = read_csv(cfg["region_mapping"])
@@ -36,32 +164,27 @@ def _apply_region_map(df, col="region"):
     - Si df[col] contient déjà des codes courts présents dans le mapping, on les garde.
     - Sinon, on suppose un code INSEE (numérique/texte) -> on mappe vers code court.
     """
-    rm = _load_region_map()  # retourne ['insee','region','region_name']
     df = df.copy()
+    df[col] = REGISTRY.region_lookup().harmonize(df[col])
+    return df
 
-    # 1) Tout en chaîne uppercase sans espaces
-    vals = df[col].astype(str).str.upper().str.strip()
 
-    # 2) Détection: déjà code court ?
-    #    (évite les merges int/str : on utilise isin sur des chaînes)
-    looks_short = vals.isin(rm["region"].astype(str).unique())
-    if looks_short.any():
-        df[col] = vals
+def _maille(df, by_dep, keys, value_cols):
+    """
+    Normalise la colonne 'dep' (None si la source est régionale).
+    by_dep=False : lignes départementales agrégées par `keys` (schéma régional historique, sans 'dep').
+    """
+    if "dep" not in df.columns:
+        return df.assign(dep=None) if by_dep else df
+    df["dep"] = REGISTRY.region_lookup().dep_codes(df["dep"])
+    if by_dep:
         return df
-
-    # 3) Mapping INSEE -> code court
-    insee = vals.str.extract(r"(\d{2})", expand=False)
-    insee = insee.str.zfill(2)
-    tmp = pd.DataFrame({col: vals, "_insee": insee})
-    tmp = tmp.merge(rm[["insee","region"]].rename(columns={"region": "_short"}),
-                    left_on="_insee", right_on="insee", how="left")
-    # si non mappable, on garde la valeur d'origine
-    df[col] = tmp["_short"].fillna(vals)
-    return df
+    return df.groupby(keys, as_index=False, observed=True)[value_cols].sum()
 
 
-def load_insee_population():
-    """DF: [region, age_band, population] (region = code court)"""
+@_memoized("insee_population")
+def load_insee_population(by_dep: bool = False):
+    """DF: [region, (dep,) age_band, population] (region = code court)"""
     cfg = load_config()
     df = read_csv(cfg["insee_population"])
     # accepte ['region'] numérique INSEE ou déjà court
@@ -69,23 +192,17 @@ def load_insee_population():
         df = df.rename(columns={"reg":"region"})
     df = _apply_region_map(df, col="region")
     df["age_band"] = pd.Categorical(df["age_band"], categories=AGE_BANDS, ordered=True)
-    return df[["region","age_band","population"]]
+    df = _maille(df, by_dep, ["region","age_band"], ["population"])
+    return df[["region","dep","age_band","population"] if by_dep else ["region","age_band","population"]]
 
 def load_region_mapping():
     """Retourne mapping final pour info."""
     rm = _load_region_map()
     return rm.rename(columns={"insee":"insee_code"})
 
-def load_sentinelles_incidence(with_future: bool = False, future_until: str = "2025-12-31"):
-    """
-    DF: [date, region, incidence_per_100k] (region = code court)
-    - Lit le CSV normalisé, aligne en hebdo (lundi).
-    - 'Anti-zéro' si historique vide.
-    - Si with_future=True : génère des semaines futures jusqu'à 'future_until' (inclus),
-      par climatologie (moyenne par semaine ISO & région) + léger ajustement de tendance récent.
-    """
-    cfg = load_config()
-    df = read_csv(cfg["sentinelles_incidence"])
+def normalize_sentinelles(df: pd.DataFrame) -> pd.DataFrame:
+    """Lignes Sentinelles (format sentinelles_norm) -> [date (lundi), region, incidence_per_100k] hebdo."""
+    df = df.copy()
     df.columns = [c.lower() for c in df.columns]
 
     # date
@@ -120,6 +237,20 @@ def load_sentinelles_incidence(with_future: bool = False, future_until: str = "2
     out["date"] = out["date"].dt.to_period("W-MON").dt.start_time
     out = (out.groupby(["date","region"], as_index=False)["incidence_per_100k"]
              .mean().sort_values(["region","date"]))
+    return out
+
+
+@_memoized("sentinelles_incidence")
+def load_sentinelles_incidence(with_future: bool = False, future_until: str = "2025-12-31"):
+    """
+    DF: [date, region, incidence_per_100k] (region = code court)
+    - Lit le CSV normalisé, aligne en hebdo (lundi).
+    - 'Anti-zéro' si historique vide.
+    - Si with_future=True : génère des semaines futures jusqu'à 'future_until' (inclus),
+      par climatologie (moyenne par semaine ISO & région) + léger ajustement de tendance récent.
+    """
+    cfg = load_config()
+    out = normalize_sentinelles(read_csv(cfg["sentinelles_incidence"]))
 
     # --- ANTI-ZÉRO historique ---
     if (out["incidence_per_100k"].fillna(0).sum() == 0):
@@ -133,53 +264,22 @@ def load_sentinelles_incidence(with_future: bool = False, future_until: str = "2
         out["incidence_per_100k"] = out["incidence_per_100k"].clip(lower=0.1)
         out = out.drop(columns=["woy"])
 
-    # --- FUTUR 2025 par climatologie + tendance récente ---
+    # --- FUTUR par climatologie (région × semaine ISO) + tendance récente (8 semaines) ---
     if with_future:
         future_until = pd.to_datetime(future_until)  # borne inclusive
-        # semaines futures (lundi) jusqu'à fin 2025
         last_hist = out["date"].max()
         first_future = (last_hist + pd.Timedelta(days=7)).to_period("W-MON").to_timestamp()
         fut_dates = pd.date_range(first_future, future_until, freq="W-MON")
-        if len(fut_dates):
-            # Climatologie région × semaine ISO
-            hist = out.copy()
-            hist["woy"] = hist["date"].dt.isocalendar().week.astype(int)
-            clim = (hist.groupby(["region","woy"], as_index=False)["incidence_per_100k"]
-                        .mean().rename(columns={"incidence_per_100k":"inc_clim"}))
-
-            # Tendance récente: ratio (dernières 8 semaines) / (climatologie correspondante)
-            tr = []
-            for r, grp in hist.groupby("region"):
-                g = grp.sort_values("date").tail(8).copy()
-                if g.empty:
-                    tr.append({"region": r, "trend": 1.0})
-                    continue
-                g["woy"] = g["date"].dt.isocalendar().week.astype(int)
-                g = g.merge(clim[clim["region"]==r][["woy","inc_clim"]], on="woy", how="left")
-                den = g["inc_clim"].replace(0, np.nan).mean()
-                num = g["incidence_per_100k"].mean()
-                ratio = (num/den) if pd.notnull(den) and den>0 else 1.0
-                tr.append({"region": r, "trend": float(np.clip(ratio, 0.7, 1.3))})
-            trend = pd.DataFrame(tr)
-
-            fut = pd.DataFrame({"date": fut_dates})
-            fut["woy"] = fut["date"].dt.isocalendar().week.astype(int)
-            regions = out["region"].unique()
-            fut = fut.assign(key=1).merge(pd.DataFrame({"region":regions,"key":[1]*len(regions)}), on="key").drop(columns=["key"])
-            fut = fut.merge(clim, on=["region","woy"], how="left").merge(trend, on="region", how="left")
-            fut["incidence_per_100k"] = (fut["inc_clim"].fillna(fut.groupby("region")["inc_clim"].transform("mean"))
-                                         * fut["trend"].fillna(1.0))
-            fut = fut[["date","region","incidence_per_100k"]]
-            out = pd.concat([out, fut], ignore_index=True).sort_values(["region","date"])
+        trend = climatology.trend_factors(out, "incidence_per_100k", period="week", last_n=8)
+        out = climatology.extend_future(out, "incidence_per_100k", fut_dates, period="week", trend=trend)
 
     return out[["date","region","incidence_per_100k"]]
 
 
 
-def load_oscour_urgences():
-    """DF: [date, region, age_band, er_visits, admissions] (region = code court)"""
-    cfg = load_config()
-    df = read_csv(cfg["oscour_urgences"])
+def normalize_oscour(df: pd.DataFrame, by_dep: bool = False) -> pd.DataFrame:
+    """Lignes OSCOUR (format oscour_norm) -> [date, region, (dep,) age_band, er_visits, admissions]."""
+    df = df.copy()
     df["date"] = pd.to_datetime(df["date"])
     # region peut être 'IDF' déjà -> laisse tel quel ; sinon map depuis INSEE
     df = _apply_region_map(df, col="region")
@@ -188,13 +288,23 @@ def load_oscour_urgences():
             df[col] = 0
     if "age_band" not in df.columns:
         df["age_band"] = "18-64"
-    return df[["date","region","age_band","er_visits","admissions"]]
+    df = _maille(df, by_dep, ["date","region","age_band"], ["er_visits","admissions"])
+    cols = ["date","region","dep","age_band"] if by_dep else ["date","region","age_band"]
+    return df[cols + ["er_visits","admissions"]]
+
+
+@_memoized("oscour_urgences")
+def load_oscour_urgences(by_dep: bool = False):
+    """DF: [date, region, (dep,) age_band, er_visits, admissions] (region = code court)"""
+    cfg = load_config()
+    return normalize_oscour(read_csv(cfg["oscour_urgences"]), by_dep)
 
+@_memoized("meteo_temperature")
 def load_meteo_temperature(with_future: bool = False, future_until: str = "2025-12-31"):
     """
     DF: [date, region, tmean] (region = code court)
     - Lit la température moyenne historique.
-    - Si with_future=True : génère 2025 par climatologie région × mois (tmean_clim).
+    - Si with_future=True : prolonge jusqu'à future_until par climatologie région × mois (src.climatology).
     Remarque: on génère des points au 1er du mois pour le futur; le build mensuel
     les agrègera de toute façon.
     """
@@ -207,38 +317,24 @@ def load_meteo_temperature(with_future: bool = False, future_until: str = "2025-
     out = df[["date","region","tmean"]].copy()
 
     if with_future:
+        # Mois suivant le dernier point observé -> future_until, par climatologie région × mois
         future_until = pd.to_datetime(future_until)
-        # Climatologie région × mois
-        hist = out.copy()
-        hist["month"] = hist["date"].dt.month
-        clim = (hist.groupby(["region","month"], as_index=False)["tmean"]
-                    .mean().rename(columns={"tmean":"tmean_clim"}))
-
-        # Mois 2025
-        months_2025 = pd.date_range(pd.Timestamp("2025-01-01"), future_until, freq="MS")
-        regions = out["region"].unique()
-        fut = (pd.MultiIndex.from_product([months_2025, regions], names=["date","region"])
-                            .to_frame(index=False))
-        fut["month"] = fut["date"].dt.month
-        fut = fut.merge(clim, on=["region","month"], how="left")
-        # backup au cas où
-        fut["tmean"] = fut["tmean_clim"].fillna(fut.groupby("region")["tmean_clim"].transform("mean"))
-        fut = fut[["date","region","tmean"]]
-
-        out = pd.concat([out, fut], ignore_index=True).sort_values(["region","date"])
+        first_future = out["date"].max().to_period("M").to_timestamp() + pd.offsets.MonthBegin(1)
+        months = pd.date_range(first_future, future_until, freq="MS")
+        out = climatology.extend_future(out, "tmean", months, period="month")
 
     return out[["date","region","tmean"]]
 
 
-def load_vaccination_doses():
+@_memoized("vaccination_doses", "sentinelles_incidence")
+def load_vaccination_doses(by_dep: bool = False):
     """
-    DF: [date, region, age_band, doses]
+    DF: [date, region, (dep,) age_band, doses] ('dep' manquant si la source est régionale)
     - Si le fichier référencé par conf['vaccination_doses'] n'existe pas OU
       n'a pas de colonne 'doses' OU somme(doses)==0, on construit un PROXY
       à partir de l'incidence Sentinelles lissée (MA2) et d'un profil par âge.
     - Pas d'import de fonctions du même module pour éviter tout cycle.
     """
-    import os
     cfg = load_config()
     vac_path = _as_abs(cfg["vaccination_doses"])
     use_proxy = False
@@ -246,7 +342,7 @@ def load_vaccination_doses():
     if not os.path.exists(vac_path):
         use_proxy = True
     else:
-        df = pd.read_csv(vac_path, encoding="utf-8")
+        df = read_csv(vac_path)
         if "date" not in df.columns or "region" not in df.columns:
             use_proxy = True
         else:
@@ -270,7 +366,8 @@ def load_vaccination_doses():
                 use_proxy = True
 
     if not use_proxy:
-        return df[["date","region","age_band","doses"]]
+        df = _maille(df, by_dep, ["date","region","age_band"], ["doses"])
+        return df[["date","region","dep","age_band","doses"] if by_dep else ["date","region","age_band","doses"]]
 
         # ---------- PROXY VACCINS DE SECOURS (sans fuite) ----------
     # On repart de l'incidence (déjà ANTI-ZÉRO ci-dessus, via le CSV… ou sa synthèse)
@@ -307,4 +404,178 @@ def load_vaccination_doses():
 
     out = proxy[["date","region","age_band","doses"]].copy()
     out["date"] = pd.to_datetime(out["date"])
+    return out.assign(dep=None)[["date","region","dep","age_band","doses"]] if by_dep else out
+
+
+@_memoized("pharmacy_dispensing")
+def load_pharmacy_dispensing():
+    """
+    DF: [date (1er du mois), pharmacie, code_commune, region, population, doses] — délivrances par pharmacie.
+    - colonnes requises: date, pharmacie (ex: FINESS), doses ; optionnelles: code_commune (INSEE),
+      region (code court ou INSEE ; déduite du département du code commune si absente), population
+    - agrégation mensuelle ; identifiants en catégories (panel de ~20k pharmacies compact en mémoire)
+    """
+    cfg = load_config()
+    df = read_csv(cfg["pharmacy_dispensing"])
+    df.columns = [c.strip().lower() for c in df.columns]
+    missing = {"date", "pharmacie", "doses"} - set(df.columns)
+    if missing:
+        raise ValueError(f"pharmacy_dispensing: colonnes manquantes {sorted(missing)}")
+
+    df["date"] = pd.to_datetime(df["date"], errors="coerce").dt.to_period("M").dt.to_timestamp()
+    df["pharmacie"] = df["pharmacie"].astype(str).str.strip()
+    df["doses"] = pd.to_numeric(df["doses"], errors="coerce").fillna(0.0).astype("float32")
+    if "code_commune" in df.columns:
+        cc = df["code_commune"]
+        df["code_commune"] = cc.astype(str).str.strip().str.replace(r"\.0$", "", regex=True).str.zfill(5).where(cc.notna(), "")
+    else:
+        df["code_commune"] = ""
+    lookup = REGISTRY.region_lookup()
+    if "region" in df.columns:
+        df["region"] = lookup.harmonize(df["region"])
+    else:
+        df["region"] = lookup.to_code(df["code_commune"], "dep").astype(object)
+    df["population"] = (pd.to_numeric(df["population"], errors="coerce").astype("float32")
+                        if "population" in df.columns else np.float32(np.nan))
+
+    out = (df.dropna(subset=["date"])
+             .groupby(["pharmacie", "date"], as_index=False, sort=True)
+             .agg(code_commune=("code_commune", "first"), region=("region", "first"),
+                  population=("population", "first"), doses=("doses", "sum")))
+    for col in ["pharmacie", "code_commune", "region"]:
+        out[col] = out[col].astype("category")
+    return out[["date","pharmacie","code_commune","region","population","doses"]]
+
+
+# =========================
+# Chargement parallèle des sources
+# =========================
+SOURCE_LOADERS = {
+    "population": load_insee_population,
+    "incidence": load_sentinelles_incidence,
+    "urgences": load_oscour_urgences,
+    "meteo": load_meteo_temperature,
+    "vaccination": load_vaccination_doses,
+}
+DEP_SOURCES = ("population", "urgences", "vaccination")  # sources portant la maille département
+
+
+def source_files() -> list:
+    """
+    Fichiers locaux lus par load_all_sources : config YAML, mapping régions, CSV des sources
+    et leur parquet voisin (qu'ils existent ou non). Intrants de l'étape features (src.dag).
+    """
+    cfg = load_config()
+    keys = {"region_mapping"}.union(*(fn.cfg_keys for fn in SOURCE_LOADERS.values()))
+    files = [CONFIG_PATH]
+    for k in sorted(keys):
+        if k in cfg and not cfg[k].startswith(("http://","https://")):
+            p = Path(_as_abs(cfg[k]))
+            files += [p, p.with_suffix(".parquet")]
+    return list(dict.fromkeys(files))
+
+
+def check_granularity(granularity: str | None) -> str:
+    granularity = granularity or GRANULARITY
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Maille inconnue: {granularity!r} (attendu: {', '.join(GRANULARITIES)})")
+    return granularity
+
+
+def _spread_departements(df, deps, keys, value_cols, weights=None):
+    """
+    Complète une source au niveau département : les départements de `deps` [region, dep] absents
+    de la source reçoivent la valeur régionale (lignes sans 'dep'),
+      - weights=None : recopiée (taux) ; sans ligne régionale, moyenne des départements présents
+      - sinon répartie entre eux au prorata de weights [region, dep, (age_band,) w]
+    """
+    known = df[df["dep"].notna()]
+    reg = df[df["dep"].isna()].drop(columns="dep")
+    if reg.empty and weights is None and not known.empty:
+        reg = known.groupby(["region", *keys], as_index=False, observed=True)[value_cols].mean()
+    have = pd.MultiIndex.from_frame(known[["region","dep"]].drop_duplicates())
+    missing = deps[~pd.MultiIndex.from_frame(deps[["region","dep"]]).isin(have)]
+    add = missing.merge(reg, on="region")
+    if weights is not None and not add.empty:
+        on = [c for c in weights.columns if c != "w"]
+        add = add.merge(weights, on=on, how="left")
+        w = add["w"].fillna(0.0)
+        tot = w.groupby([add[c] for c in ["region", *keys]], observed=True).transform("sum")
+        n = w.groupby([add[c] for c in ["region", *keys]], observed=True).transform("size")
+        share = (w / tot).where(tot > 0, 1.0 / n)
+        add[value_cols] = add[value_cols].mul(share, axis=0)
+        add = add.drop(columns="w")
+    return pd.concat([known, add[known.columns]], ignore_index=True)
+
+
+def _to_departements(frames: dict) -> dict:
+    """Sources de DEP_SOURCES complétées sur tous les départements des régions couvertes."""
+    regions = sorted(set().union(*(set(f["region"]) for f in frames.values())))
+    deps = REGISTRY.region_lookup().departements(regions)
+    pop = _spread_departements(frames["population"], deps, ["age_band"], ["population"],
+                               weights=deps.assign(w=1.0))  # sans effectifs départementaux: parts égales
+    frames["population"] = pop
+    frames["urgences"] = _spread_departements(frames["urgences"], deps, ["date","age_band"],
+                                              ["er_visits","admissions"])
+    frames["vaccination"] = _spread_departements(
+        frames["vaccination"], deps, ["date","age_band"], ["doses"],
+        weights=pop.rename(columns={"population": "w"})[["region","dep","age_band","w"]].astype({"age_band": str}))
+    return frames
+
+
+def _typed(df: pd.DataFrame) -> pd.DataFrame:
+    """Types homogènes entre sources: date en datetime64[ns], region en texte."""
+    if "date" in df.columns:
+        df["date"] = pd.to_datetime(df["date"], errors="coerce").astype("datetime64[ns]")
+    if "region" in df.columns:
+        df["region"] = df["region"].astype(str)
+    return df
+
+
+def load_weekly_arrivals(sentinelles=None, oscour=None, granularity: str | None = None) -> dict:
+    """
+    Nouvelles observations hebdomadaires (CSV / parquet au format sentinelles_norm / oscour_norm, hors config) :
+    {"incidence": DF | None, "urgences": DF | None}, typées comme load_all_sources
+    (maille département : urgences complétées sur les départements des régions présentes).
+    """
+    by_dep = check_granularity(granularity) == "departement"
+    out = {"incidence": None, "urgences": None}
+    if sentinelles is not None:
+        out["incidence"] = _typed(normalize_sentinelles(_read_table(Path(sentinelles).as_posix())))
+    if oscour is not None:
+        urg = _typed(normalize_oscour(_read_table(Path(oscour).as_posix()), by_dep=by_dep))
+        if by_dep:
+            deps = REGISTRY.region_lookup().departements(sorted(set(urg["region"])))
+            urg = _spread_departements(urg, deps, ["date","age_band"], ["er_visits","admissions"])
+        out["urgences"] = urg
     return out
+
+
+def load_all_sources(max_workers: int = len(SOURCE_LOADERS), granularity: str | None = None):
+    """
+    Charge les sources en parallèle (pool de threads ; lecture/parsing indépendants).
+    Retourne (frames, timings) : {nom: DataFrame typé}, {nom: secondes, "_wall": secondes}.
+    Le temps de la phase est borné par la source la plus lente (et non plus la somme des temps).
+    granularity="departement" : DEP_SOURCES portent une colonne 'dep' renseignée partout.
+    """
+    by_dep = check_granularity(granularity) == "departement"
+    loaders = {name: (functools.partial(fn, by_dep=True) if by_dep and name in DEP_SOURCES else fn)
+               for name, fn in SOURCE_LOADERS.items()}
+
+    def _timed(name, fn):
+        t0 = time.perf_counter()
+        with span(f"load.{name}") as sp:
+            out = sp.rows(_typed(fn()))
+        return out, time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {name: pool.submit(in_context(_timed), name, fn) for name, fn in loaders.items()}
+        results = {name: fut.result() for name, fut in futures.items()}
+    frames = {name: r[0] for name, r in results.items()}
+    if by_dep:
+        with span("load.to_departements"):
+            frames = _to_departements(frames)
+    timings = {name: round(r[1], 4) for name, r in results.items()}
+    timings["_wall"] = round(time.perf_counter() - t0, 4)
+    return frames, timings
@@ -7,10 +7,14 @@ Téléchargements & normalisations pour les sources Open Data :
 
 Remplissez/ajustez les mappings région (INSEE -> codes courts) si nécessaire.
 """
-import io, os, pandas as pd, numpy as np, requests
+import io, os, re, pandas as pd, numpy as np, requests
 from pathlib import Path
 import unicodedata
 from .config import RAW_DIR, PROCESSED_DIR, AGE_BANDS, FREQ, REGIONS, CONF_DIR, BASE_DIR
+from .csv_reader import read_csv_sniffed
+from .fetch import fetch, fetch_first, fetch_all
+from .norm_cache import cached_normalize, parquet_path
+from .geography import RegionLookup
 
 import yaml
 
@@ -19,12 +23,33 @@ def _cfg():
         return yaml.safe_load(f)
 
 def _dl(url, out_path):
-    out = Path(out_path)
-    out.parent.mkdir(parents=True, exist_ok=True)
-    r = requests.get(url, timeout=60)
-    r.raise_for_status()
-    out.write_bytes(r.content)
-    return out
+    """Téléchargement conditionnel en flux (cf. src.fetch) : rien n'est réécrit si la source n'a pas changé."""
+    return fetch(url, out_path).path
+
+
+def _insee_urls():
+    return [
+        # 2022 (souvent OK, mais parfois 500 comme chez toi)
+        _cfg().get("insee_pop_csv_url"),
+        # Fallbacks plausibles (autres millésimes POP1A) — modifiables :
+        "https://www.insee.fr/fr/statistiques/fichier/7650800/pop1a-2021.csv",
+        "https://www.insee.fr/fr/statistiques/fichier/7650792/pop1a-2020.csv",
+    ]
+
+
+def _source_jobs():
+    """{source: (url ou urls candidates, fichier brut)} pour fetch_all."""
+    cfg = _cfg()
+    return {
+        "sentinelles": (cfg["sentinelles_incidence_url"], RAW_DIR / "sentinelles_weekly.csv"),
+        "oscour": (cfg["oscour_grippe_url"], RAW_DIR / "oscour_grippe.csv"),
+        "insee": (_insee_urls(), RAW_DIR / "insee_pop_raw.csv"),
+        "meteo": (cfg["meteo_regionale_url"], RAW_DIR / "meteo_regionale.csv"),
+    }
+
+
+def _region_mapping_path() -> Path:
+    return BASE_DIR / _cfg()["region_mapping"]
 
 
 def _nrm(s: str) -> str:
@@ -56,29 +81,24 @@ def _norm_region_name(s):
     s = s.upper().replace(" ", "").replace("-", "").replace("'", "")
     return s
 
-def download_sentinelles():
+def download_sentinelles(fetch_raw: bool = True):
     """
     Télécharge & normalise l'incidence hebdo Sentinelles.
     Gère automatiquement le séparateur (',' ou ';') et différents schémas de colonnes.
     Sortie normalisée: [date, region, incidence_per_100k] avec region sur 2 chiffres.
     """
-    import pandas as pd
-    from pathlib import Path
-    url = _cfg()["sentinelles_incidence_url"]
     path = RAW_DIR / "sentinelles_weekly.csv"
-    _dl(url, path)
+    if fetch_raw:
+        _dl(_cfg()["sentinelles_incidence_url"], path)
+    return cached_normalize("sentinelles", path, RAW_DIR / "sentinelles_norm.csv", _normalize_sentinelles)
 
-    # 1) Lecture robuste: essai sep=';' puis fallback ','
-    def _read_any(p):
-        try:
-            df = pd.read_csv(p, sep=';')
-            if df.shape[1] == 1:  # probablement mauvais sep
-                raise ValueError
-            return df
-        except Exception:
-            return pd.read_csv(p)
-
-    df = _read_any(path)
+
+def _normalize_sentinelles(path):
+    """Fichier brut Sentinelles -> [date, region, incidence_per_100k]."""
+    import pandas as pd
+
+    # 1) Lecture: séparateur/encodage détectés une fois (profil en cache), une seule passe
+    df = read_csv_sniffed(path)
     df.columns = [c.strip().lower() for c in df.columns]
 
     # 2) Détection colonnes
@@ -132,219 +152,164 @@ def download_sentinelles():
     # On garde uniquement ce qui ressemble à des codes région (2 chiffres)
     out = out[out["region"].str.fullmatch(r"\d{2}") == True].copy()
 
-    out.to_csv(RAW_DIR / "sentinelles_norm.csv", index=False, encoding="utf-8")
     return out
 
 
-def download_oscour():
+OSCOUR_CHUNK_ROWS = 250_000
+OSCOUR_DATE_COLS = ["date_complet","jour","date","date_evenement","date_passage","date_de_passage"]
+OSCOUR_GEO_COLS = [
+    "dep","code_dep","code_departement","departement","dep_code",
+    "code_insee_region","code_region","reg","region","maille_code",
+    "libelle_region","libelle_reg","nom_region","geo_name","libgeo","libelle","zone","territoire","maille",
+    "region_name"
+]
+OSCOUR_AGE_COLS = ["sursaud_cl_age_gene","classe_age","age_classe","age","classe_age_quinquennale","tranche_age"]
+OSCOUR_MEASURES = {"er_visits": ["taux_passages_grippe_sau","valeur"],
+                   "admissions": ["taux_hospit_grippe_sau","admissions"]}
+
+
+def download_oscour(fetch_raw: bool = True):
     """
     Télécharge & normalise l’export OSCOUR/SurSaUD grippe.
     - Tolère ;/,, schémas variés
+    - Lecture en flux (par blocs) et agrégation incrémentale région (× département) × âge × semaine :
+      la mémoire ne dépend pas de la taille de l'export (quotidien départemental)
     - Si aucune colonne géographique n'est présente (national), réplique sur toutes les régions (codes courts)
-    Sortie normalisée: [date, region, age_band, er_visits, admissions]
+    - Maille départementale: le code département est conservé (mode FORECAST_GRANULARITY=departement)
+    Sortie normalisée: [date (lundi de la semaine), region, dep (vide si maille régionale), age_band,
+                        er_visits, admissions]
       * NB: er_visits/admissions peuvent être des TAUX si la source ne fournit que des taux
     """
-    import pandas as pd, numpy as np, re, unicodedata
-
-    # ---- mapping DEP -> REG (INSEE 2016+) pour les exports départementaux ----
-    dep_to_reg = {
-        "971":"01","972":"02","973":"03","974":"04","976":"06",
-        "2A":"94","2B":"94",
-        "01":"84","02":"32","03":"84","04":"93","05":"93","06":"93","07":"84","08":"44","09":"76",
-        "10":"44","11":"76","12":"76","13":"93","14":"28","15":"84","16":"75","17":"75","18":"24",
-        "19":"75","21":"27","22":"53","23":"75","24":"75","25":"27","26":"84","27":"28","28":"24",
-        "29":"53","30":"76","31":"76","32":"76","33":"75","34":"76","35":"53","36":"24","37":"24",
-        "38":"84","39":"27","40":"75","41":"24","42":"84","43":"84","44":"52","45":"24","46":"76",
-        "47":"75","48":"76","49":"52","50":"28","51":"44","52":"44","53":"52","54":"44","55":"44",
-        "56":"53","57":"44","58":"27","59":"32","60":"32","61":"28","62":"32","63":"84","64":"75",
-        "65":"76","66":"76","67":"44","68":"44","69":"84","70":"27","71":"27","72":"52","73":"84",
-        "74":"84","75":"11","76":"28","77":"11","78":"11","79":"75","80":"32","81":"76","82":"76",
-        "83":"93","84":"93","85":"52","86":"75","87":"75","88":"44","89":"27","90":"27","91":"11",
-        "92":"11","93":"11","94":"11","95":"11"
-    }
-
-    def _read_any(p):
-        try:
-            df = pd.read_csv(p, sep=';')
-            if df.shape[1] == 1:
-                raise ValueError
-            return df
-        except Exception:
-            return pd.read_csv(p)
-
-    def _nrm(s: str) -> str:
-        if pd.isna(s): return ""
-        s = str(s)
-        s = unicodedata.normalize("NFKD", s).encode("ascii","ignore").decode("ascii")
-        return s.upper().strip()
-
-    def _load_region_mapping_short():
-        # lit data/raw/region_mapping.csv (insee -> code court + nom)
-        from .config import CONF_DIR, BASE_DIR
-        import yaml
-        cfg = yaml.safe_load(open(CONF_DIR / "data_sources.yaml","r",encoding="utf-8"))
-        rm = pd.read_csv((BASE_DIR / cfg["region_mapping"]).as_posix())
-        rm["insee"] = rm["insee"].astype(str).str.zfill(2)
-        rm["region"] = rm["region"].astype(str).str.upper()
-        rm["region_name_norm"] = rm["region_name"].map(_nrm)
-        return rm[["insee","region","region_name_norm"]]
-
-    url = _cfg()["oscour_grippe_url"]
     path = RAW_DIR / "oscour_grippe.csv"
-    _dl(url, path)
-
-    df = _read_any(path)
-    df.columns = [c.strip().lower() for c in df.columns]
-
-    # 1) Date: 'date_complet' ou 'jour' / sinon semaine ISO
-    if "date_complet" in df.columns:
-        df["date"] = pd.to_datetime(df["date_complet"], errors="coerce")
-    else:
-        dcol = next((c for c in ["jour","date","date_evenement","date_passage","date_de_passage"] if c in df.columns), None)
-        if dcol:
-            df["date"] = pd.to_datetime(df[dcol], errors="coerce")
+    if fetch_raw:
+        _dl(_cfg()["oscour_grippe_url"], path)
+    return cached_normalize("oscour", path, RAW_DIR / "oscour_norm.csv", _normalize_oscour,
+                            code=[_oscour_age_band, _oscour_dates, _region_lookup, OSCOUR_DATE_COLS,
+                                  OSCOUR_GEO_COLS, OSCOUR_AGE_COLS, OSCOUR_MEASURES],
+                            deps=[_region_mapping_path()])
+
+
+def _oscour_age_band(v) -> str:
+    s = str(v).lower()
+    if any(x in s for x in ["0-4","0_4","5-14","5_14","0-14","0_14","0-17"]): return "0-17"
+    if any(x in s for x in ["15-64","15_64","18-64","18_64"]): return "18-64"
+    if any(x in s for x in ["65","65+","65 ans","65 ans ou plus","65 ans et plus"]): return "65+"
+    m = re.findall(r"\d+", s)
+    if m:
+        a = max(int(x) for x in m)
+        return "0-17" if a<18 else ("18-64" if a<65 else "65+")
+    return "18-64"
+
+
+def _region_lookup() -> RegionLookup:
+    """Référentiel géographique compilé sur data/raw/region_mapping.csv (codes courts du projet)."""
+    return RegionLookup(pd.read_csv(_region_mapping_path(), dtype={"insee": str}))
+
+
+def _oscour_dates(chunk: pd.DataFrame, cols: dict) -> pd.Series:
+    """Dates d'un bloc (colonne date, sinon année + semaine ISO) ; conversion faite sur les valeurs distinctes."""
+    if cols["date"]:
+        codes, uniq = pd.factorize(chunk[cols["date"]])
+        conv = pd.to_datetime(pd.Series(uniq), errors="coerce").to_numpy()
+        return pd.Series(np.where(codes >= 0, conv[codes], np.datetime64("NaT")), index=chunk.index,
+                         dtype="datetime64[ns]")
+    sw = chunk[cols["week"]].astype(str).str.extract(r"(\d+)", expand=False).fillna("1").astype(int)
+    sy = chunk[cols["year"]].astype(str).str.extract(r"(\d{4})", expand=False).fillna("2020")
+    iso = sy + "-W" + sw.astype(str).str.zfill(2) + "-1"
+    return pd.to_datetime(iso, format="%G-W%V-%u", errors="coerce")
+
+
+def _normalize_oscour(path, chunk_rows: int = OSCOUR_CHUNK_ROWS):
+    """Fichier brut OSCOUR -> agrégats par jour [date, region, dep, age_band, er_visits, admissions]."""
+    # 0) En-tête seulement: détection des colonnes utiles (les autres ne sont pas lues)
+    header = read_csv_sniffed(path, nrows=0).columns
+    lower = {c.strip().lower(): c for c in header}
+    pick = lambda cands: next((lower[c] for c in cands if c in lower), None)
+
+    cols = {"date": pick(OSCOUR_DATE_COLS), "week": pick(["semaine","week","sem"]),
+            "year": pick(["annee","year","anne"])}
+    if cols["date"] is None and not (cols["week"] and cols["year"]):
+        cols["date"] = next((orig for low, orig in lower.items() if "date" in low), None)
+        if cols["date"] is None:
+            raise ValueError("OSCOUR: aucune colonne de date/semaine trouvée.")
+    geocol, agecol = pick(OSCOUR_GEO_COLS), pick(OSCOUR_AGE_COLS)
+    measures = {k: pick(v) for k, v in OSCOUR_MEASURES.items()}
+    usecols = [c for c in [cols["date"], cols["week"], cols["year"], geocol, agecol, *measures.values()] if c]
+    str_cols = {c: "string" for c in usecols if c not in measures.values()}
+
+    geo = _region_lookup()  # lookups mémoïsés par valeur distincte (alimentés au fil des blocs)
+    kind = "dep" if geocol and "dep" in geocol.strip().lower() else "reg"
+    band_of = {}
+
+    # 1) Lecture par blocs + agrégation incrémentale
+    acc = None
+    for chunk in read_csv_sniffed(path, usecols=usecols, dtype=str_cols, chunksize=chunk_rows):
+        # agrégat par jour (et non par semaine) : une semaine à cheval sur deux mois ne déplace pas
+        # de passages d'un mois à l'autre dans les sommes mensuelles de feature_engineering
+        day = _oscour_dates(chunk, cols).dt.normalize()
+
+        if geocol:
+            # a) codes "REG-84" / "84" / "2A" (département -> région si maille départementale) ; b) noms
+            g = chunk[geocol].fillna("")
+            region = geo.to_code(g, kind).astype(object)
+            miss = region.isna()
+            if miss.any():
+                region[miss] = geo.to_code(g[miss], "name").astype(object)
         else:
-            wk = next((c for c in ["semaine","week","sem"] if c in df.columns), None)
-            yr = next((c for c in ["annee","year","anne"] if c in df.columns), None)
-            if wk and yr:
-                sw = df[wk].astype(str).str.extract(r"(\d+)", expand=False).fillna("1").astype(int)
-                sy = df[yr].astype(str).str.extract(r"(\d{4})", expand=False).fillna("2020")
-                iso = sy + "-W" + sw.astype(str).str.zfill(2) + "-1"
-                df["date"] = pd.to_datetime(iso, format="%G-W%V-%u", errors="coerce")
-            else:
-                like_date = [c for c in df.columns if "date" in c]
-                if like_date:
-                    df["date"] = pd.to_datetime(df[like_date[0]], errors="coerce")
-                else:
-                    raise ValueError("OSCOUR: aucune colonne de date/semaine trouvée.")
-
-    # 2) Détection de la géographie (si présente)
-    geo_candidates = [
-        "code_insee_region","code_region","reg","region","maille_code",
-        "libelle_region","libelle_reg","nom_region","geo_name","libgeo","libelle","zone","territoire","maille",
-        "region_name"
-    ]
-    geocol = next((c for c in geo_candidates if c in df.columns), None)
-
-    rm = _load_region_mapping_short()
-
-    def _series_to_region_short(sr):
-        """Essaie d'extraire un code court (IDF/ARA/...) depuis une série de codes/noms/mailles."""
-        # a) codes "REG-84" / "84" / "2A" etc.
-        cand_num = sr.astype(str).str.extract(r"(\d{2,3}|2A|2B)", expand=False)
-        cand_num = cand_num.replace({"2A":"94","2B":"94"})
-        cand_num2 = cand_num.map(lambda x: dep_to_reg.get(x, x) if isinstance(x,str) and len(x) in (2,3) else x)
-        tmp = pd.DataFrame({"insee": cand_num2})
-        tmp["insee"] = tmp["insee"].astype(str).str.extract(r"(\d{2})", expand=False)
-        m = tmp.merge(rm, on="insee", how="left")["region"]
-        if not m.isna().all():
-            return m
-        # b) noms de région
-        gnorm = sr.map(_nrm)
-        m2 = pd.DataFrame({"region_name_norm": gnorm}).merge(rm, on="region_name_norm", how="left")["region"]
-        return m2
-
-    if geocol:
-        region_short = _series_to_region_short(df[geocol])
-    else:
-        region_short = pd.Series([np.nan]*len(df))
-
-    # 3) Age -> age_band
-    def map_age_band(v):
-        s = str(v).lower()
-        if any(x in s for x in ["0-4","0_4","5-14","5_14","0-14","0_14","0-17"]): return "0-17"
-        if any(x in s for x in ["15-64","15_64","18-64","18_64"]): return "18-64"
-        if any(x in s for x in ["65","65+","65 ans","65 ans ou plus","65 ans et plus"]): return "65+"
-        m = re.findall(r"\d+", s)
-        if m:
-            a = max(int(x) for x in m)
-            return "0-17" if a<18 else ("18-64" if a<65 else "65+")
-        return "18-64"
-
-    age_col = next((c for c in ["sursaud_cl_age_gene","classe_age","age_classe","age","classe_age_quinquennale","tranche_age"] if c in df.columns), None)
-    df["age_band"] = df[age_col].apply(map_age_band) if age_col else "18-64"
-
-    # 4) Mesures -> er_visits/admissions (ici ce sont des TAUX dans ton export)
-    # On mappe:
-    # - er_visits ← taux_passages_grippe_sau (taux)
-    # - admissions ← taux_hospit_grippe_sau (taux)
-    ev = None
-    if "taux_passages_grippe_sau" in df.columns:
-        ev = pd.to_numeric(df["taux_passages_grippe_sau"], errors="coerce")
-    elif "valeur" in df.columns:
-        ev = pd.to_numeric(df["valeur"], errors="coerce")
-    else:
-        ev = pd.Series([0]*len(df), dtype=float)
-
-    adm = None
-    if "taux_hospit_grippe_sau" in df.columns:
-        adm = pd.to_numeric(df["taux_hospit_grippe_sau"], errors="coerce")
-    elif "admissions" in df.columns:
-        adm = pd.to_numeric(df["admissions"], errors="coerce")
-    else:
-        adm = pd.Series([0]*len(df), dtype=float)
+            region = pd.Series(np.nan, index=chunk.index, dtype=object)
 
-    base = pd.DataFrame({
-        "date": df["date"],
-        "age_band": df["age_band"],
-        "er_visits": ev.fillna(0.0).astype(float),
-        "admissions": adm.fillna(0.0).astype(float),
-    })
-
-    # 5) Si aucune région déterminée → mode NATIONAL: répliquer sur toutes les régions
-    if region_short.isna().all():
-        all_regs = rm["region"].unique().tolist()  # IDF, ARA, ...
-        out_list = []
-        for r in all_regs:
-            tmp = base.copy()
-            tmp["region"] = r
-            out_list.append(tmp)
-        out = pd.concat(out_list, ignore_index=True)
+        if agecol:
+            a = chunk[agecol].fillna("")
+            for v in set(a.unique()) - band_of.keys():
+                band_of[v] = _oscour_age_band(v)
+            band = a.map(band_of)
+        else:
+            band = pd.Series("18-64", index=chunk.index)
+
+        dep = geo.dep_codes(g).fillna("") if kind == "dep" else ""
+
+        part = pd.DataFrame({
+            "date": day, "region": region.fillna("__NA__"), "dep": dep, "age_band": band,
+            **{k: (pd.to_numeric(chunk[c], errors="coerce").fillna(0.0) if c else 0.0)
+               for k, c in measures.items()},
+        }).dropna(subset=["date"])
+        part = part.groupby(["date","region","dep","age_band"])[["er_visits","admissions"]].sum()
+        acc = part if acc is None else acc.add(part, fill_value=0.0)
+
+    cols_out = ["date","region","dep","age_band","er_visits","admissions"]
+    if acc is None:
+        return pd.DataFrame(columns=cols_out)
+    base = acc.reset_index()
+
+    # 2) Si aucune région déterminée → mode NATIONAL: répliquer sur toutes les régions
+    if (base["region"] == "__NA__").all():
+        base = base.groupby(["date","age_band"], as_index=False)[["er_visits","admissions"]].sum()
+        all_regs = geo.categories.tolist()  # IDF, ARA, ...
+        out = base.merge(pd.DataFrame({"region": all_regs, "dep": ""}), how="cross")
     else:
         out = base.copy()
-        out["region"] = region_short.fillna("IDF").astype(str)
-
-    out = out.dropna(subset=["date"])
-    out.to_csv(RAW_DIR / "oscour_norm.csv", index=False)
-    return out
+        out["region"] = out["region"].replace("__NA__", "IDF")
+        out = out.groupby(["date","region","dep","age_band"], as_index=False)[["er_visits","admissions"]].sum()
 
+    # dep vide (maille régionale/nationale ou code non reconnu) -> manquant
+    out["dep"] = out["dep"].replace("", None)
+    out = out[cols_out]
+    return out.sort_values(["region","dep","age_band","date"], na_position="first").reset_index(drop=True)
 
 
-
-
-
-def download_insee_pop():
+def download_insee_pop(fetch_raw: bool = True):
     """
     Télécharge & normalise POP1A (population par âge) ou construit un proxy si l'endpoint est KO.
     Sortie normalisée attendue par la pipeline : [region(INSEE ou court ensuite mappé), age_band, population]
     """
-    import pandas as pd, requests
-    from io import BytesIO
+    import pandas as pd
 
-    url_candidates = [
-        # 2022 (souvent OK, mais parfois 500 comme chez toi)
-        _cfg().get("insee_pop_csv_url"),
-        # Fallbacks plausibles (autres millésimes POP1A) — modifiables :
-        "https://www.insee.fr/fr/statistiques/fichier/7650800/pop1a-2021.csv",
-        "https://www.insee.fr/fr/statistiques/fichier/7650792/pop1a-2020.csv",
-    ]
     path = RAW_DIR / "insee_pop_raw.csv"
-
-    def try_download(u):
-        if not u: return None
-        try:
-            r = requests.get(u, timeout=60)
-            r.raise_for_status()
-            path.write_bytes(r.content)
-            return path
-        except Exception:
-            return None
-
-    got = None
-    for u in url_candidates:
-        got = try_download(u)
-        if got is not None:
-            break
+    if fetch_raw:
+        res = fetch_first(_insee_urls(), path)
+        got = res.path if res is not None else None
+    else:
+        got = path if path.exists() else None
 
     if got is None:
         # -------- PROXY DE SECOURS ----------
@@ -360,14 +325,20 @@ def download_insee_pop():
                 rows.append({"region": r["insee"], "age_band": band, "population": int(base * w)})
         out = pd.DataFrame(rows)
         out.to_csv(RAW_DIR / "insee_population_norm.csv", index=False)
+        parquet_path(RAW_DIR / "insee_population_norm.csv").unlink(missing_ok=True)
         return out
 
+    return cached_normalize("insee", got, RAW_DIR / "insee_population_norm.csv", _normalize_insee_pop,
+                            code=[_region_lookup], deps=[_region_mapping_path()])
+
+
+def _normalize_insee_pop(path):
+    """Fichier brut POP1A -> [region (INSEE 2 chiffres), (dep,) age_band, population]."""
+    import pandas as pd
+
     # -------- Lecture & normalisation quand le CSV est dispo ----------
-    # Le POP1A utilise généralement ';'
-    try:
-        df = pd.read_csv(path, sep=';')
-    except Exception:
-        df = pd.read_csv(path)
+    # Le POP1A utilise généralement ';' (détecté)
+    df = read_csv_sniffed(path)
     df.columns = [c.lower() for c in df.columns]
 
     # Colonnes usuelles : 'reg' (code région), 'agepyr10' (classe âge), 'nb' (effectif)
@@ -390,39 +361,38 @@ def download_insee_pop():
         return "65+"
 
     df["age_band"] = df[age_col].apply(band_from_age10)
-    pop = (df.groupby([reg_col, "age_band"], as_index=False)[nb_col]
+    # Millésime départemental (colonne 'dep') : la maille est conservée pour le mode département
+    keys = [reg_col, "dep", "age_band"] if "dep" in df.columns else [reg_col, "age_band"]
+    if "dep" in df.columns:
+        df["dep"] = _region_lookup().dep_codes(df["dep"])
+    pop = (df.groupby(keys, as_index=False, dropna=False)[nb_col]
              .sum().rename(columns={reg_col: "region", nb_col: "population"}))
 
     # Harmonise code INSEE sur 2 chiffres (ex: '11')
     pop["region"] = pop["region"].astype(str).str.zfill(2)
-
-    pop.to_csv(RAW_DIR / "insee_population_norm.csv", index=False)
     return pop
 
 
-def download_meteo_region():
+def download_meteo_region(fetch_raw: bool = True):
     """
     Télécharge & normalise la température quotidienne régionale (ODRÉ).
     - Gère ;/, et plusieurs schémas: tmean / tmoy / tmin+tmax / t / tmoyenne / temp_moy...
     - Normalise la sortie: [date, region, tmean]
       * region = code INSEE (2 chiffres) si dispo, sinon tente un mapping nom -> code court puis re-map INSEE.
     """
-    import pandas as pd, numpy as np, re
-
-    url = _cfg()["meteo_regionale_url"]
     path = RAW_DIR / "meteo_regionale.csv"
-    _dl(url, path)
+    if fetch_raw:
+        _dl(_cfg()["meteo_regionale_url"], path)
+    return cached_normalize("meteo", path, RAW_DIR / "meteo_region_norm.csv", _normalize_meteo,
+                            code=[_load_region_mapping_short, _nrm], deps=[_region_mapping_path()])
 
-    # 1) Lecture robuste
-    def _read_any(p):
-        try:
-            df = pd.read_csv(p, sep=';')
-            if df.shape[1] == 1:
-                raise ValueError
-            return df
-        except Exception:
-            return pd.read_csv(p)
-    df = _read_any(path)
+
+def _normalize_meteo(path):
+    """Fichier brut ODRÉ -> [date, region (INSEE 2 chiffres), tmean]."""
+    import pandas as pd, numpy as np, re
+
+    # 1) Lecture (séparateur/encodage détectés)
+    df = read_csv_sniffed(path)
     df.columns = [c.strip().lower() for c in df.columns]
 
     # 2) Date
@@ -502,16 +472,24 @@ def download_meteo_region():
         "region": reg_final.astype(str).str.zfill(2),
         "tmean": df["tmean"]
     }).dropna(subset=["date"])
-
-    out.to_csv(RAW_DIR / "meteo_region_norm.csv", index=False)
     return out
 
 
-def run_all():
-    sent = download_sentinelles()
-    osc = download_oscour()
-    pop = download_insee_pop()
-    met = download_meteo_region()
+def run_all(max_workers: int = 4):
+    # 1) Téléchargements concurrents et conditionnels (304 / contenu identique -> rien de réécrit)
+    fetched = fetch_all(_source_jobs(), max_workers=max_workers)
+    for name, res in fetched.items():
+        state = res.status if not isinstance(res, Exception) else f"échec ({res})"
+        print(f"[download] {name}: {state}")
+    for name in ("sentinelles", "oscour", "meteo"):
+        if isinstance(fetched[name], Exception):
+            raise fetched[name]
+
+    # 2) Normalisations sur les fichiers bruts locaux (INSEE: proxy si aucun millésime dispo)
+    sent = download_sentinelles(fetch_raw=False)
+    osc = download_oscour(fetch_raw=False)
+    pop = download_insee_pop(fetch_raw=False)
+    met = download_meteo_region(fetch_raw=False)
     return {"sentinelles": len(sent), "oscour": len(osc), "insee": len(pop), "meteo": len(met)}
 
 if __name__ == "__main__":
@@ -4,11 +4,12 @@ Assemblage & features: jointure des sources, lags, moyennes mobiles, calendrier.
 import os
 import pandas as pd
 import numpy as np
-from .data_ingestion import (load_insee_population, load_region_mapping,
-                             load_sentinelles_incidence, load_oscour_urgences,
-                             load_meteo_temperature, load_vaccination_doses)
-from .config import PROCESSED_DIR, INTERIM_DIR, FREQ, AGE_BANDS
+from .data_ingestion import load_all_sources, check_granularity
+from . import climatology
+from .config import PROCESSED_DIR, INTERIM_DIR, FREQ, AGE_BANDS, GRANULARITIES
 from .utils import week_start, safe_merge
+from .tracing import span, traced
+from . import artifacts
 
 def to_month_start(s: pd.Series) -> pd.Series:
     """
@@ -33,10 +34,60 @@ def _weekly_resample(df, date_col="date", on_cols=("region",), how="sum"):
     agg = {c: how for c in num_cols}
     return df.groupby(group_cols, as_index=False).agg(agg).rename(columns={"week":"date"})
 
-def build_feature_table(save=True):
+
+# ==== Agrégats mensuels & lags / moyennes mobiles (partagés avec src.nowcast) ====
+LAG_SOURCES = ["doses_per_100k","incidence_per_100k","tmean","er_visits","admissions"]
+LAGS = (1,2,3,6,12)
+WINDOWS = (2,3,6,12)
+
+
+def incidence_monthly(inc: pd.DataFrame) -> pd.DataFrame:
+    """Sentinelles hebdo -> moyenne mensuelle [region, date, incidence_per_100k]."""
+    inc_m = inc.copy()
+    inc_m["date"] = to_month_start(inc_m["date"])
+    return (inc_m.groupby(["region","date"], as_index=False)["incidence_per_100k"]
+                 .mean().sort_values(["region","date"]))
+
+
+def urgences_monthly(urg: pd.DataFrame, keys) -> pd.DataFrame:
+    """OSCOUR hebdo -> somme mensuelle [*keys, date, er_visits, admissions]."""
+    # (si tu préfères moyenne, remplace .sum() par .mean())
+    urg_m = urg.copy()
+    urg_m["date"] = to_month_start(urg_m["date"])
+    return (urg_m.groupby(list(keys) + ["date"], as_index=False)[["er_visits","admissions"]]
+                 .sum().sort_values(list(keys) + ["date"]))
+
+
+def add_lags(df, keys, cols, lags=LAGS):
+    df = df.sort_values(list(keys) + ["date"]).copy()
+    g = df.groupby(list(keys), sort=False)
+    for col in cols:
+        for L in lags:
+            df[f"{col}_lag{L}"] = g[col].shift(L)
+    return df
+
+
+def add_rollings(df, keys, cols, windows=WINDOWS):
+    df = df.sort_values(list(keys) + ["date"]).copy()
+    g = df.groupby(list(keys), sort=False)
+    for col in cols:
+        for W in windows:
+            df[f"{col}_ma{W}"] = g[col].transform(lambda s: s.rolling(window=W, min_periods=1).mean())
+    return df
+
+
+def lag_ma_columns(cols, lags=LAGS, windows=WINDOWS) -> list:
+    """Noms des colonnes *_lag* / *_ma* dérivées de `cols`."""
+    return [f"{c}_lag{L}" for c in cols for L in lags] + [f"{c}_ma{W}" for c in cols for W in windows]
+
+
+@traced("features.build")
+def build_feature_table(save=True, granularity=None):
     """
     Construit la table d'apprentissage MENSUELLE :
       - fréquence: 1er jour du mois (MS)
+      - séries: région × âge, ou département × âge si granularity="departement"
+        (défaut: env FORECAST_GRANULARITY) ; clés dans X.attrs["GROUP_COLS"]
       - cible y = doses_per_100k (mensuel)
       - features: uniquement *_lag* / *_ma* (past-only) + calendrier (month/year, is_campaign, is_winter)
       - filets de sécurité :
@@ -44,25 +95,27 @@ def build_feature_table(save=True):
           * exogènes étendus jusqu'à l'horizon par climatologie région×mois
       - horizon futur paramétrable via l'env FORECAST_HORIZON_MONTHS (par défaut 6)
     """
-    # ========= 1) Chargement =========
-    pop = load_insee_population()                # [region, age_band, population]
-    inc = load_sentinelles_incidence()           # [date, region, incidence_per_100k]
-    urg = load_oscour_urgences()                 # [date, region, age_band, er_visits, admissions]
-    met = load_meteo_temperature()               # [date, region, tmean]
-    vac = load_vaccination_doses()               # [date, region, age_band, doses]
+    granularity = check_granularity(granularity)
+    units = GRANULARITIES[granularity]           # ["region"] ou ["region","dep"]
+    keys = units + ["age_band"]                  # clés d'une série
+
+    # ========= 1) Chargement (sources en parallèle) =========
+    src, load_timings = load_all_sources(granularity=granularity)
+    pop = src["population"]                      # [region, (dep,) age_band, population]
+    inc = src["incidence"]                       # [date, region, incidence_per_100k]
+    urg = src["urgences"]                        # [date, region, (dep,) age_band, er_visits, admissions]
+    met = src["meteo"]                           # [date, region, tmean]
+    vac = src["vaccination"]                     # [date, region, (dep,) age_band, doses]
 
     # ========= 2) Mensualisation des sources =========
     # Vaccination : somme par mois
     vac_m = vac.copy()
     vac_m["date"] = to_month_start(vac_m["date"])
-    vac_m = (vac_m.groupby(["region","age_band","date"], as_index=False)["doses"]
-                  .sum().sort_values(["region","age_band","date"]))
+    vac_m = (vac_m.groupby(keys + ["date"], as_index=False)["doses"]
+                  .sum().sort_values(keys + ["date"]))
 
     # Sentinelles : moyenne mensuelle
-    inc_m = inc.copy()
-    inc_m["date"] = to_month_start(inc_m["date"])
-    inc_m = (inc_m.groupby(["region","date"], as_index=False)["incidence_per_100k"]
-                  .mean().sort_values(["region","date"]))
+    inc_m = incidence_monthly(inc)
 
     # Météo : moyenne mensuelle
     met_m = met.copy()
@@ -70,19 +123,16 @@ def build_feature_table(save=True):
     met_m = (met_m.groupby(["region","date"], as_index=False)["tmean"]
                   .mean().sort_values(["region","date"]))
 
-    # OSCOUR : somme mensuelle (si tu préfères moyenne, remplace .sum() par .mean())
-    urg_m = urg.copy()
-    urg_m["date"] = to_month_start(urg_m["date"])
-    urg_m = (urg_m.groupby(["region","age_band","date"], as_index=False)[["er_visits","admissions"]]
-                  .sum().sort_values(["region","age_band","date"]))
+    # OSCOUR : somme mensuelle
+    urg_m = urgences_monthly(urg, keys)
 
     # ========= 3) Proxy doses SANS FUITE si séries plates =========
-    # détecte séries sans variance dans vac_m (par région×age)
-    is_flat = (vac_m.groupby(["region","age_band"])["doses"].std().fillna(0) == 0)
+    # détecte séries sans variance dans vac_m (par série)
+    is_flat = (vac_m.groupby(keys)["doses"].std().fillna(0) == 0)
     flat_keys = set(is_flat[is_flat].index.tolist())
     if flat_keys:
         # Joindre incidence mensuelle pour créer un proxy (lag 1 mois, lissage MA2)
-        tmp = vac_m.merge(inc_m, on=["region","date"], how="left").sort_values(["region","age_band","date"])
+        tmp = vac_m.merge(inc_m, on=["region","date"], how="left").sort_values(keys + ["date"])
         tmp["inc_ma2"] = tmp.groupby("region")["incidence_per_100k"].transform(lambda s: s.rolling(2, min_periods=1).mean())
         tmp["inc_ma2_lag1m"] = tmp.groupby("region")["inc_ma2"].transform(lambda s: s.shift(1))  # no leakage
 
@@ -93,11 +143,11 @@ def build_feature_table(save=True):
         alpha = 5.0
         rng = np.random.default_rng(123)
 
-        mask = tmp.set_index(["region","age_band"]).index.isin(flat_keys)
+        mask = tmp.set_index(keys).index.isin(flat_keys)
         synth = alpha * tmp["inc_ma2_lag1m"].fillna(0) * tmp["age_band"].map(lambda a: age_w.get(a,1.0)) * season
         synth = (synth * (1 + rng.normal(0, 0.05, len(synth)))).clip(lower=0)
         tmp.loc[mask, "doses"] = synth[mask]
-        vac_m = tmp[["region","age_band","date","doses"]]
+        vac_m = tmp[keys + ["date","doses"]]
 
     # ========= 4) Définition de la grille temps (horizon paramétrable) =========
     # bornes min/max historiques des exogènes
@@ -122,47 +172,37 @@ def build_feature_table(save=True):
     # ensemble des régions & âges à couvrir
     all_regions = sorted(set(vac_m["region"]) | set(inc_m["region"]) | set(met_m["region"]) | set(urg_m["region"]))
     all_ages = AGE_BANDS  # on couvre la grille complète
+    # unités (régions, ou départements de ces régions) ; les exogènes régionaux sont joints sur 'region'
+    if granularity == "region":
+        all_units = pd.DataFrame({"region": all_regions})
+    else:
+        all_units = (pd.concat([d[units] for d in (pop, vac_m, urg_m)], ignore_index=True)
+                       .drop_duplicates().sort_values(units).reset_index(drop=True))
 
     # ========= 5) Compléter les exogènes jusqu'à dmax (climatologie région×mois) =========
     # --- Sentinelles ---
-    inc_m["month"] = inc_m["date"].dt.month
-    inc_clim = (inc_m.groupby(["region","month"], as_index=False)["incidence_per_100k"]
-                    .mean().rename(columns={"incidence_per_100k":"inc_clim"}))
-    inc_grid = pd.MultiIndex.from_product([all_regions, all_dates], names=["region","date"]).to_frame(index=False)
-    inc_grid["month"] = inc_grid["date"].dt.month
-    inc_m_full = (inc_grid
-                  .merge(inc_m[["region","date","incidence_per_100k"]], on=["region","date"], how="left")
-                  .merge(inc_clim, on=["region","month"], how="left"))
-    inc_m_full["incidence_per_100k"] = inc_m_full["incidence_per_100k"].fillna(inc_m_full["inc_clim"]).fillna(0)
-    inc_m_full = inc_m_full[["date","region","incidence_per_100k"]]
+    inc_m_full = climatology.fill_grid(inc_m, "incidence_per_100k", all_regions, all_dates, period="month")
+    inc_m_full["incidence_per_100k"] = inc_m_full["incidence_per_100k"].fillna(0)
 
     # --- Météo ---
-    met_m["month"] = met_m["date"].dt.month
-    met_clim = (met_m.groupby(["region","month"], as_index=False)["tmean"]
-                    .mean().rename(columns={"tmean":"tmean_clim"}))
-    met_grid = pd.MultiIndex.from_product([all_regions, all_dates], names=["region","date"]).to_frame(index=False)
-    met_grid["month"] = met_grid["date"].dt.month
-    met_m_full = (met_grid
-                  .merge(met_m[["region","date","tmean"]], on=["region","date"], how="left")
-                  .merge(met_clim, on=["region","month"], how="left"))
-    met_m_full["tmean"] = met_m_full["tmean"].fillna(met_m_full["tmean_clim"])
-    met_m_full = met_m_full[["date","region","tmean"]]
+    met_m_full = climatology.fill_grid(met_m, "tmean", all_regions, all_dates, period="month")
 
     # --- Urgences ---
-    urg_grid = pd.MultiIndex.from_product([all_regions, all_ages, all_dates],
-                names=["region","age_band","date"]).to_frame(index=False)
-    urg_m_full = urg_grid.merge(urg_m, on=["region","age_band","date"], how="left")
+    urg_grid = (all_units.merge(pd.DataFrame({"age_band": all_ages}), how="cross")
+                         .merge(pd.DataFrame({"date": all_dates}), how="cross"))
+    urg_m_full = urg_grid.merge(urg_m, on=keys + ["date"], how="left")
     urg_m_full[["er_visits","admissions"]] = urg_m_full[["er_visits","admissions"]].fillna(0)
 
     # ========= 6) Grille finale & merges =========
-    grid = pd.MultiIndex.from_product([all_dates, all_regions, all_ages],
-            names=["date","region","age_band"]).to_frame(index=False)
+    grid = (pd.DataFrame({"date": all_dates})
+              .merge(all_units, how="cross")
+              .merge(pd.DataFrame({"age_band": all_ages}), how="cross"))
 
     X = (grid
-         .merge(vac_m,       on=["date","region","age_band"], how="left")
-         .merge(inc_m_full,  on=["date","region"],            how="left")
-         .merge(met_m_full,  on=["date","region"],            how="left")
-         .merge(urg_m_full,  on=["date","region","age_band"], how="left"))
+         .merge(vac_m,       on=["date"] + keys,  how="left")
+         .merge(inc_m_full,  on=["date","region"], how="left")
+         .merge(met_m_full,  on=["date","region"], how="left")
+         .merge(urg_m_full,  on=["date"] + keys,  how="left"))
 
     # ========= 7) Remplissages exogènes & normalisation =========
     X[["er_visits","admissions"]] = X[["er_visits","admissions"]].fillna(0)
@@ -174,7 +214,7 @@ def build_feature_table(save=True):
                    .apply(lambda s: s.ffill().bfill()))
 
     # Population & per 100k
-    X = X.merge(pop, on=["region","age_band"], how="left")
+    X = X.merge(pop, on=keys, how="left")
     X["population"] = X["population"].fillna(1_000_000)
     X["pop_100k"]   = X["population"] / 100_000.0
 
@@ -189,33 +229,17 @@ def build_feature_table(save=True):
     X["is_winter"]   = X["month"].isin([11,12,1,2]).astype(int)
 
     # ========= 8) Lags & moyennes mobiles (mensuel, past-only) =========
-    def add_lags(df, cols, lags=(1,2,3,6,12)):
-        df = df.sort_values(["region","age_band","date"]).copy()
-        g = df.groupby(["region","age_band"], sort=False)
-        for col in cols:
-            for L in lags:
-                df[f"{col}_lag{L}"] = g[col].transform(lambda s: s.shift(L))
-        return df
-
-    def add_rollings(df, cols, windows=(2,3,6,12)):
-        df = df.sort_values(["region","age_band","date"]).copy()
-        g = df.groupby(["region","age_band"], sort=False)
-        for col in cols:
-            for W in windows:
-                df[f"{col}_ma{W}"] = g[col].transform(lambda s: s.rolling(window=W, min_periods=1).mean())
-        return df
-
-    X = add_lags(X, ["doses_per_100k","incidence_per_100k","tmean","er_visits","admissions"])
-    X = add_rollings(X, ["doses_per_100k","incidence_per_100k","tmean","er_visits","admissions"])
+    with span("features.lags_ma") as sp:
+        X = add_lags(X, keys, LAG_SOURCES)
+        X = sp.rows(add_rollings(X, keys, LAG_SOURCES))
 
     # Remplissage de secours sur lags/MA (médiane par série)
     lagma_cols = [c for c in X.columns if any(s in c for s in ["_lag","_ma"])]
-    for col in lagma_cols:
-        X[col] = X.groupby(["region","age_band"])[col].transform(lambda s: s.fillna(s.median()))
+    X[lagma_cols] = X[lagma_cols].fillna(X.groupby(keys)[lagma_cols].transform("median"))
 
     # ========= 9) Sélection des features (past-only) + cible & futur =========
     past_feats = []
-    for c in ["doses_per_100k","incidence_per_100k","tmean","er_visits","admissions"]:
+    for c in LAG_SOURCES:
         past_feats += [col for col in X.columns if col.startswith(c+"_lag") or col.startswith(c+"_ma")]
     past_feats += ["month","year","is_campaign","is_winter"]  # calendaires OK
 
@@ -229,8 +253,15 @@ def build_feature_table(save=True):
     X.loc[X["date"] >= start_future, "y"] = np.nan
 
     # ========= 10) Sauvegarde =========
-    X = X.sort_values(["region","age_band","date"]).reset_index(drop=True)
+    X = X.sort_values(keys + ["date"]).reset_index(drop=True)
+    X.attrs["GRANULARITY"] = granularity
+    X.attrs["GROUP_COLS"] = keys
+    X.attrs["LOAD_TIMINGS"] = load_timings  # secondes par source + "_wall" (phase de chargement)
     if save:
         out = PROCESSED_DIR / "features.parquet"
-        X.to_parquet(out, index=False)
+        # fichier déterministe (sans les timings) : les étapes aval de src.dag restent à jour
+        saved = X.copy(deep=False)
+        saved.attrs = {k: v for k, v in X.attrs.items() if k != "LOAD_TIMINGS"}
+        with span("features.save", rows=len(saved)):
+            artifacts.publish(out, saved)  # gardé en mémoire pour les étapes aval du même processus
     return X
@@ -0,0 +1,222 @@
+"""
+Téléchargements concurrents et conditionnels des sources Open Data.
+- Plusieurs sources en parallèle (pool de threads), écriture en flux par blocs (pas de r.content).
+- Requêtes conditionnelles : If-None-Match (ETag) / If-Modified-Since -> 304 = rien à faire.
+- Reprise des téléchargements interrompus (fichier .part + Range / If-Range).
+- Miroir local adressé par contenu (data/raw/mirror/objects/<sha256>) + manifeste par URL :
+  une source dont le contenu n'a pas changé n'est pas réécrite (mtime conservé).
+
+Testable hors ligne : toute URL http://127.0.0.1:<port>/... (serveur local de substitution) convient,
+et `session` peut être injectée (cf. check_fetch.py : 200 / 304 / 206 / If-Range / 416 sur http.server).
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+import requests
+
+from .config import RAW_DIR
+
+MIRROR_DIR = RAW_DIR / "mirror"
+CHUNK_SIZE = 1 << 20  # 1 Mo
+TIMEOUT = (10, 120)    # (connexion, lecture) en secondes
+
+_manifest_lock = threading.Lock()
+
+
+@dataclass
+class FetchResult:
+    url: str
+    path: Path
+    status: str         # "downloaded" | "not_modified" | "unchanged"
+    sha256: str
+    size: int
+
+
+# =========================
+# Manifeste du miroir
+# =========================
+def _manifest_path(mirror: Path) -> Path:
+    return mirror / "manifest.json"
+
+
+def _load_manifest(mirror: Path) -> dict:
+    try:
+        return json.loads(_manifest_path(mirror).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _update_manifest(mirror: Path, url: str, entry: dict):
+    with _manifest_lock:
+        manifest = _load_manifest(mirror)
+        manifest[url] = entry
+        tmp = _manifest_path(mirror).with_suffix(".tmp")
+        tmp.write_text(json.dumps(manifest, indent=1, sort_keys=True), encoding="utf-8")
+        tmp.replace(_manifest_path(mirror))
+
+
+def _sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _materialize(obj: Path, out: Path):
+    """Place l'objet du miroir à l'emplacement attendu par les normaliseurs (lien dur sinon copie)."""
+    tmp = out.with_name(out.name + ".tmp")
+    tmp.unlink(missing_ok=True)
+    try:
+        os.link(obj, tmp)
+    except OSError:
+        shutil.copyfile(obj, tmp)
+    tmp.replace(out)
+
+
+def _out_is_current(out: Path, entry: dict, objects: Path) -> bool:
+    if not out.exists() or out.stat().st_size != entry.get("size"):
+        return False
+    obj = objects / entry["sha256"]
+    try:
+        return os.path.samefile(out, obj) or _sha256_file(out) == entry["sha256"]
+    except OSError:
+        return _sha256_file(out) == entry["sha256"]
+
+
+# =========================
+# Téléchargement d'une source
+# =========================
+def fetch(url: str, out_path, session: requests.Session | None = None,
+          mirror: Path | None = None, force: bool = False) -> FetchResult:
+    """
+    Télécharge `url` vers `out_path` si (et seulement si) la source a changé.
+    - 304 Not Modified, ou contenu identique (même sha256) -> fichier local laissé tel quel.
+    - Interruption -> `<out>.part` conservé ; l'appel suivant reprend avec Range/If-Range
+      (416 sur la reprise : .part supprimé, téléchargement complet).
+    """
+    out = Path(out_path)
+    mirror = Path(mirror or MIRROR_DIR)
+    objects = mirror / "objects"
+    objects.mkdir(parents=True, exist_ok=True)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    session = session or requests.Session()
+
+    entry = _load_manifest(mirror).get(url, {})
+    have_object = bool(entry) and (objects / entry.get("sha256", "")).exists()
+
+    headers = {}
+    if have_object and not force:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    part = out.with_name(out.name + ".part")
+    part_meta = part.with_name(part.name + ".json")
+    offset = 0
+    if part.exists() and part_meta.exists():
+        meta = json.loads(part_meta.read_text(encoding="utf-8"))
+        validator = meta.get("etag") or meta.get("last_modified")
+        if meta.get("url") == url and validator:
+            offset = part.stat().st_size
+            headers["Range"] = f"bytes={offset}-"
+            headers["If-Range"] = validator  # ressource modifiée entre-temps -> 200 complet
+
+    with session.get(url, headers=headers, stream=True, timeout=TIMEOUT) as r:
+        if r.status_code == 304 and have_object:
+            if not _out_is_current(out, entry, objects):
+                _materialize(objects / entry["sha256"], out)
+            return FetchResult(url, out, "not_modified", entry["sha256"], entry["size"])
+        if r.status_code == 416 and offset:
+            # .part déjà complet (interruption avant son déplacement dans le miroir) ou plus long que la
+            # ressource : reprise impossible, on repart d'un téléchargement complet (une seule fois, sans .part)
+            part.unlink(missing_ok=True)
+            part_meta.unlink(missing_ok=True)
+            r.close()
+            return fetch(url, out_path, session=session, mirror=mirror, force=force)
+        r.raise_for_status()
+
+        h = hashlib.sha256()
+        if r.status_code == 206 and offset:
+            with open(part, "rb") as f:
+                for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    h.update(block)
+            mode = "ab"
+        else:
+            offset, mode = 0, "wb"
+        etag, last_modified = r.headers.get("ETag"), r.headers.get("Last-Modified")
+        part_meta.write_text(json.dumps({"url": url, "etag": etag, "last_modified": last_modified}),
+                             encoding="utf-8")
+        with open(part, mode) as f:
+            for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+                if chunk:
+                    f.write(chunk)
+                    h.update(chunk)
+
+    sha = h.hexdigest()
+    size = part.stat().st_size
+    obj = objects / sha
+    if obj.exists():
+        part.unlink()
+    else:
+        part.replace(obj)
+    part_meta.unlink(missing_ok=True)
+
+    status = "unchanged" if entry.get("sha256") == sha else "downloaded"
+    if not _out_is_current(out, {"sha256": sha, "size": size}, objects):
+        _materialize(obj, out)
+    _update_manifest(mirror, url, {"sha256": sha, "size": size, "etag": etag,
+                                   "last_modified": last_modified, "path": out.name})
+    return FetchResult(url, out, status, sha, size)
+
+
+def fetch_first(urls, out_path, session=None, mirror=None) -> FetchResult | None:
+    """Première URL qui répond parmi des candidates (ex: millésimes INSEE), sinon None."""
+    for u in urls:
+        if not u:
+            continue
+        try:
+            return fetch(u, out_path, session=session, mirror=mirror)
+        except requests.RequestException:
+            continue
+    return None
+
+
+def fetch_all(jobs: dict, max_workers: int = 4, session_factory=requests.Session,
+              mirror: Path | None = None) -> dict:
+    """
+    Télécharge en parallèle. `jobs` = {nom: (url | [urls candidates], chemin_sortie)}.
+    Retourne {nom: FetchResult | Exception} (une source en échec n'interrompt pas les autres).
+    """
+    local = threading.local()
+
+    def _session():
+        if not hasattr(local, "s"):
+            local.s = session_factory()
+        return local.s
+
+    def _run(spec):
+        urls, out = spec
+        if isinstance(urls, (list, tuple)):
+            res = fetch_first(urls, out, session=_session(), mirror=mirror)
+            if res is None:
+                raise requests.RequestException(f"aucune URL disponible: {urls}")
+            return res
+        return fetch(urls, out, session=_session(), mirror=mirror)
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {name: pool.submit(_run, spec) for name, spec in jobs.items()}
+        for name, fut in futures.items():
+            try:
+                results[name] = fut.result()
+            except Exception as e:  # noqa: BLE001 - remonté à l'appelant par source
+                results[name] = e
+    return results
@@ -0,0 +1,212 @@
+"""
+Référentiel géographique unique : département / code postal / code région INSEE / nom -> région
+(code INSEE, code court IDF/ARA/..., nom), codes département normalisés et départements par région.
+Partagé par download_open_data (OSCOUR), data_ingestion (harmonisation des régions)
+et Prev_pharmacie (trans, fusion_previs).
+
+Les tables sont compilées une fois en tableaux indexés par identifiant de région ; les séries
+sont traitées sur leurs valeurs DISTINCTES (pd.factorize) puis reprojetées par tableau,
+donc des millions de lignes ne coûtent qu'un lookup O(1) par valeur distincte.
+"""
+import re
+import threading
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+# INSEE région -> (code court, nom)
+REGIONS = {
+    "11": ("IDF", "Île-de-France"),
+    "24": ("CVL", "Centre-Val de Loire"),
+    "27": ("BFC", "Bourgogne-Franche-Comté"),
+    "28": ("NOR", "Normandie"),
+    "32": ("HDF", "Hauts-de-France"),
+    "44": ("GES", "Grand Est"),
+    "52": ("PDL", "Pays de la Loire"),
+    "53": ("BRE", "Bretagne"),
+    "75": ("NAQ", "Nouvelle-Aquitaine"),
+    "76": ("OCC", "Occitanie"),
+    "84": ("ARA", "Auvergne-Rhône-Alpes"),
+    "93": ("PAC", "Provence-Alpes-Côte d'Azur"),
+    "94": ("COR", "Corse"),
+    "01": ("GUA", "Guadeloupe"),
+    "02": ("MAR", "Martinique"),
+    "03": ("GUY", "Guyane"),
+    "04": ("REU", "La Réunion"),
+    "06": ("MAY", "Mayotte"),
+}
+
+# Département -> INSEE région (découpage 2016+) ; "20" = Corse (préfixe des CP 20xxx)
+DEP_TO_REG = {
+    "971":"01","972":"02","973":"03","974":"04","976":"06",
+    "2A":"94","2B":"94","20":"94",
+    "01":"84","02":"32","03":"84","04":"93","05":"93","06":"93","07":"84","08":"44","09":"76",
+    "10":"44","11":"76","12":"76","13":"93","14":"28","15":"84","16":"75","17":"75","18":"24",
+    "19":"75","21":"27","22":"53","23":"75","24":"75","25":"27","26":"84","27":"28","28":"24",
+    "29":"53","30":"76","31":"76","32":"76","33":"75","34":"76","35":"53","36":"24","37":"24",
+    "38":"84","39":"27","40":"75","41":"24","42":"84","43":"84","44":"52","45":"24","46":"76",
+    "47":"75","48":"76","49":"52","50":"28","51":"44","52":"44","53":"52","54":"44","55":"44",
+    "56":"53","57":"44","58":"27","59":"32","60":"32","61":"28","62":"32","63":"84","64":"75",
+    "65":"76","66":"76","67":"44","68":"44","69":"84","70":"27","71":"27","72":"52","73":"84",
+    "74":"84","75":"11","76":"28","77":"11","78":"11","79":"75","80":"32","81":"76","82":"76",
+    "83":"93","84":"93","85":"52","86":"75","87":"75","88":"44","89":"27","90":"27","91":"11",
+    "92":"11","93":"11","94":"11","95":"11"
+}
+
+_REG_CODE_RE = re.compile(r"(\d{2})")
+_DEP_CODE_RE = re.compile(r"(97\d|\d{2}|2A|2B)", re.I)
+_CP_RE = re.compile(r"^\s*(\d{5})")
+_DEP_NUM_RE = re.compile(r"^\s*(\d{1,3})(?:\.0+)?\s*$")  # 1 / 1.0 (colonne lue en numérique) -> "01"
+
+
+def norm_name(s) -> str:
+    """Nom de région comparable: sans accents, majuscules, sans espaces/tirets/apostrophes."""
+    if s is None or (not isinstance(s, str) and pd.isna(s)):
+        return ""
+    s = unicodedata.normalize("NFKD", str(s)).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[\s\-'’]+", "", s.upper())
+
+
+class RegionLookup:
+    """
+    Tables compilées pour un référentiel de régions [insee, region (code court), region_name].
+    Méthodes vectorisées (Series -> Categorical des codes courts) et équivalents scalaires O(1).
+    """
+
+    def __init__(self, regions: pd.DataFrame | None = None):
+        if regions is None:
+            regions = pd.DataFrame([(k, v[0], v[1]) for k, v in REGIONS.items()],
+                                   columns=["insee", "region", "region_name"])
+        rm = regions.astype({"insee": str, "region": str})
+        rm = rm.assign(insee=rm["insee"].str.zfill(2), region=rm["region"].str.upper().str.strip())
+        rm = rm.drop_duplicates("insee").reset_index(drop=True)
+        self.insee = rm["insee"].to_numpy(dtype=object)
+        self.code = rm["region"].to_numpy(dtype=object)
+        self.name = (rm["region_name"] if "region_name" in rm else rm["region"]).to_numpy(dtype=object)
+        self.categories = pd.Index(pd.unique(rm["region"]))
+
+        self._by_insee = {k: i for i, k in enumerate(self.insee)}
+        self._by_code = {k: i for i, k in enumerate(self.code)}
+        self._by_name = {norm_name(n): i for i, n in enumerate(self.name)}
+        self._by_name.update({norm_name(c): i for i, c in enumerate(self.code)})
+        self._by_dep = {d: self._by_insee[r] for d, r in DEP_TO_REG.items() if r in self._by_insee}
+        self._memo = {}
+        self._lock = threading.Lock()
+
+    # ---------- scalaires (repli O(1) par valeur) ----------
+    def id_from_reg(self, v):
+        m = _REG_CODE_RE.search(str(v)) if v is not None else None
+        return self._by_insee.get(m.group(1)) if m else None
+
+    def id_from_dep(self, v):
+        m = _DEP_CODE_RE.search(str(v)) if v is not None else None
+        return self._by_dep.get(m.group(1).upper()) if m else None
+
+    def id_from_cp(self, v):
+        m = _CP_RE.match(str(v)) if v is not None else None
+        if not m:
+            return None
+        cp = m.group(1)
+        return self._by_dep.get(cp[:3]) if cp.startswith("97") else self._by_dep.get(cp[:2])
+
+    def id_from_name(self, v):
+        return self._by_name.get(norm_name(v))
+
+    def id_from_code(self, v):
+        return self._by_code.get(str(v).upper().strip()) if v is not None else None
+
+    def id_auto(self, v):
+        """Code court, sinon code région INSEE, sinon nom."""
+        for fn in (self.id_from_code, self.id_from_reg, self.id_from_name):
+            i = fn(v)
+            if i is not None:
+                return i
+        return None
+
+    def dep_code(self, v):
+        """Code département normalisé ("01", "2A", "971") ; None si inconnu (ou "20", préfixe CP de la Corse)."""
+        if v is None or (not isinstance(v, str) and pd.isna(v)):
+            return None
+        m = _DEP_NUM_RE.match(str(v))
+        d = m.group(1).zfill(2) if m else None
+        if d is None:
+            m = _DEP_CODE_RE.search(str(v))
+            d = m.group(1).upper() if m else None
+        return d if d in self._by_dep and d != "20" else None
+
+    # ---------- vectorisé ----------
+    def ids(self, values: pd.Series, kind: str = "auto") -> np.ndarray:
+        """Identifiants de région (-1 si inconnu), via les valeurs distinctes de la série."""
+        fn = getattr(self, f"id_from_{kind}") if kind != "auto" else self.id_auto
+        codes, uniques = pd.factorize(pd.Series(values), use_na_sentinel=True)
+        with self._lock:
+            memo = self._memo.setdefault(kind, {})
+            out = np.empty(len(uniques), dtype=np.int64)
+            for j, u in enumerate(uniques):
+                i = memo.get(u)
+                if i is None:
+                    i = fn(u)
+                    memo[u] = -1 if i is None else i
+                    i = memo[u]
+                out[j] = i
+        return np.where(codes >= 0, out[codes] if len(out) else -1, -1)
+
+    def dep_codes(self, values: pd.Series) -> pd.Series:
+        """Codes département normalisés (None si inconnu), via les valeurs distinctes de la série."""
+        values = pd.Series(values)
+        codes, uniques = pd.factorize(values, use_na_sentinel=True)
+        with self._lock:
+            memo = self._memo.setdefault("dep_code", {})
+            conv = np.empty(len(uniques), dtype=object)
+            for j, u in enumerate(uniques):
+                if u not in memo:
+                    memo[u] = self.dep_code(u)
+                conv[j] = memo[u]
+        out = np.full(len(values), None, dtype=object)
+        out[codes >= 0] = conv[codes[codes >= 0]]
+        return pd.Series(out, index=values.index)
+
+    def departements(self, regions=None) -> pd.DataFrame:
+        """[region (code court), dep] : départements des régions demandées (toutes par défaut), triés."""
+        rows = [(self.code[i], d) for d, i in self._by_dep.items() if d != "20"]
+        out = pd.DataFrame(rows, columns=["region", "dep"])
+        if regions is not None:
+            out = out[out["region"].isin(list(regions))]
+        return out.sort_values(["region", "dep"]).reset_index(drop=True)
+
+    def _take(self, table: np.ndarray, ids: np.ndarray) -> np.ndarray:
+        res = table[np.where(ids >= 0, ids, 0)] if len(table) else np.full(len(ids), None, dtype=object)
+        res = res.astype(object)
+        res[ids < 0] = None
+        return res
+
+    def to_code(self, values: pd.Series, kind: str = "auto") -> pd.Series:
+        """Codes courts (Categorical) ; NaN si inconnu."""
+        values = pd.Series(values)
+        ids = self.ids(values, kind)
+        code_ids = self.categories.get_indexer(self._take(self.code, ids))
+        cat = pd.Categorical.from_codes(np.where(ids >= 0, code_ids, -1), categories=self.categories)
+        return pd.Series(cat, index=values.index)
+
+    def to_columns(self, values: pd.Series, kind: str = "auto") -> pd.DataFrame:
+        """[region_insee, region_code3, region_name] (None si inconnu)."""
+        values = pd.Series(values)
+        ids = self.ids(values, kind)
+        return pd.DataFrame({"region_insee": self._take(self.insee, ids),
+                             "region_code3": self._take(self.code, ids),
+                             "region_name": self._take(self.name, ids)}, index=values.index)
+
+    def harmonize(self, values: pd.Series) -> pd.Series:
+        """
+        Harmonise une colonne région en codes courts (texte) :
+        - si elle contient déjà des codes courts connus, valeurs gardées (majuscules, sans espaces)
+        - sinon code INSEE -> code court ; valeur d'origine si non mappable
+        """
+        vals = pd.Series(values).astype(str).str.upper().str.strip()
+        if vals.isin(self.categories).any():
+            return vals
+        return self.to_code(vals, "reg").astype(object).fillna(vals)
+
+
+DEFAULT = RegionLookup()
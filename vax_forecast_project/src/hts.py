@@ -1,10 +1,11 @@
 """
-Réconciliation hiérarchique simple (Top-Down par proportions historiques).
-Hiérarchie: National -> Région -> (Région x âge)
+Réconciliation hiérarchique simple (Top-Down par proportions historiques, Bottom-Up pondéré).
+Hiérarchie: National -> Région -> (Région x âge) -> (Département x âge)
 Pour une implémentation avancée: MinT (nécessite covariance des erreurs).
 """
 import pandas as pd
 import numpy as np
+from .tracing import traced
 
 def topdown_proportions(df_hist, on=("region","age_band"), target="yhat"):
     """
@@ -19,6 +20,7 @@ def topdown_proportions(df_hist, on=("region","age_band"), target="yhat"):
         base["prop"] = base[target] / total
     return base[list(on)+["prop"]]
 
+@traced("hts.topdown")
 def reconcile_topdown(national_fc, proportions, on=("region","age_band"), total_col="national_total", out_col="yhat_reconciled"):
     """
     Distribue le total national par proportions vers chaque nœud fin.
@@ -32,3 +34,20 @@ def reconcile_topdown(national_fc, proportions, on=("region","age_band"), total_
         tmp[out_col] = row[total_col] * tmp["prop"]
         all_rows.append(tmp[["date"]+list(on)+[out_col]])
     return pd.concat(all_rows, ignore_index=True)
+
+@traced("hts.bottomup")
+def reconcile_bottomup(fine_fc, weights, on_fine=("region","dep","age_band"), on=("region","age_band"),
+                       target="yhat", weight_col="population"):
+    """
+    Agrège des prévisions 'par 100k' du niveau fin (département x âge) au niveau `on` (région x âge),
+    pondérées par la population : les doses de la région = somme des doses de ses départements.
+    fine_fc: DF avec [date, on_fine..., target] ; weights: DF avec [on_fine..., weight_col]
+    """
+    df = fine_fc.merge(weights[list(on_fine) + [weight_col]], on=list(on_fine), how="left")
+    w = df[weight_col].fillna(0.0)
+    df["_num"] = df[target] * w
+    df["_w"] = w
+    agg = df.groupby(["date", *on], as_index=False, observed=True).agg(
+        _num=("_num", "sum"), _w=("_w", "sum"), _mean=(target, "mean"))
+    agg[target] = (agg["_num"] / agg["_w"].replace(0, np.nan)).fillna(agg["_mean"])  # sans poids: moyenne simple
+    return agg[["date", *on, target]]
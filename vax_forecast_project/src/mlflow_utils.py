@@ -1,7 +1,153 @@
-import mlflow
+"""
+MLflow : configuration + journal de run tamponné.
+RunLogger garde métriques / params / tags en mémoire et les écrit par log_batch depuis un thread
+de fond (paquets <= limites MLflow), avec les artefacts (texte, JSON, tables parquet) : l'entraînement
+n'attend jamais les écritures du file store. Les tables par série / par origine partent en UN
+artefact parquet (log_table) plutôt qu'en milliers de métriques.
+"""
+import json
+import queue
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
 from .config import MLFLOW_TRACKING_URI, EXPERIMENT_NAME
 
+MAX_METRICS = 1000    # par appel log_batch (limites du serveur de tracking)
+MAX_PARAMS_TAGS = 100
+
+
 def setup_mlflow():
+    import mlflow  # import différé : ~1.5 s, inutile hors entraînement
     mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
     mlflow.set_experiment(EXPERIMENT_NAME)
     return mlflow
+
+
+class RunLogger:
+    """
+    Interface log_metric(s) / log_param(s) / set_tag / log_text / log_dict / log_table d'un run,
+    non bloquante : les appels empilent, un thread vide la file toutes les `flush_every` secondes
+    (ou dès MAX_METRICS métriques en attente). close() vide tout et attend la fin des écritures.
+    Une erreur de tracking est signalée (print) sans interrompre l'entraînement.
+    """
+
+    def __init__(self, client, run_id: str, flush_every: float = 1.0):
+        self.client, self.run_id, self.flush_every = client, run_id, flush_every
+        self._lock = threading.Lock()
+        self._metrics, self._params, self._tags = [], {}, {}
+        self._artifacts = queue.Queue()
+        self._wake = threading.Event()
+        self._closed = False
+        self.errors = []
+        self._thread = threading.Thread(target=self._loop, name="mlflow-logger", daemon=True)
+        self._thread.start()
+
+    # ---- API (thread appelant : mémoire seulement) ----
+    def log_metric(self, key, value, step: int = 0):
+        self.log_metrics({key: value}, step)
+
+    def log_metrics(self, metrics: dict, step: int = 0):
+        from mlflow.entities import Metric
+        ts = int(time.time() * 1000)
+        batch = [Metric(k, float(v), ts, step) for k, v in metrics.items()]
+        with self._lock:
+            self._metrics.extend(batch)
+            full = len(self._metrics) >= MAX_METRICS
+        if full:
+            self._wake.set()
+
+    def log_param(self, key, value):
+        self.log_params({key: value})
+
+    def log_params(self, params: dict):
+        with self._lock:
+            self._params.update({k: str(v) for k, v in params.items()})
+
+    def set_tag(self, key, value):
+        with self._lock:
+            self._tags[key] = str(value)
+
+    def log_text(self, text: str, artifact_file: str):
+        self._artifacts.put(("text", text, artifact_file))
+
+    def log_dict(self, dictionary: dict, artifact_file: str):
+        self._artifacts.put(("text", json.dumps(dictionary, default=str), artifact_file))
+
+    def log_table(self, df, artifact_file: str):
+        """DataFrame -> un artefact parquet ; instantané Arrow pris ici (df modifiable ensuite)."""
+        from .artifacts import to_table
+        self._artifacts.put(("table", to_table(df), artifact_file))
+
+    # ---- thread de fond ----
+    def _take(self):
+        with self._lock:
+            metrics, self._metrics = self._metrics, []
+            params, self._params = self._params, {}
+            tags, self._tags = self._tags, {}
+        return metrics, params, tags
+
+    def _flush(self):
+        from mlflow.entities import Param, RunTag
+        metrics, params, tags = self._take()
+        params = [Param(k, v) for k, v in params.items()]
+        tags = [RunTag(k, v) for k, v in tags.items()]
+        for i in range(0, len(metrics), MAX_METRICS):
+            self._call(self.client.log_batch, self.run_id, metrics=metrics[i:i + MAX_METRICS])
+        for i in range(0, len(params), MAX_PARAMS_TAGS):
+            self._call(self.client.log_batch, self.run_id, params=params[i:i + MAX_PARAMS_TAGS])
+        for i in range(0, len(tags), MAX_PARAMS_TAGS):
+            self._call(self.client.log_batch, self.run_id, tags=tags[i:i + MAX_PARAMS_TAGS])
+        while True:
+            try:
+                kind, payload, artifact_file = self._artifacts.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "text":
+                self._call(self.client.log_text, self.run_id, payload, artifact_file)
+            else:
+                self._call(self._log_parquet, payload, artifact_file)
+
+    def _log_parquet(self, table, artifact_file: str):
+        import pyarrow.parquet as pq
+        path = Path(artifact_file)
+        with tempfile.TemporaryDirectory() as tmp:
+            local = Path(tmp) / path.name
+            pq.write_table(table, local)
+            self.client.log_artifact(self.run_id, str(local), path.parent.as_posix() if path.parent.parts else None)
+
+    def _call(self, fn, *args, **kwargs):
+        try:
+            fn(*args, **kwargs)
+        except Exception as e:  # le tracking ne doit pas faire échouer l'entraînement
+            self.errors.append(e)
+            print(f"[mlflow] écriture ignorée ({type(e).__name__}: {e})")
+
+    def _loop(self):
+        while True:
+            self._wake.wait(self.flush_every)
+            self._wake.clear()
+            closed = self._closed
+            self._flush()
+            if closed:
+                return
+
+    def close(self):
+        """Vide les tampons et attend la fin des écritures (fin de run)."""
+        self._closed = True
+        self._wake.set()
+        self._thread.join()
+
+
+@contextmanager
+def start_run(run_name: str, flush_every: float = 1.0):
+    """with start_run("GBDT_demand_monthly") as log: log.log_metrics(...) ; run terminé après vidage."""
+    mlflow = setup_mlflow()
+    with mlflow.start_run(run_name=run_name) as run:
+        log = RunLogger(mlflow.MlflowClient(), run.info.run_id, flush_every)
+        try:
+            yield log
+        finally:
+            log.close()
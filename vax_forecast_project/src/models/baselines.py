@@ -4,8 +4,8 @@ Chaque série (region x age_band) est entraînée séparément.
 """
 import pandas as pd
 import numpy as np
-from prophet import Prophet
 import warnings
+from ..tracing import traced
 warnings.filterwarnings("ignore", category=UserWarning)
 
 def forecast_prophet(df_series, horizon_weeks=4):
@@ -13,6 +13,7 @@ def forecast_prophet(df_series, horizon_weeks=4):
     df_series: DataFrame avec colonnes [date, y]
     Retourne DataFrame avec colonnes [date, yhat]
     """
+    from prophet import Prophet  # import différé : plusieurs secondes
     tmp = df_series.rename(columns={"date":"ds","y":"y"}).copy()
     m = Prophet(weekly_seasonality=False, yearly_seasonality=True, daily_seasonality=False)
     m.fit(tmp)
@@ -30,8 +31,8 @@ def per_series_prophet(df, group_cols=("region","age_band"), target="doses_per_1
         if len(ser) < 10:
             continue
         fc = forecast_prophet(ser, horizon_weeks=horizon_weeks)
-        fc[group_cols[0]] = keys[0]
-        fc[group_cols[1]] = keys[1]
+        for col, key in zip(group_cols, keys):
+            fc[col] = key
         out.append(fc)
     if not out:
         return pd.DataFrame(columns=["date"]+list(group_cols)+["yhat"])
@@ -40,6 +41,7 @@ def per_series_prophet(df, group_cols=("region","age_band"), target="doses_per_1
 
 import pandas as pd
 
+@traced("baseline.seasonal_naive")
 def seasonal_naive_future(df: pd.DataFrame,
                           group_cols=("region","age_band"),
                           target="doses_per_100k",
@@ -48,7 +50,7 @@ def seasonal_naive_future(df: pd.DataFrame,
     Prévoit le FUTUR (où target est NaN) par 'saisonnière naïve':
       yhat = valeur à t-12 mois (si dispo), sinon moyenne des 3 derniers mois disponibles.
     Le DF doit être mensuel, trié, et contenir l'historique + les lignes futures (y NaN).
-    Retourne un DataFrame [date, region, age_band, yhat_baseline].
+    Retourne un DataFrame [date, *group_cols, yhat_baseline].
     """
     out = []
     for keys, g in df.groupby(list(group_cols)):
@@ -64,7 +66,5 @@ def seasonal_naive_future(df: pd.DataFrame,
             # backfill avec ma3 calculée sur l'historique uniquement
             hist_ma3 = g.loc[g[target].notna(), "_ma3"].iloc[-1] if (g[target].notna().any()) else 0.0
             fut["yhat_baseline"] = fut["yhat_baseline"].fillna(hist_ma3)
-        fut[group_cols[0]] = keys[0]
-        fut[group_cols[1]] = keys[1]
-        out.append(fut[[date_col, group_cols[0], group_cols[1], "yhat_baseline"]])
+        out.append(fut[[date_col, *group_cols, "yhat_baseline"]])
     return pd.concat(out, ignore_index=True) if out else pd.DataFrame(columns=[date_col, *group_cols, "yhat_baseline"])
@@ -1,9 +1,12 @@
-import pandas as pd
 import inspect
-from .gbdt_demand import rolling_cv_fit_predict
+import pickle
+from pathlib import Path
+
+import pandas as pd
+from .gbdt_demand import rolling_cv_fit_predict, global_rolling_cv_fit_predict
 from .baselines import seasonal_naive_future
-from sklearn.metrics import mean_absolute_error
 from ..utils import smape
+from ..tracing import traced
 
 def _infer_feature_cols(df: pd.DataFrame):
     past_feats = []
@@ -40,25 +43,21 @@ def _call_rolling_cv_compat(fn, *, df, group_cols, target, features,
         kwargs["horizon"] = horizon
     return fn(**kwargs)
 
-def fit_predict_ensemble(features_df: pd.DataFrame,
-                         feature_cols=None,
-                         target="doses_per_100k",
-                         group_cols=("region","age_band"),
-                         min_train_months=8,
-                         horizon_months=8,
-                         w_lgbm=0.7, w_base=0.3):
+@traced("ensemble.lgbm_member")
+def lgbm_member(features_df: pd.DataFrame, feature_cols=None, target="doses_per_100k",
+                group_cols=("region","age_band"), min_train_months=8, horizon_months=8,
+                strategy="per_series", return_models=False):
     """
-    Entraîne LGBM (past-only features) + baseline saisonnière (lag12),
-    puis produit un ensemble pour le FUTUR (lignes où target est NaN).
-    Retourne (oof_metrics, future_fc_ensemble)
+    Membre LGBM (past-only features) de l'ensemble.
+    strategy: "per_series" (un LGBM par série) ou "global" (un LGBM pour tout le panel).
+    Retourne (oof, future_lgbm) ; return_models=True : (oof, future_lgbm, modèles finaux)
     """
+    fit_fn = {"per_series": rolling_cv_fit_predict, "global": global_rolling_cv_fit_predict}[strategy]
     feats = (feature_cols
          or features_df.attrs.get("FEATURE_COLS")
          or _infer_feature_cols(features_df))
-
-    # 1) LGBM
     oof, future_lgbm, models, metrics_lgbm = _call_rolling_cv_compat(
-        rolling_cv_fit_predict,
+        fit_fn,
         df=features_df,
         group_cols=group_cols,
         target=target,
@@ -66,13 +65,42 @@ def fit_predict_ensemble(features_df: pd.DataFrame,
         min_train=min_train_months,
         horizon=horizon_months
     )
+    if return_models:
+        return oof, future_lgbm, models
+    return oof, future_lgbm
+
+
+def save_lgbm_models(path, models: dict, group_cols, strategy: str, series=None):
+    """
+    Modèles finaux du membre LGBM (pickle), repris par src.nowcast pour re-scorer l'horizon sans réentraîner.
+    models : {clé de série: modèle} (per_series) ou {"global": modèle} ; series : séries prévues
+    (défaut : clés de `models`).
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    bundle = {"strategy": strategy, "group_cols": list(group_cols), "models": models,
+              "series": [tuple(k) for k in (series if series is not None else models)]}
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump(bundle, f, protocol=pickle.HIGHEST_PROTOCOL)
+    tmp.replace(path)
 
 
+def load_lgbm_models(path) -> dict:
+    """{"strategy", "group_cols", "models", "series"} écrit par save_lgbm_models."""
+    with open(path, "rb") as f:
+        return pickle.load(f)
 
-    # 2) Baseline saisonnière sur les mêmes lignes FUTURES
-    base = seasonal_naive_future(features_df, group_cols=group_cols, target=target, date_col="date")
 
-    # 3) Ensemble sur l'intersection des futures
+@traced("ensemble.combine")
+def combine_members(features_df: pd.DataFrame, oof: pd.DataFrame, future_lgbm: pd.DataFrame,
+                    base: pd.DataFrame, group_cols=("region","age_band"), w_lgbm=0.7, w_base=0.3):
+    """
+    Ensemble des membres LGBM (oof, future_lgbm) et baseline saisonnière (base).
+    Retourne (oof_metrics, future_fc_ensemble)
+    """
+    from sklearn.metrics import mean_absolute_error
+    # Ensemble sur l'intersection des futures
     if not future_lgbm.empty and not base.empty:
         fut = future_lgbm.merge(base, on=["date", *group_cols], how="inner")
         fut["yhat_ens"] = w_lgbm * fut["yhat"] + w_base * fut["yhat_baseline"]
@@ -85,11 +113,11 @@ def fit_predict_ensemble(features_df: pd.DataFrame,
     else:
         fut = pd.DataFrame(columns=["date", *group_cols, "yhat_ens"])
 
-    # 4) Métriques OOF pour l'ensemble (où on peut)
+    # Métriques OOF pour l'ensemble (où on peut)
     if not oof.empty:
         # baseline OOF (facultatif): approximée via lag12 sur y (pas parfait mais informatif)
         df = features_df.copy()
-        df = df.sort_values(["region","age_band","date"])
+        df = df.sort_values([*group_cols, "date"])
         df["y_lag12"] = df.groupby(list(group_cols))["doses_per_100k"].shift(12)
         oof2 = oof.merge(df[["date", *group_cols, "y_lag12"]], on=["date", *group_cols], how="left")
         oof2["yhat_ens"] = w_lgbm*oof2["yhat"] + w_base*oof2["y_lag12"].fillna(oof2["yhat"])
@@ -103,3 +131,27 @@ def fit_predict_ensemble(features_df: pd.DataFrame,
         metrics_ens = pd.DataFrame(columns=[*group_cols,"SMAPE","MAE"])
 
     return metrics_ens, fut[["date", *group_cols, "yhat_ens"]]
+
+
+def fit_predict_ensemble(features_df: pd.DataFrame,
+                         feature_cols=None,
+                         target="doses_per_100k",
+                         group_cols=("region","age_band"),
+                         min_train_months=8,
+                         horizon_months=8,
+                         w_lgbm=0.7, w_base=0.3,
+                         strategy="per_series"):
+    """
+    Entraîne LGBM (past-only features) + baseline saisonnière (lag12),
+    puis produit un ensemble pour le FUTUR (lignes où target est NaN).
+    strategy: "per_series" (un LGBM par série) ou "global" (un LGBM pour tout le panel).
+    Retourne (oof_metrics, future_fc_ensemble)
+    """
+    # 1) LGBM
+    oof, future_lgbm = lgbm_member(features_df, feature_cols, target, group_cols,
+                                   min_train_months, horizon_months, strategy)
+    # 2) Baseline saisonnière sur les lignes FUTURES : cible y, NaN aux mois à prévoir (doses_per_100k y vaut 0),
+    #    comme l'étape baseline du DAG
+    base = seasonal_naive_future(features_df, group_cols=group_cols, target="y", date_col="date")
+    # 3-4) Ensemble + métriques OOF
+    return combine_members(features_df, oof, future_lgbm, base, group_cols, w_lgbm, w_base)
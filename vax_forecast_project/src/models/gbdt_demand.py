@@ -3,12 +3,13 @@ Modèle GBDT (LightGBM) pour la demande vaccinale hebdomadaire (par 100k).
 - Entraînement sur features tabulaires
 - Validation rolling-origin
 - Anti-fuite: on n'utilise JAMAIS de features contemporaines (seulement *_lag* / *_ma*)
+- Deux stratégies: un modèle par série (rolling_cv_fit_predict) ou un modèle global
+  sur le panel de séries (global_rolling_cv_fit_predict, maille département)
 """
 import pandas as pd
 import numpy as np
-from lightgbm import LGBMRegressor
-from sklearn.metrics import mean_absolute_error
 from ..utils import smape
+from ..tracing import span, traced
 
 
 FEATURES_CALENDAR = ["weekofyear", "month", "year"]
@@ -22,6 +23,37 @@ def _past_only_feature_list(df_cols, fallback=None):
         feats = fallback
     return feats
 
+def _select_features(df, features):
+    """Features sans fuite: liste fournie, sinon attrs de la table, sinon *_lag*/*_ma* + calendaires."""
+    # 1) Si la table porte la liste des features (attrs) on la prend, sinon on construit past-only.
+    features_from_attrs = getattr(df, "attrs", {}).get("FEATURE_COLS")
+    if features is None:
+        features = features_from_attrs or _past_only_feature_list(df.columns)
+
+    # 2) Retire toute contemporaine par précaution
+    ban_now = {"doses_per_100k","incidence_per_100k","tmean","er_visits","admissions"}
+    features = [f for f in features if f not in ban_now]
+
+    # 3) S'assure qu'on a au moins quelques features
+    if not features:
+        features = _past_only_feature_list(df.columns)
+    return features
+
+
+def _metrics(oof_all, group_cols, target):
+    from sklearn.metrics import mean_absolute_error
+    if oof_all.empty:
+        return pd.DataFrame(columns=list(group_cols)+["SMAPE","MAE"])
+    return (oof_all
+            .groupby(list(group_cols))
+            .apply(lambda g: pd.Series({
+                "SMAPE": smape(g[target], g["yhat"]),
+                "MAE": mean_absolute_error(g[target], g["yhat"])
+            }))
+            .reset_index())
+
+
+@traced("gbdt.per_series")
 def rolling_cv_fit_predict(
     df,
     group_cols=("region","age_band"),
@@ -34,19 +66,9 @@ def rolling_cv_fit_predict(
     Validation rolling-origin par série, avec prévisions horizon fixes.
     Retourne : oof (prévisions historiques), future_fc (horizon futur si possible), modèles par clé, métriques.
     """
+    from lightgbm import LGBMRegressor
     # ——— Sélection robuste des features (anti-fuite) ———
-    # 1) Si la table porte la liste des features (attrs) on la prend, sinon on construit past-only.
-    features_from_attrs = getattr(df, "attrs", {}).get("FEATURE_COLS")
-    if features is None:
-        features = features_from_attrs or _past_only_feature_list(df.columns)
-
-    # 2) Retire toute contemporaine par précaution
-    ban_now = {"doses_per_100k","incidence_per_100k","tmean","er_visits","admissions"}
-    features = [f for f in features if f not in ban_now]
-
-    # 3) S'assure qu'on a au moins quelques features
-    if not features:
-        features = _past_only_feature_list(df.columns)
+    features = _select_features(df, features)
 
     oof_all, models, future_all = [], {}, []
 
@@ -55,7 +77,7 @@ def rolling_cv_fit_predict(
 
         # Remplace NaN résiduels dans les features par la médiane de la série
         for col in features:
-            part[col] = part.groupby(["region","age_band"])[col].transform(
+            part[col] = part.groupby(list(group_cols))[col].transform(
                 lambda s: s.fillna(s.median())
             )
         # Drop si target manquante uniquement
@@ -85,7 +107,8 @@ def rolling_cv_fit_predict(
                 subsample=0.9,
                 colsample_bytree=0.9
             )
-            model.fit(Xtr, ytr)
+            with span("gbdt.fit_cv", rows=len(Xtr)):
+                model.fit(Xtr, ytr)
             phat = model.predict(Xte)
 
             preds.append(pd.DataFrame({
@@ -98,8 +121,8 @@ def rolling_cv_fit_predict(
             continue
 
         oof = pd.concat(preds, ignore_index=True)
-        oof[group_cols[0]] = keys[0]
-        oof[group_cols[1]] = keys[1]
+        for col, key in zip(group_cols, keys):
+            oof[col] = key
         oof_all.append(oof)
 
         # Entraînement final
@@ -114,7 +137,8 @@ def rolling_cv_fit_predict(
             subsample=0.9,
             colsample_bytree=0.9
         )
-        model_final.fit(hist[features], hist[target])
+        with span("gbdt.fit_final", rows=len(hist)):
+            model_final.fit(hist[features], hist[target])
         models[keys] = model_final
 
         fut = part[part[target].isna()].copy()
@@ -124,23 +148,84 @@ def rolling_cv_fit_predict(
                 fut[col] = fut[col].fillna(hist[col].median() if col in hist else fut[col].median())
 
             fut["yhat"] = model_final.predict(fut[features])
-            fut[group_cols[0]] = keys[0]
-            fut[group_cols[1]] = keys[1]
-            future_all.append(fut[["date", group_cols[0], group_cols[1], "yhat"]])
+            future_all.append(fut[["date", *group_cols, "yhat"]])
 
     oof_all = pd.concat(oof_all, ignore_index=True) if oof_all else pd.DataFrame()
     future_all = pd.concat(future_all, ignore_index=True) if future_all else pd.DataFrame()
 
     # Métriques
-    if not oof_all.empty:
-        m = (oof_all
-             .groupby(list(group_cols))
-             .apply(lambda g: pd.Series({
-                 "SMAPE": smape(g[target], g["yhat"]),
-                 "MAE": mean_absolute_error(g[target], g["yhat"])
-             }))
-             .reset_index())
-    else:
-        m = pd.DataFrame(columns=list(group_cols)+["SMAPE","MAE"])
-
-    return oof_all, future_all, models, m
+    return oof_all, future_all, models, _metrics(oof_all, group_cols, target)
+
+
+@traced("gbdt.global")
+def global_rolling_cv_fit_predict(
+    df,
+    group_cols=("region","age_band"),
+    target="doses_per_100k",
+    features=None,
+    min_train_months=3,
+    horizon_months=2
+):
+    """
+    Un seul LightGBM pour toutes les séries (panel), clés de série en variables catégorielles.
+    Validation rolling-origin par DATE : origines espacées de l'horizon, chaque modèle est
+    évalué sur les `horizon_months` mois suivants pour toutes les séries à la fois.
+    ~ (n_mois - min_train) / horizon entraînements au total (au lieu d'un par série et par origine) :
+    le coût ne croît qu'avec le nombre de lignes, pas avec le nombre de séries.
+    Même sortie que rolling_cv_fit_predict (models = {"global": modèle final}).
+    """
+    from lightgbm import LGBMRegressor
+    features = _select_features(df, features)
+    keys = list(group_cols)
+    cat_cols = [f"{c}_cat" for c in keys]
+
+    df = df.sort_values(keys + ["date"]).reset_index(drop=True)
+    # NaN résiduels des features -> médiane de la série
+    df[features] = df[features].fillna(df.groupby(keys)[features].transform("median"))
+    for col, cat in zip(keys, cat_cols):
+        df[cat] = pd.Categorical(df[col].astype(str))
+
+    # Séries exclues comme en per-série : cible constante ou historique trop court
+    hist = df[df[target].notna()]
+    stats = hist.groupby(keys)[target].agg(["std", "size"])
+    ok = stats[(stats["std"].fillna(0) >= 1e-6) & (stats["size"] >= min_train_months + horizon_months)].index
+    df = df[df.set_index(keys).index.isin(ok)]
+    hist = df[df[target].notna()]
+    if hist.empty:
+        return pd.DataFrame(), pd.DataFrame(), {}, _metrics(pd.DataFrame(), group_cols, target)
+
+    X_cols = features + cat_cols
+
+    def _model(n_estimators):
+        return LGBMRegressor(
+            random_state=123,
+            n_estimators=n_estimators,
+            learning_rate=0.05,
+            max_depth=-1,
+            num_leaves=31,
+            subsample=0.9,
+            colsample_bytree=0.9,
+            verbose=-1
+        )
+
+    dates = np.sort(hist["date"].unique())
+    preds = []
+    for i in range(min_train_months, len(dates), horizon_months):
+        train = hist[hist["date"] < dates[i]]
+        test = hist[(hist["date"] >= dates[i]) & (hist["date"] <= dates[min(i + horizon_months, len(dates)) - 1])]
+        model = _model(500)
+        with span("gbdt.fit_cv", rows=len(train)):
+            model.fit(train[X_cols], train[target])
+        preds.append(test[["date", *keys, target]].assign(yhat=model.predict(test[X_cols])))
+
+    oof_all = pd.concat(preds, ignore_index=True) if preds else pd.DataFrame()
+
+    # Entraînement final + prévision de toutes les séries en un seul predict
+    model_final = _model(700)
+    with span("gbdt.fit_final", rows=len(hist)):
+        model_final.fit(hist[X_cols], hist[target])
+    fut = df[df[target].isna()]
+    future_all = (fut[["date", *keys]].assign(yhat=model_final.predict(fut[X_cols])).reset_index(drop=True)
+                  if not fut.empty else pd.DataFrame())
+
+    return oof_all, future_all, {"global": model_final}, _metrics(oof_all, group_cols, target)
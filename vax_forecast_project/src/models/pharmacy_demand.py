@@ -0,0 +1,223 @@
+"""
+Prévision de la demande par PHARMACIE avec un seul LightGBM global (~20k pharmacies).
+- Panel compact : délivrances mensuelles en matrice float32 (pharmacies × mois), identifiants en codes entiers
+- Design « direct multi-horizon » : une ligne par (pharmacie active, origine, horizon h), features connues
+  à l'origine (lags, moyennes mobiles, même mois N-1, exogènes régionaux) + h + mois cible.
+  Seules les pharmacies actives à l'origine produisent des lignes (panel creux).
+- Catégorielles natives LightGBM : pharmacie, commune, région
+- Validation sur la dernière origine (horizon complet), puis modèle final
+- Scoring : toutes les pharmacies × tous les horizons en UN predict
+"""
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from ..utils import smape
+from ..tracing import traced
+
+LAGS = (1, 2, 3, 6, 12)   # doses_lagL = délivrances du mois (origine - L + 1) : lag1 = dernier mois connu
+WINDOWS = (3, 6, 12)
+CAT_COLS = ["pharmacie", "code_commune", "region"]
+EXOG_COLS = ["incidence_per_100k", "tmean"]
+PARAMS = dict(random_state=123, n_estimators=400, learning_rate=0.05, num_leaves=63,
+              min_child_samples=50, subsample=0.8, subsample_freq=1, colsample_bytree=0.9,
+              max_bin=63, n_jobs=-1, verbose=-1)
+
+
+@dataclass
+class PharmacyPanel:
+    months: pd.DatetimeIndex   # T mois consécutifs
+    Y: np.ndarray              # (P, T) float32 ; NaN avant la première délivrance de la pharmacie
+    codes: dict                # {col de CAT_COLS: codes int32 (P,) ; -1 si inconnu}
+    categories: dict           # {col de CAT_COLS: Index des modalités}
+    population: np.ndarray     # (P,) float32 (NaN si inconnue)
+    exog: np.ndarray           # (len(EXOG_COLS), R, T) float32, R = régions du panel (NaN si absent)
+
+
+@traced("pharmacy.panel")
+def build_panel(hist: pd.DataFrame, exog: pd.DataFrame | None = None) -> PharmacyPanel:
+    """
+    hist: [date (1er du mois), pharmacie, code_commune, region, population, doses] (data_ingestion.load_pharmacy_dispensing)
+    exog: [date, region, incidence_per_100k, tmean] mensuels (optionnel)
+    Un mois sans délivrance après la première délivrance compte 0.
+    """
+    ph = pd.Categorical(hist["pharmacie"]).remove_unused_categories()
+    months = pd.date_range(hist["date"].min(), hist["date"].max(), freq="MS")
+    p = ph.codes.astype(np.int64)
+    t = months.get_indexer(hist["date"])
+    P, T = len(ph.categories), len(months)
+
+    Y = np.zeros((P, T), dtype=np.float32)
+    np.add.at(Y, (p, t), hist["doses"].to_numpy(dtype=np.float32))
+    first = np.full(P, T, dtype=np.int64)
+    np.minimum.at(first, p, t)
+    Y[np.arange(T)[None, :] < first[:, None]] = np.nan
+
+    # attributs statiques : première ligne de chaque pharmacie
+    _, idx = np.unique(p, return_index=True)
+    static = hist.iloc[idx]
+    codes, categories = {"pharmacie": np.arange(P, dtype=np.int32)}, {"pharmacie": ph.categories}
+    for col in CAT_COLS[1:]:
+        vals = static[col].astype(object).where(static[col].notna(), None).replace("", None)
+        cat = pd.Categorical(vals)
+        codes[col], categories[col] = cat.codes.astype(np.int32), cat.categories
+    population = (pd.to_numeric(static["population"], errors="coerce").to_numpy(dtype=np.float32)
+                  if "population" in static else np.full(P, np.nan, dtype=np.float32))
+
+    E = np.full((len(EXOG_COLS), len(categories["region"]), T), np.nan, dtype=np.float32)
+    if exog is not None and not exog.empty:
+        r = categories["region"].get_indexer(exog["region"].astype(str))
+        te = months.get_indexer(pd.to_datetime(exog["date"]).dt.to_period("M").dt.to_timestamp())
+        ok = (r >= 0) & (te >= 0)
+        for k, col in enumerate(EXOG_COLS):
+            if col in exog.columns:
+                E[k, r[ok], te[ok]] = exog[col].to_numpy(dtype=np.float32)[ok]
+
+    return PharmacyPanel(months, Y, codes, categories, population, E)
+
+
+def feature_names() -> list:
+    return ([f"doses_lag{L}" for L in LAGS] + [f"doses_ma{W}" for W in WINDOWS]
+            + ["doses_same_month_ly", "doses_mean_to_date"]
+            + [f"{c}_lag1" for c in EXOG_COLS] + [f"{c}_same_month_ly" for c in EXOG_COLS]
+            + ["population", "horizon", "month"] + CAT_COLS)
+
+
+@traced("pharmacy.design_matrix")
+def design_matrix(panel: PharmacyPanel, origins, horizons, max_target: int | None = None):
+    """
+    Lignes (pharmacie active à l'origine o, o, h) -> X float32 (n, F), y (NaN si cible inconnue), (p, o, h).
+    max_target : ne garde que les lignes dont le mois cible o+h <= max_target (cible observée).
+    """
+    Y, (P, T) = panel.Y, panel.Y.shape
+    p, o, h = (a.ravel() for a in np.meshgrid(np.arange(P), np.asarray(origins), np.asarray(horizons), indexing="ij"))
+    keep = (o >= 0) & (o < T) & ~np.isnan(Y[p, np.clip(o, 0, T - 1)])
+    if max_target is not None:
+        keep &= (o + h <= max_target)
+    p, o, h = p[keep], o[keep], h[keep]
+    tgt = o + h
+    ly = np.where(tgt - 12 <= o, tgt - 12, -1)  # même mois N-1, connu à l'origine seulement si h <= 12 (sinon NaN)
+
+    def at(M, col):  # M[:, col] avec NaN hors bornes
+        ok = (col >= 0) & (col < M.shape[-1])
+        out = np.full(len(col), np.nan, dtype=np.float32)
+        out[ok] = M[p[ok], col[ok]]
+        return out
+
+    # sommes cumulées (NaN = 0) et effectifs -> moyennes mobiles en O(1) par ligne
+    Z = np.nan_to_num(Y)
+    C = np.concatenate([np.zeros((P, 1), np.float64), np.cumsum(Z, axis=1, dtype=np.float64)], axis=1)
+    N = np.concatenate([np.zeros((P, 1), np.int32), np.cumsum(~np.isnan(Y), axis=1, dtype=np.int32)], axis=1)
+
+    names = feature_names()
+    X = np.empty((len(p), len(names)), dtype=np.float32)
+    j = 0
+    for L in LAGS:
+        X[:, j] = at(Y, o - L + 1); j += 1
+    for W in WINDOWS:
+        lo = np.maximum(o + 1 - W, 0)
+        n = N[p, o + 1] - N[p, lo]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            X[:, j] = np.where(n > 0, (C[p, o + 1] - C[p, lo]) / n, np.nan)
+        j += 1
+    X[:, j] = at(Y, ly); j += 1
+    with np.errstate(invalid="ignore", divide="ignore"):
+        X[:, j] = C[p, o + 1] / N[p, o + 1]; j += 1
+    r = panel.codes["region"][p]
+    for k in range(len(EXOG_COLS)):
+        Er = panel.exog[k]
+        for col in (o, ly):
+            ok = (r >= 0) & (col >= 0) & (col < T)
+            v = np.full(len(p), np.nan, dtype=np.float32)
+            v[ok] = Er[r[ok], col[ok]]
+            X[:, j] = v; j += 1
+    X[:, j] = panel.population[p]; j += 1
+    X[:, j] = h; j += 1
+    X[:, j] = ((panel.months[0].month - 1 + tgt) % 12) + 1; j += 1
+    for col in CAT_COLS:
+        c = panel.codes[col][p].astype(np.float32)
+        X[:, j] = np.where(c >= 0, c, np.nan); j += 1
+
+    y = at(Y, tgt)
+    return X, y, (p, o, h)
+
+
+@traced("pharmacy.fit")
+def _fit(X, y):
+    from lightgbm import LGBMRegressor
+    model = LGBMRegressor(**PARAMS)
+    model.fit(X, y, feature_name=feature_names(), categorical_feature=CAT_COLS)
+    return model
+
+
+def _metrics(y, yhat, region):
+    from sklearn.metrics import mean_absolute_error
+    df = pd.DataFrame({"region": region, "y": y, "yhat": yhat})
+    by = (df.groupby("region", observed=True)[["y", "yhat"]]
+            .apply(lambda g: pd.Series({"SMAPE": smape(g["y"], g["yhat"]),
+                                        "MAE": mean_absolute_error(g["y"], g["yhat"]),
+                                        "n": len(g)}))
+            .reset_index())
+    tot = pd.DataFrame([{"region": "ALL", "SMAPE": smape(y, yhat), "MAE": mean_absolute_error(y, yhat), "n": len(y)}])
+    return pd.concat([by, tot], ignore_index=True)
+
+
+@traced("pharmacy.fit_predict")
+def fit_predict_pharmacies(hist: pd.DataFrame, exog: pd.DataFrame | None = None,
+                           horizon: int = 6, n_origins: int = 24, validate: bool = True):
+    """
+    Entraîne le modèle global et prévoit `horizon` mois pour toutes les pharmacies.
+    - n_origins : nombre d'origines mensuelles (les plus récentes) empilées pour l'apprentissage
+    - validate : évaluation sur la dernière origine à horizon complet (modèle entraîné sans elle)
+    Retourne (forecast [date, pharmacie, code_commune, region, horizon, yhat], metrics, modèle, timings).
+    """
+    timings = {}
+    t0 = time.perf_counter()
+    panel = build_panel(hist, exog)
+    T = panel.Y.shape[1]
+    hs = np.arange(1, horizon + 1)
+    timings["panel_s"] = time.perf_counter() - t0
+    region_cats = np.asarray(panel.categories["region"], dtype=object)
+
+    def _region_of(p):
+        c = panel.codes["region"][p]
+        return np.where(c >= 0, region_cats[np.maximum(c, 0)] if len(region_cats) else None, None)
+
+    metrics = pd.DataFrame(columns=["region", "SMAPE", "MAE", "n"])
+    if validate and T > horizon + 1:
+        vo = T - 1 - horizon
+        t0 = time.perf_counter()
+        Xtr, ytr, _ = design_matrix(panel, np.arange(max(vo - n_origins, 0), vo), hs, max_target=vo)
+        Xva, yva, (pva, _, _) = design_matrix(panel, [vo], hs, max_target=T - 1)
+        model_v = _fit(Xtr, ytr)
+        yhat_va = np.clip(model_v.predict(Xva), 0, None)
+        metrics = _metrics(yva, yhat_va, _region_of(pva))
+        timings["validate_s"] = time.perf_counter() - t0
+        del Xtr, ytr, model_v
+
+    t0 = time.perf_counter()
+    Xtr, ytr, _ = design_matrix(panel, np.arange(max(T - 1 - n_origins, 0), T - 1), hs, max_target=T - 1)
+    timings["design_s"] = time.perf_counter() - t0
+    timings["n_train_rows"] = len(ytr)
+    t0 = time.perf_counter()
+    model = _fit(Xtr, ytr)
+    timings["fit_s"] = time.perf_counter() - t0
+    del Xtr, ytr
+
+    # Scoring : origine = dernier mois observé, toutes pharmacies × horizons en un seul predict
+    t0 = time.perf_counter()
+    Xsc, _, (psc, osc, hsc) = design_matrix(panel, [T - 1], hs)
+    yhat = np.clip(model.predict(Xsc), 0, None)
+    timings["score_s"] = time.perf_counter() - t0
+
+    future_months = pd.date_range(panel.months[T - 1], periods=horizon + 1, freq="MS")[1:]
+    fc = pd.DataFrame({
+        "date": future_months[hsc - 1],
+        "pharmacie": pd.Categorical.from_codes(psc, categories=panel.categories["pharmacie"]),
+        "code_commune": pd.Categorical.from_codes(panel.codes["code_commune"][psc], categories=panel.categories["code_commune"]),
+        "region": pd.Categorical.from_codes(panel.codes["region"][psc], categories=panel.categories["region"]),
+        "horizon": hsc.astype(np.int16),
+        "yhat": yhat.astype(np.float32),
+    })
+    return fc, metrics, model, timings
@@ -0,0 +1,104 @@
+"""
+Cache des normalisations Open Data (download_open_data.download_*).
+Une sortie normalisée n'est recalculée que si l'un de ses intrants a changé :
+  clé = sha256(fichier brut, version du code du normaliseur et de ses helpers, fichiers dépendants (mapping régions)).
+  Le code des modules partagés par tous les normaliseurs (csv_reader, geography) entre toujours dans la clé.
+Les sorties sont écrites en CSV (compatibilité) ET en parquet à côté (lu en priorité par data_ingestion).
+Les empreintes des fichiers sont mémorisées par (taille, mtime) : un rafraîchissement sans changement
+ne coûte que quelques stat().
+"""
+import hashlib
+import inspect
+import json
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+from . import csv_reader, geography
+from .config import RAW_DIR
+
+NORM_CACHE_VERSION = 1  # à incrémenter si le format des sorties change
+CACHE_FILE = RAW_DIR / ".norm_cache.json"
+SHARED_CODE = (csv_reader, geography)  # lecture CSV sniffée + référentiel géographique, utilisés par les normaliseurs
+
+_lock = threading.Lock()
+
+
+def _load_meta() -> dict:
+    try:
+        return json.loads(CACHE_FILE.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_meta(meta: dict):
+    CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = CACHE_FILE.with_suffix(".tmp")
+    tmp.write_text(json.dumps(meta, indent=1, sort_keys=True), encoding="utf-8")
+    tmp.replace(CACHE_FILE)
+
+
+def file_digest(path, known: dict | None = None) -> dict:
+    """{size, mtime_ns, sha256} ; le sha256 est repris de `known` si taille et mtime sont inchangés."""
+    st = Path(path).stat()
+    if known and known.get("size") == st.st_size and known.get("mtime_ns") == st.st_mtime_ns:
+        return known
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": h.hexdigest()}
+
+
+def _source(obj) -> str:
+    if inspect.ismodule(obj) or inspect.isclass(obj) or inspect.isroutine(obj):
+        return inspect.getsource(obj)
+    return repr(obj)  # constantes (colonnes candidates...)
+
+
+def code_version(*objs) -> str:
+    """Empreinte du code source des fonctions / classes / modules (et constantes) de normalisation."""
+    h = hashlib.sha256(str(NORM_CACHE_VERSION).encode())
+    for obj in objs:
+        h.update(_source(obj).encode("utf-8"))
+    return h.hexdigest()
+
+
+def parquet_path(csv_path) -> Path:
+    return Path(csv_path).with_suffix(".parquet")
+
+
+def cached_normalize(name: str, raw_path, out_csv, normalizer, code=(), deps=()) -> pd.DataFrame:
+    """
+    Retourne normalizer(raw_path), depuis le cache parquet si (brut, code, deps) sont inchangés.
+    - code : helpers appelés par `normalizer` (fonctions, classes, constantes) dont le source entre dans la clé,
+      en plus de `normalizer` et de SHARED_CODE
+    - deps : fichiers dont le contenu entre dans la clé (ex: region_mapping.csv)
+    """
+    raw_path, out_csv = Path(raw_path), Path(out_csv)
+    out_pq = parquet_path(out_csv)
+    with _lock:
+        entry = _load_meta().get(name, {})
+    files = {"raw": file_digest(raw_path, entry.get("files", {}).get("raw"))}
+    for i, dep in enumerate(deps):
+        files[f"dep{i}"] = file_digest(dep, entry.get("files", {}).get(f"dep{i}"))
+    key = hashlib.sha256("|".join([code_version(normalizer, *code, *SHARED_CODE)]
+                                  + [files[k]["sha256"] for k in sorted(files)]).encode()).hexdigest()
+
+    if entry.get("key") == key and out_pq.exists() and out_csv.exists():
+        if files != entry.get("files"):  # fichier touché mais contenu identique: on mémorise le nouveau stat
+            with _lock:
+                meta = _load_meta()
+                meta[name] = {"key": key, "files": files}
+                _save_meta(meta)
+        return pd.read_parquet(out_pq)
+
+    out = normalizer(raw_path)
+    out.to_csv(out_csv, index=False, encoding="utf-8")
+    out.to_parquet(out_pq, index=False)
+    with _lock:
+        meta = _load_meta()
+        meta[name] = {"key": key, "files": files}
+        _save_meta(meta)
+    return out
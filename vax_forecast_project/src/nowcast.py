@@ -0,0 +1,265 @@
+"""
+Nowcast hebdomadaire : suit l'épidémie entre deux runs mensuels de la pipeline.
+- État (NowcastState) : table de features mensuelle, observations hebdomadaires Sentinelles / OSCOUR
+  qui l'alimentent, baseline saisonnière, modèles finaux du membre LGBM (étape lgbm de train_pipeline)
+  et prévision courante ; gardé en mémoire par l'appelant, persisté dans models/nowcast/.
+- update(incidence, urgences) : les semaines reçues remplacent ou complètent les observations ;
+  seuls les mois touchés sont ré-agrégés (moyenne Sentinelles + climatologie des mois non observés,
+  somme OSCOUR), seules les séries dont un exogène mensuel a changé voient leurs *_lag* / *_ma*
+  recalculés, et seules leurs lignes futures sont re-scorées (mêmes modèles, sans réentraînement).
+- Valeurs identiques à celles d'un build_feature_table complet sur les mêmes observations ;
+  les doses (cible, baseline) restent celles du dernier run mensuel.
+- Un nouveau run mensuel (features.parquet ou modèles changés) réinitialise l'état au load() suivant.
+"""
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from . import artifacts, climatology
+from .config import MODELS_DIR, PROCESSED_DIR
+from .data_ingestion import load_all_sources, load_weekly_arrivals
+from .feature_engineering import (add_lags, add_rollings, incidence_monthly, lag_ma_columns,
+                                  to_month_start, urgences_monthly)
+from .models.ensemble import load_lgbm_models
+from .norm_cache import file_digest
+from .train_pipeline import FEATURES_PATH, MEMBER_BASELINE, MEMBER_LGBM_MODELS
+from .tracing import span
+
+STATE_DIR = MODELS_DIR / "nowcast"
+NOWCAST_PATH = PROCESSED_DIR / "forecast_nowcast.parquet"
+URG_COLS = ["er_visits", "admissions"]
+
+
+def _base(features_path: Path, models_path: Path, known: dict | None = None) -> dict:
+    """Empreintes des sorties du run mensuel dont l'état est issu."""
+    known = known or {}
+    return {name: file_digest(p, known.get(name)) for name, p in
+            (("features", features_path), ("models", models_path))}
+
+
+def _changed(old: np.ndarray, new: np.ndarray) -> np.ndarray:
+    return ~((old == new) | (np.isnan(old) & np.isnan(new)))
+
+
+def _upsert(old: pd.DataFrame, new: pd.DataFrame, on: list) -> pd.DataFrame:
+    """Lignes de `new` à la place de celles de `old` de même clé (semaine révisée), puis ajout des nouvelles."""
+    idx = pd.MultiIndex.from_frame(old[on].astype(str))
+    drop = idx.isin(pd.MultiIndex.from_frame(new[on].astype(str)))
+    return pd.concat([old[~drop], new[old.columns]], ignore_index=True)
+
+
+class NowcastState:
+    """
+    État du nowcast. frame : table de features (attrs GROUP_COLS, GRANULARITY) ;
+    incidence / urgences : observations hebdomadaires typées (cf. load_all_sources) ;
+    bundle : load_lgbm_models ; baseline : [date, *clés, yhat_baseline] (membre baseline).
+    """
+
+    def __init__(self, frame, incidence, urgences, bundle, baseline=None, base=None,
+                 w_lgbm=0.7, w_base=0.3, forecast=None):
+        self.keys = list(frame.attrs["GROUP_COLS"])
+        self.frame = frame.sort_values([*self.keys, "date"]).reset_index(drop=True)
+        self.frame.attrs = frame.attrs
+        self.incidence, self.urgences = incidence, urgences
+        self.bundle, self.baseline, self.base = bundle, baseline, base or {}
+        self.w_lgbm, self.w_base = w_lgbm, w_base
+        self.series_rows = {tuple(map(str, k)): pos for k, pos in
+                      self.frame.groupby(self.keys, sort=False).indices.items()}
+        self._cells = pd.MultiIndex.from_frame(self.frame[[*self.keys, "date"]].astype({k: str for k in self.keys}))
+        self.last_update = {}
+        self.forecast = self.score() if forecast is None else forecast
+
+    @property
+    def granularity(self) -> str:
+        return self.frame.attrs["GRANULARITY"]
+
+    @property
+    def asof(self):
+        """Dernière semaine observée (Sentinelles ou OSCOUR)."""
+        return max(self.incidence["date"].max(), self.urgences["date"].max())
+
+    @property
+    def horizon_start(self):
+        return self.frame.loc[self.frame["y"].isna(), "date"].min()
+
+    # ---- construction / persistance ----
+    @classmethod
+    def from_pipeline(cls, features_path=FEATURES_PATH, models_path=MEMBER_LGBM_MODELS,
+                      baseline_path=MEMBER_BASELINE, **kw):
+        """État initial depuis les sorties du dernier run mensuel (features, modèles, baseline)."""
+        with span("nowcast.init"):
+            frame = artifacts.frame(features_path)
+            frames, _ = load_all_sources(granularity=frame.attrs["GRANULARITY"])
+            baseline = artifacts.frame(baseline_path) if Path(baseline_path).exists() else None
+            return cls(frame, frames["incidence"], frames["urgences"], load_lgbm_models(models_path),
+                       baseline, _base(features_path, models_path), **kw)
+
+    @classmethod
+    def load(cls, state_dir=STATE_DIR, features_path=FEATURES_PATH, models_path=MEMBER_LGBM_MODELS,
+             baseline_path=MEMBER_BASELINE):
+        """État persisté s'il provient du run mensuel courant, sinon état initial (from_pipeline)."""
+        state_dir = Path(state_dir)
+        try:
+            meta = json.loads((state_dir / "state.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            meta = {}
+        base = _base(features_path, models_path, meta.get("base"))
+        sha = {k: v["sha256"] for k, v in base.items()}
+        if not meta or {k: v["sha256"] for k, v in meta["base"].items()} != sha:
+            return cls.from_pipeline(features_path, models_path, baseline_path)
+        with span("nowcast.load"):
+            part = {name: artifacts.frame(state_dir / f"{name}.arrow")
+                    for name in ("features", "incidence", "urgences", "forecast")}
+            baseline = artifacts.frame(state_dir / "baseline.arrow") if (state_dir / "baseline.arrow").exists() else None
+            return cls(part["features"], part["incidence"], part["urgences"], load_lgbm_models(models_path),
+                       baseline, base, meta["w_lgbm"], meta["w_base"], forecast=part["forecast"])
+
+    def save(self, state_dir=STATE_DIR) -> Path:
+        state_dir = Path(state_dir)
+        with span("nowcast.save"):
+            for name, df in (("features", self.frame), ("incidence", self.incidence),
+                             ("urgences", self.urgences), ("forecast", self.forecast), ("baseline", self.baseline)):
+                if df is not None:
+                    artifacts.publish(state_dir / f"{name}.arrow", df)
+            meta = {"base": self.base, "asof": str(self.asof.date()), "w_lgbm": self.w_lgbm, "w_base": self.w_base}
+            (state_dir / "state.json").write_text(json.dumps(meta, indent=1), encoding="utf-8")
+        return state_dir
+
+    def publish(self, path=NOWCAST_PATH) -> Path:
+        """Prévision courante -> forecast_nowcast.parquet (attrs ASOF : dernière semaine observée)."""
+        out = self.forecast.copy()
+        out.attrs = {"ASOF": str(self.asof.date()), "GROUP_COLS": self.keys}
+        artifacts.publish(path, out)
+        return Path(path)
+
+    # ---- mise à jour incrémentale ----
+    def _set_cells(self, monthly: pd.DataFrame, cols: list, fill: float | None = None) -> dict:
+        """Écrit des agrégats mensuels [*clés, date, cols] dans la table ; {colonne: positions modifiées}."""
+        idx = self._cells.get_indexer(pd.MultiIndex.from_frame(
+            monthly[[*self.keys, "date"]].astype({k: str for k in self.keys})))
+        ok = idx >= 0
+        changed = {}
+        for col in cols:
+            new = monthly[col].to_numpy(dtype=float)[ok]
+            if fill is not None:
+                new = np.where(np.isnan(new), fill, new)
+            pos = idx[ok]
+            diff = _changed(self.frame[col].to_numpy(dtype=float)[pos], new)
+            if diff.any():
+                self.frame.loc[pos[diff], col] = new[diff]
+                changed[col] = pos[diff]
+        return changed
+
+    def _ingest_incidence(self, new: pd.DataFrame) -> dict:
+        self.incidence = _upsert(self.incidence, new, ["date", "region"])
+        # moyenne mensuelle + climatologie (elle bouge avec les nouveaux mois observés) : table régionale, petite
+        dates = pd.DatetimeIndex(np.sort(self.frame["date"].unique()))
+        full = climatology.fill_grid(incidence_monthly(self.incidence), "incidence_per_100k",
+                                     sorted(self.frame["region"].unique()), dates, period="month")
+        monthly = self.frame[[*self.keys, "date"]].merge(full, on=["date", "region"], how="left")
+        return self._set_cells(monthly, ["incidence_per_100k"], fill=0.0)
+
+    def _ingest_urgences(self, new: pd.DataFrame) -> dict:
+        on = ["date", *self.keys]
+        self.urgences = _upsert(self.urgences, new, on)
+        months = to_month_start(new["date"]).unique()
+        rows = self.frame[self.frame["date"].isin(months)][[*self.keys, "date"]]
+        urg = self.urgences[to_month_start(self.urgences["date"]).isin(months)]
+        monthly = rows.merge(urgences_monthly(urg, self.keys), on=on, how="left")  # mois sans passage : 0
+        return self._set_cells(monthly, URG_COLS, fill=0.0)
+
+    def _refresh_features(self, changed: dict) -> list:
+        """*_lag* / *_ma* des colonnes modifiées, recalculés sur les seules séries touchées."""
+        cols = sorted(changed)
+        pos = np.unique(np.concatenate(list(changed.values())))
+        series = self.frame.loc[pos, self.keys].drop_duplicates()
+        series = [tuple(map(str, k)) for k in series.itertuples(index=False, name=None)]
+        rows = np.concatenate([self.series_rows[k] for k in series])
+        sub = self.frame.loc[rows, [*self.keys, "date", *cols]]
+        sub = add_rollings(add_lags(sub, self.keys, cols), self.keys, cols)
+        derived = lag_ma_columns(cols)
+        sub[derived] = sub[derived].fillna(sub.groupby(self.keys)[derived].transform("median"))
+        self.frame.loc[sub.index, derived] = sub[derived]
+        return series
+
+    def ingest(self, incidence: pd.DataFrame | None = None, urgences: pd.DataFrame | None = None) -> list:
+        """Intègre les observations hebdomadaires reçues ; retourne les séries dont les features ont changé."""
+        changed = {}
+        with span("nowcast.ingest") as sp:
+            if incidence is not None and not incidence.empty:
+                changed.update(self._ingest_incidence(incidence))
+            if urgences is not None and not urgences.empty:
+                changed.update(self._ingest_urgences(urgences))
+            sp.set(cells=int(sum(len(v) for v in changed.values())))
+        if not changed:
+            return []
+        with span("nowcast.features") as sp:
+            series = self._refresh_features(changed)
+            sp.set(series=len(series))
+        return series
+
+    # ---- scoring ----
+    def design(self, rows, names) -> pd.DataFrame:
+        X = self.frame.loc[rows, [c for c in names if c in self.frame.columns]]
+        for c in names:
+            if c not in X.columns and c.endswith("_cat"):  # clés catégorielles du modèle global
+                X[c] = pd.Categorical(self.frame.loc[rows, c[:-len("_cat")]].astype(str))
+        return X[names]
+
+    def score(self, series=None) -> pd.DataFrame:
+        """Horizon futur (y NaN) des séries (défaut : toutes celles des modèles) : [date, *clés, yhat, yhat_ens]."""
+        wanted = {tuple(map(str, k)) for k in self.bundle["series"]}
+        if series is not None:
+            wanted &= set(series)
+        future = self.frame["y"].isna().to_numpy()
+        rows = {k: pos[future[pos]] for k, pos in self.series_rows.items() if k in wanted}
+        models = self.bundle["models"]
+        with span("nowcast.score") as sp:
+            parts = []
+            if self.bundle["strategy"] == "global":
+                pos = np.concatenate(list(rows.values())) if rows else np.array([], dtype=int)
+                if len(pos):
+                    model = models["global"]
+                    parts.append(self.frame.loc[pos, ["date", *self.keys]].assign(
+                        yhat=model.predict(self.design(pos, model.feature_name_))))
+            else:
+                by_key = {tuple(map(str, k)): m for k, m in models.items()}
+                for k, pos in rows.items():
+                    if len(pos) and k in by_key:
+                        model = by_key[k]
+                        parts.append(self.frame.loc[pos, ["date", *self.keys]].assign(
+                            yhat=model.predict(self.design(pos, model.feature_name_))))
+            fc = (pd.concat(parts, ignore_index=True) if parts
+                  else pd.DataFrame(columns=["date", *self.keys, "yhat"]))
+            sp.rows(fc)
+        # même combinaison que l'ensemble mensuel (models.ensemble.combine_members)
+        if self.baseline is not None and not self.baseline.empty:
+            fc = fc.merge(self.baseline, on=["date", *self.keys], how="inner")
+            fc["yhat_ens"] = self.w_lgbm * fc["yhat"] + self.w_base * fc["yhat_baseline"]
+            fc = fc.drop(columns="yhat_baseline")
+        else:
+            fc["yhat_ens"] = fc["yhat"]
+        return fc
+
+    def update(self, incidence: pd.DataFrame | None = None, urgences: pd.DataFrame | None = None) -> pd.DataFrame:
+        """ingest + re-scoring des seules séries touchées ; retourne la prévision courante complète."""
+        t0 = time.perf_counter()
+        with span("nowcast.update"):
+            series = self.ingest(incidence, urgences)
+            if series:
+                fresh = self.score(series)
+                keep = ~pd.MultiIndex.from_frame(self.forecast[self.keys].astype(str)).isin(series)
+                self.forecast = (pd.concat([self.forecast[keep], fresh], ignore_index=True)
+                                 .sort_values([*self.keys, "date"]).reset_index(drop=True))
+        weeks = set().union(*(set(d["date"]) for d in (incidence, urgences) if d is not None))
+        self.last_update = {"weeks": len(weeks),
+                            "series": len(series), "seconds": round(time.perf_counter() - t0, 3)}
+        return self.forecast
+
+    def update_files(self, sentinelles=None, oscour=None) -> pd.DataFrame:
+        """update() depuis des fichiers d'arrivées (format sentinelles_norm / oscour_norm)."""
+        new = load_weekly_arrivals(sentinelles, oscour, granularity=self.granularity)
+        return self.update(new["incidence"], new["urgences"])
@@ -4,7 +4,6 @@ Optimisation de stock: Newsvendor & PL robuste (via pulp).
 """
 import pandas as pd
 import numpy as np
-import pulp
 
 def newsvendor(q_hat, sigma, understock_cost, overstock_cost):
     """
@@ -25,6 +24,7 @@ def lp_replenishment(regions, demand_mean, demand_p90, capacity, cost_transport=
     - demand_p90: dict region->p90 (sécurité)
     - capacity: capacité totale (doses) disponible
     """
+    import pulp
     prob = pulp.LpProblem("replenishment", pulp.LpMinimize)
     x = {r: pulp.LpVariable(f"x_{r}", lowBound=0) for r in regions}
 
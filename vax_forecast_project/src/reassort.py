@@ -0,0 +1,121 @@
+"""
+Export du plan de réassort (CSV opérationnel) à partir des prévisions 'par 100k' région × âge.
+Partagé par train_pipeline (étapes calibrate / reassort) et make_csv.py.
+- calibration : ratio historique N-1 / prévision, médiane par tranche d'âge (fallback médiane globale, sinon 1)
+- mean_hist : moyenne des 12 derniers mois d'historique de la série strictement avant la date prévue ;
+  moyenne glissante calculée une fois par série (rolling) puis rattachée par merge_asof,
+  au lieu d'un filtre + tri de l'historique par ligne prévue.
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from . import artifacts
+
+KEYS = ["region", "age_band"]
+PLAN_COLS = ["date", "region", "age_band", "doses_per_100k_forecast", "mean_hist", "qty", "forecast_vs_hist_%"]
+
+
+def region_history(features_path: Path) -> pd.DataFrame:
+    """
+    Historique [date, region, age_band, doses_per_100k] de features.parquet.
+    Maille département : agrégé à la région (doses / population des départements).
+    """
+    f = artifacts.frame(features_path)
+    if "dep" not in f.columns:
+        return f[["date","region","age_band","doses_per_100k"]].copy()
+    f = f.assign(_doses=f["doses_per_100k"] * f["population"] / 100_000.0)
+    g = f.groupby(["date","region","age_band"], as_index=False, observed=True)[["_doses","population"]].sum()
+    g["doses_per_100k"] = g["_doses"] / (g["population"] / 100_000.0)
+    return g[["date","region","age_band","doses_per_100k"]]
+
+
+def prepare_history(hist: pd.DataFrame, window: int = 12) -> pd.DataFrame:
+    """
+    Historique trié (série, date) + colonne mean_12m = moyenne des `window` derniers points
+    de la série jusqu'à la date incluse (NaN ignorés, comme Series.mean).
+    """
+    h = hist[["date", *KEYS, "doses_per_100k"]].copy()
+    h["date"] = pd.to_datetime(h["date"]).astype("datetime64[ns]")
+    h[KEYS] = h[KEYS].astype(str)
+    h = h.sort_values([*KEYS, "date"], kind="stable").reset_index(drop=True)
+    roll = h.groupby(KEYS, sort=False)["doses_per_100k"].rolling(window, min_periods=1).mean()
+    h["mean_12m"] = roll.to_numpy()  # groupes contigus dans l'ordre de h : même ordre de lignes
+    return h
+
+
+def forecast_column(fc: pd.DataFrame, candidates) -> str:
+    """Première colonne de prévision présente parmi `candidates`."""
+    col = next((c for c in candidates if c in fc.columns), None)
+    if col is None:
+        raise ValueError(f"Aucune colonne de prévision trouvée ({' / '.join(candidates)}).")
+    return col
+
+
+def calibrate(fc: pd.DataFrame, hist: pd.DataFrame) -> pd.DataFrame:
+    """
+    Recalibre l'échelle des prévisions en 'par 100k' en s'alignant sur le même mois de l'année précédente.
+    hist : sortie de prepare_history. Ajoute doses_per_100k_forecast (colonne prédite x échelle de l'âge).
+    """
+    fc = fc.copy()
+    pred_col = "yhat_reconciled" if "yhat_reconciled" in fc.columns else forecast_column(fc, ("yhat",))
+    fc["doses_per_100k_forecast"] = fc[pred_col].astype(float)
+    fc["date"] = pd.to_datetime(fc["date"])
+
+    # Même mois calendaire N-1 pour chaque date prévue
+    n1 = pd.DataFrame({"date": (fc["date"] - pd.DateOffset(years=1)).dt.to_period("M").dt.to_timestamp()
+                       .astype("datetime64[ns]")})
+    n1[KEYS] = fc[KEYS].astype(str).to_numpy()
+    hist_n1 = n1.merge(hist[["date", *KEYS, "doses_per_100k"]], on=["date", *KEYS], how="left")
+
+    # Ratio = hist / forecast (uniquement là où c'est dispo et >0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = hist_n1["doses_per_100k"].to_numpy() / fc["doses_per_100k_forecast"].to_numpy()
+    valid = np.isfinite(ratio) & (ratio > 0)
+    age_medians = pd.Series(ratio[valid]).groupby(fc["age_band"].to_numpy()[valid]).median()
+    global_median = np.median(ratio[valid]) if valid.any() else 1.0
+    fallback = global_median if np.isfinite(global_median) and global_median > 0 else 1.0
+    # bornes de sécurité pour éviter des explosions (laisser large, cas réel ~x7)
+    scale = fc["age_band"].map(age_medians).fillna(fallback).clip(lower=0.2, upper=10.0)
+    fc["doses_per_100k_forecast"] = fc["doses_per_100k_forecast"] * scale
+    return fc
+
+
+def next_month() -> pd.Timestamp:
+    """Premier jour du mois suivant (Europe/Paris), naïf."""
+    return (pd.Timestamp.now(tz="Europe/Paris").to_period("M").to_timestamp()
+            + pd.offsets.MonthBegin(1)).tz_localize(None)
+
+
+def reassort_plan(fc: pd.DataFrame, hist: pd.DataFrame, start: pd.Timestamp | None = None) -> pd.DataFrame:
+    """
+    Plan : date, region, age_band, doses_per_100k_forecast, mean_hist, qty, forecast_vs_hist_%
+    - fc : prévisions avec doses_per_100k_forecast ; hist : sortie de prepare_history
+    - mean_hist : mean_12m du dernier point d'historique strictement antérieur à la date prévue
+    - qty : +10% buffer puis arrondi par tranches de 100
+    - filtre : à partir de `start` (défaut : mois suivant, Europe/Paris)
+    """
+    out = fc[["date", *KEYS, "doses_per_100k_forecast"]].copy()
+    out["date"] = pd.to_datetime(out["date"]).astype("datetime64[ns]")
+    out = out[out["date"] >= (next_month() if start is None else start)]
+    out[KEYS] = out[KEYS].astype(str)
+    out = pd.merge_asof(out.sort_values("date", kind="stable"),
+                        hist[["date", *KEYS, "mean_12m"]].sort_values("date", kind="stable"),
+                        on="date", by=KEYS, direction="backward", allow_exact_matches=False)
+    out = out.rename(columns={"mean_12m": "mean_hist"})
+
+    out["qty"] = (np.ceil((out["doses_per_100k_forecast"] * 1.10) / 100) * 100).astype(int)
+    # Ratio (%) – évite les divisions par 0 / NaN
+    mh = out["mean_hist"].to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out["forecast_vs_hist_%"] = np.where(np.isfinite(mh) & (mh > 0),
+                                             100.0 * out["doses_per_100k_forecast"].to_numpy() / mh, np.nan)
+    return out[PLAN_COLS].sort_values(["date", *KEYS]).reset_index(drop=True)
+
+
+def write_plan(plan: pd.DataFrame, csv_out: Path) -> Path:
+    csv_out = Path(csv_out)
+    artifacts.publish(csv_out, plan)
+    print(f"OK -> {csv_out} | lignes: {len(plan)}")
+    return csv_out
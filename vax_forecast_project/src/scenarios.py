@@ -0,0 +1,200 @@
+"""
+Prévisions « what-if » sur des trajectoires exogènes alternatives (incidence Sentinelles, température).
+La table de features ne porte qu'un futur : la climatologie région × mois (tendance bornée à [0.7, 1.3]
+à l'ingestion). Ici, N scénarios (épidémie précoce / tardive / sévère / douce...) réécrivent les mois
+futurs de ces exogènes :
+- incidence : décalage du profil saisonnier (shift mois, >0 = pic plus tôt) × facteur (constant ou par mois)
+- température : + delta °C
+Seules les features qui en dépendent (*_lag* / *_ma* d'incidence et de température aux lignes de
+l'horizon) sont recalculées, pour tous les scénarios à la fois sur un tableau empilé
+[scénario, série, 12 mois d'historique + horizon] ; le reste de la ligne est celui de la table.
+Les modèles du membre LGBM (NowcastState) scorent tous les scénarios en un predict par modèle
+(un seul en stratégie globale). Sortie : cube scénario × série × horizon (ScenarioCube).
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from . import climatology
+from .config import PROCESSED_DIR
+from .feature_engineering import LAGS, WINDOWS
+from .tracing import span, traced
+
+SCENARIOS_PATH = PROCESSED_DIR / "forecast_scenarios.parquet"
+EXOG = ("incidence_per_100k", "tmean")
+SPAN = max(*LAGS, *WINDOWS)  # mois d'historique lus par les features d'une ligne
+
+
+@dataclass
+class Scenario:
+    name: str
+    incidence_scale: float | tuple = 1.0  # facteur sur l'incidence future (un par mois d'horizon possible)
+    shift_months: int = 0                 # >0 : saison en avance de n mois ; <0 : en retard
+    tmean_delta: float = 0.0              # °C ajoutés à la température future
+
+
+PRESETS = {
+    "central": Scenario("central"),
+    "early": Scenario("early", shift_months=1),
+    "late": Scenario("late", shift_months=-1),
+    "severe": Scenario("severe", incidence_scale=1.5, tmean_delta=-1.0),
+    "mild": Scenario("mild", incidence_scale=0.7, tmean_delta=1.0),
+}
+
+
+def parse_scenario(text: str) -> Scenario:
+    """'nom' (preset) ou 'nom:scale=1.3,shift=1,tmean=-0.5' (scale peut lister un facteur par mois : 1.2/1.5/1.3)."""
+    name, _, spec = text.partition(":")
+    if not spec:
+        if name not in PRESETS:
+            raise ValueError(f"Scénario inconnu: {name!r} (presets: {', '.join(PRESETS)})")
+        return PRESETS[name]
+    kw = {}
+    for item in spec.split(","):
+        key, _, value = item.partition("=")
+        if key == "scale":
+            scales = tuple(float(v) for v in value.split("/"))
+            kw["incidence_scale"] = scales[0] if len(scales) == 1 else scales
+        elif key == "shift":
+            kw["shift_months"] = int(value)
+        elif key == "tmean":
+            kw["tmean_delta"] = float(value)
+        else:
+            raise ValueError(f"Paramètre de scénario inconnu: {key!r} (scale, shift, tmean)")
+    return Scenario(name, **kw)
+
+
+@dataclass
+class ScenarioCube:
+    scenarios: list                 # noms, axe 0
+    series: pd.DataFrame            # clés des séries, axe 1
+    dates: pd.DatetimeIndex         # mois de l'horizon, axe 2
+    yhat: np.ndarray                # membre LGBM [S, N, H]
+    yhat_ens: np.ndarray            # ensemble LGBM + baseline (mêmes poids que la pipeline)
+    population: np.ndarray = field(default=None)  # [N] : doses = yhat × population / 100k
+
+    def to_frame(self) -> pd.DataFrame:
+        """Format long [scenario, date, *clés, yhat, yhat_ens]."""
+        S, N, H = self.yhat.shape
+        out = self.series.iloc[np.tile(np.repeat(np.arange(N), H), S)].reset_index(drop=True)
+        out.insert(0, "date", np.tile(self.dates.to_numpy(), S * N))
+        out.insert(0, "scenario", np.repeat(self.scenarios, N * H))
+        out["yhat"] = self.yhat.reshape(-1)
+        out["yhat_ens"] = self.yhat_ens.reshape(-1)
+        return out
+
+    def doses(self) -> pd.DataFrame:
+        """Doses totales (toutes séries) par scénario × mois : tableau de lecture rapide pour les planificateurs."""
+        tot = np.einsum("snh,n->sh", np.nan_to_num(self.yhat_ens), self.population / 100_000.0)
+        return pd.DataFrame(tot, index=pd.Index(self.scenarios, name="scenario"),
+                            columns=self.dates.strftime("%Y-%m"))
+
+
+def _windows(state, rows_by_series, horizon: int) -> dict:
+    """{colonne exogène: tableau [N, SPAN + H]} (SPAN derniers mois d'historique + horizon) par série."""
+    pos = np.stack([r[len(r) - SPAN - horizon:] for r in rows_by_series])
+    return {c: state.frame[c].to_numpy(dtype=float)[pos] for c in EXOG}
+
+
+def _trajectories(state, scenarios, base: dict, regions: np.ndarray, dates: pd.DatetimeIndex) -> dict:
+    """Exogènes par scénario [S, N, SPAN + H] : historique commun, mois futurs réécrits."""
+    S, (N, T), H = len(scenarios), base["incidence_per_100k"].shape, len(dates)
+    hist = state.frame.loc[state.frame["y"].notna(), ["region", "date", "incidence_per_100k"]]
+    clim = climatology.profile(hist.drop_duplicates(["region", "date"]), "incidence_per_100k", "month")
+    clim = clim.set_index(["region", "period"])["clim"]
+    months = dates.month.to_numpy()
+
+    def seasonal(shift):
+        # rapport profil(mois + shift) / profil(mois) par série et mois d'horizon (1 sans climatologie)
+        target = (months - 1 + shift) % 12 + 1
+        num = clim.reindex(pd.MultiIndex.from_arrays([np.repeat(regions, H), np.tile(target, N)])).to_numpy()
+        den = clim.reindex(pd.MultiIndex.from_arrays([np.repeat(regions, H), np.tile(months, N)])).to_numpy()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            r = np.where(den > 0, num / den, 1.0)
+        return np.nan_to_num(r, nan=1.0).reshape(N, H)
+
+    out = {c: np.repeat(base[c][None], S, axis=0) for c in EXOG}
+    for i, sc in enumerate(scenarios):
+        scale = np.broadcast_to(np.asarray(sc.incidence_scale, dtype=float), (H,))
+        factor = scale[None, :] * (seasonal(sc.shift_months) if sc.shift_months else 1.0)
+        out["incidence_per_100k"][i, :, T - H:] *= factor
+        out["tmean"][i, :, T - H:] += sc.tmean_delta
+    return out
+
+
+def _lag_ma(traj: np.ndarray, horizon: int) -> dict:
+    """*_lag* / *_ma* des lignes de l'horizon depuis [S, N, SPAN + H] -> {suffixe: [S, N, H]}."""
+    T = traj.shape[-1]
+    idx = np.arange(T - horizon, T)
+    out = {f"lag{L}": traj[..., idx - L] for L in LAGS}
+    csum = np.concatenate([np.zeros(traj.shape[:-1] + (1,)), np.cumsum(traj, axis=-1)], axis=-1)
+    for W in WINDOWS:
+        out[f"ma{W}"] = (csum[..., idx + 1] - csum[..., idx + 1 - W]) / W
+    return out
+
+
+@traced("scenarios.cube")
+def scenario_cube(state, scenarios=tuple(PRESETS.values())) -> ScenarioCube:
+    """
+    Cube de prévisions pour `scenarios` (Scenario ou noms de presets) à partir d'un NowcastState
+    (table de features à jour des dernières semaines reçues, modèles du dernier run mensuel).
+    """
+    scenarios = [PRESETS[s] if isinstance(s, str) else s for s in scenarios]
+    keys = state.keys
+    future = state.frame["y"].isna().to_numpy()
+    wanted = {tuple(map(str, k)) for k in state.bundle["series"]}
+    series = [k for k in state.series_rows if k in wanted]
+    rows = [state.series_rows[k] for k in series]
+    fut_rows = [r[future[r]] for r in rows]
+    H = len(fut_rows[0]) if fut_rows else 0
+    if not H or any(len(r) != H or r[-1] != full[-1] for r, full in zip(fut_rows, rows)):
+        raise ValueError("Horizon futur absent ou non aligné entre séries (lignes y NaN en fin de série)")
+    if min(len(r) for r in rows) < SPAN + H:
+        raise ValueError(f"Historique trop court pour les features (>= {SPAN} mois requis)")
+    for sc in scenarios:
+        if np.ndim(sc.incidence_scale) and len(sc.incidence_scale) != H:
+            raise ValueError(f"Scénario {sc.name!r} : scale liste {len(sc.incidence_scale)} facteurs, "
+                             f"{H} attendus (un par mois d'horizon) ou un seul")
+
+    S, N = len(scenarios), len(series)
+    dates = pd.DatetimeIndex(state.frame["date"].to_numpy()[fut_rows[0]])
+    regions = state.frame["region"].to_numpy()[[r[0] for r in rows]].astype(str)
+    with span("scenarios.features") as sp:
+        base = _windows(state, rows, H)
+        traj = _trajectories(state, scenarios, base, regions, dates)
+        pos = np.concatenate(fut_rows)
+        model_cols = sorted({c for m in state.bundle["models"].values() for c in m.feature_name_})
+        X0 = state.design(pos, model_cols)
+        X = pd.concat([X0] * S, ignore_index=True)  # lignes (scénario, série, mois)
+        for c in EXOG:
+            for suffix, values in _lag_ma(traj[c], H).items():
+                col = f"{c}_{suffix}"
+                if col in X.columns:
+                    # NaN (historique incomplet) : valeur de la table, comme le remplissage du build
+                    X[col] = np.where(np.isnan(values), X0[col].to_numpy().reshape(1, N, H), values).reshape(-1)
+        sp.rows(X)
+
+    yhat = np.full(S * N * H, np.nan)
+    models = state.bundle["models"]
+    with span("scenarios.predict", rows=len(X)):
+        if state.bundle["strategy"] == "global":
+            model = models["global"]
+            yhat[:] = model.predict(X[model.feature_name_])
+        else:
+            by_key = {tuple(map(str, k)): m for k, m in models.items()}
+            block = np.arange(S)[:, None] * N * H + np.arange(H)[None, :]   # lignes d'une série, tous scénarios
+            for n, k in enumerate(series):
+                idx = (block + n * H).reshape(-1)
+                model = by_key[k]
+                yhat[idx] = model.predict(X.iloc[idx][model.feature_name_])
+    yhat = yhat.reshape(S, N, H)
+
+    keys_df = state.frame.loc[[r[0] for r in rows], keys].reset_index(drop=True)
+    yhat_ens = yhat.copy()
+    if state.baseline is not None and not state.baseline.empty:
+        grid = keys_df.iloc[np.repeat(np.arange(N), H)].assign(date=np.tile(dates.to_numpy(), N))
+        b = grid.merge(state.baseline, on=["date", *keys], how="left")["yhat_baseline"].to_numpy().reshape(N, H)
+        yhat_ens = np.where(np.isnan(b)[None], yhat, state.w_lgbm * yhat + state.w_base * b[None])
+    pop = state.frame["population"].to_numpy(dtype=float)[[r[0] for r in rows]]
+    return ScenarioCube([s.name for s in scenarios], keys_df, dates, yhat, yhat_ens, pop)
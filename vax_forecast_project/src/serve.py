@@ -0,0 +1,251 @@
+"""
+Service HTTP local (asyncio) de requêtes sur les sorties de la pipeline.
+- Artefacts chargés en tables Arrow mappées en mémoire (parquet: memory_map ; CSV: converti une fois
+  en Arrow IPC dans data/interim/arrow_cache puis mmap, cf. artifacts.load_table), donc pas de
+  re-parsing CSV par les consommateurs.
+- Filtres: region, age_band, pharmacie, date_from, date_to (+ columns, limit).
+- Cache LRU des réponses (clé = dataset, version, requête) ; rechargement à chaud quand la
+  pipeline réécrit un fichier (surveillance mtime/taille).
+
+Endpoints:
+  GET /health                -> {"status": "ok"}
+  GET /datasets              -> datasets, lignes, version
+  GET /metrics               -> latences p50/p95/p99 (ms), taux de hit cache
+  GET /v1/<dataset>?region=IDF&age_band=65%2B&date_from=2025-11-01&date_to=2026-03-01&limit=100
+
+Lancement:  python -m src.serve --port 8765
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from .config import PROCESSED_DIR, BASE_DIR
+from .artifacts import file_version, load_table
+
+DATASETS = {
+    "forecast": PROCESSED_DIR / "forecast_reconciled_calibrated.parquet",
+    "reassort": PROCESSED_DIR / "reassort_plan_from_latest.csv",
+    "pharma_stock": Path(os.environ.get("PHARMA_STOCK_CSV",
+                                        BASE_DIR.parent / "Prev_pharmacie" / "pharma_2mois_prev.csv")),
+}
+FILTER_COLS = {"region": "region", "age_band": "age_band", "pharmacie": "pharmacie"}
+MAX_LIMIT = 50_000
+
+
+# =========================
+# Chargement Arrow (mmap)
+# =========================
+class ArtifactStore:
+    """Tables Arrow par dataset + version (change à chaque rechargement)."""
+
+    def __init__(self, datasets: dict):
+        self.paths = {k: Path(v) for k, v in datasets.items()}
+        self.tables, self.versions = {}, {}
+
+    def refresh(self) -> list:
+        """Recharge les artefacts modifiés (ou apparus). Retourne la liste des datasets rechargés."""
+        changed = []
+        for name, path in self.paths.items():
+            if not path.exists():
+                continue
+            try:
+                version = file_version(path)
+                if self.versions.get(name) == version:
+                    continue
+                self.tables[name] = load_table(path)
+                self.versions[name] = version
+                changed.append(name)
+            except (OSError, pa.ArrowInvalid) as e:
+                # fichier en cours d'écriture par la pipeline: on réessaiera au prochain tour
+                print(f"[serve] rechargement {name} reporté: {e}")
+        return changed
+
+
+# =========================
+# Requêtes
+# =========================
+def _date_scalar(table: pa.Table, value: str):
+    typ = table.schema.field("date").type
+    ts = np.datetime64(value, "ns")
+    if pa.types.is_timestamp(typ) or pa.types.is_date(typ):
+        return pa.scalar(ts, type=pa.timestamp("ns")).cast(typ)
+    return pa.scalar(str(np.datetime_as_string(ts, unit="D")))  # date stockée en texte ISO
+
+
+def query_table(table: pa.Table, params: dict) -> dict:
+    """Applique les filtres (valeurs multiples séparées par des virgules) et sérialise en records."""
+    mask = None
+    for key, col in FILTER_COLS.items():
+        if key in params and col in table.column_names:
+            values = pa.array(params[key].split(","), type=pa.string())
+            m = pc.is_in(pc.cast(table[col], pa.string()), value_set=values)
+            mask = m if mask is None else pc.and_(mask, m)
+    if "date" in table.column_names:
+        for key, op in (("date_from", pc.greater_equal), ("date_to", pc.less_equal)):
+            if key in params:
+                m = op(table["date"], _date_scalar(table, params[key]))
+                mask = m if mask is None else pc.and_(mask, m)
+    out = table.filter(mask) if mask is not None else table
+    if "columns" in params:
+        out = out.select([c for c in params["columns"].split(",") if c in out.column_names])
+    n = out.num_rows
+    limit = min(int(params.get("limit", MAX_LIMIT)), MAX_LIMIT)
+    out = out.slice(0, limit)
+    records = out.to_pylist()
+    for r in records:
+        for k, v in r.items():
+            if hasattr(v, "isoformat"):
+                r[k] = v.isoformat()
+    return {"rows": n, "returned": len(records), "data": records}
+
+
+class LRUCache:
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self._d = OrderedDict()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        if key in self._d:
+            self._d.move_to_end(key)
+            self.hits += 1
+            return self._d[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self._d[key] = value
+        self._d.move_to_end(key)
+        while len(self._d) > self.maxsize:
+            self._d.popitem(last=False)
+
+    def clear(self):
+        self._d.clear()
+
+
+# =========================
+# Serveur HTTP minimal (HTTP/1.1 keep-alive, GET uniquement)
+# =========================
+class QueryService:
+    def __init__(self, datasets=None, cache_size=512, reload_every=2.0):
+        self.store = ArtifactStore(datasets or DATASETS)
+        self.cache = LRUCache(cache_size)
+        self.reload_every = reload_every
+        self.latencies_ms = deque(maxlen=10_000)
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.reload_every)
+            changed = await asyncio.to_thread(self.store.refresh)
+            if changed:
+                self.cache.clear()
+                print(f"[serve] rechargé: {', '.join(changed)}")
+
+    def _metrics(self):
+        lat = np.asarray(self.latencies_ms) if self.latencies_ms else np.zeros(1)
+        total = self.cache.hits + self.cache.misses
+        return {"requests": len(self.latencies_ms),
+                "p50_ms": float(np.percentile(lat, 50)), "p95_ms": float(np.percentile(lat, 95)),
+                "p99_ms": float(np.percentile(lat, 99)),
+                "cache_hit_rate": (self.cache.hits / total) if total else 0.0}
+
+    async def handle_path(self, target: str):
+        url = urlsplit(target)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        parts = [p for p in url.path.split("/") if p]
+        if parts == ["health"]:
+            return 200, json.dumps({"status": "ok"}).encode()
+        if parts == ["datasets"]:
+            return 200, json.dumps({k: {"rows": t.num_rows, "columns": t.column_names,
+                                        "version": self.store.versions[k][0]}
+                                    for k, t in self.store.tables.items()}).encode()
+        if parts == ["metrics"]:
+            return 200, json.dumps(self._metrics()).encode()
+        if len(parts) == 2 and parts[0] == "v1":
+            name = parts[1]
+            table = self.store.tables.get(name)
+            if table is None:
+                return 404, json.dumps({"error": f"dataset inconnu ou absent: {name}"}).encode()
+            key = (name, self.store.versions[name], tuple(sorted(params.items())))
+            body = self.cache.get(key)
+            if body is None:
+                try:
+                    res = await asyncio.to_thread(query_table, table, params)
+                except (ValueError, pa.ArrowException) as e:
+                    return 400, json.dumps({"error": str(e)}).encode()
+                body = json.dumps(res, default=str).encode()
+                self.cache.put(key, body)
+            return 200, body
+        return 404, json.dumps({"error": "not found"}).encode()
+
+    async def handle_conn(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                t0 = time.perf_counter()
+                method, target, _ = line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    k, _, v = h.decode("latin-1").partition(":")
+                    headers[k.strip().lower()] = v.strip()
+                if method != "GET":
+                    status, body = 405, b'{"error": "GET uniquement"}'
+                else:
+                    status, body = await self.handle_path(target)
+                keep = headers.get("connection", "").lower() != "close"
+                reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}[status]
+                writer.write(
+                    f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(body)}\r\nAccess-Control-Allow-Origin: *\r\n"
+                    f"Connection: {'keep-alive' if keep else 'close'}\r\n\r\n".encode() + body)
+                await writer.drain()
+                self.latencies_ms.append((time.perf_counter() - t0) * 1000.0)
+                if not keep:
+                    break
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        print(f"[serve] chargés: {self.store.refresh()}")
+        server = await asyncio.start_server(self.handle_conn, host, port)
+        watcher = asyncio.create_task(self._watch())
+        print(f"[serve] http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            watcher.cancel()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Service de requêtes prévisions / stocks")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--cache-size", type=int, default=512)
+    ap.add_argument("--reload-every", type=float, default=2.0)
+    args = ap.parse_args(argv)
+    svc = QueryService(cache_size=args.cache_size, reload_every=args.reload_every)
+    try:
+        asyncio.run(svc.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Générateur vectorisé de jeux synthétiques (quickstart, benchmarks de passage à l'échelle).
+Paramètres : régions (et départements), tranches d'âge, pharmacies, années d'historique.
+Toutes les tables sont construites par broadcasting numpy (aucune boucle par ligne) et écrites
+en parquet avec un data_sources.yaml à côté (VAXFC_DATA_SOURCES=<dossier>/data_sources.yaml).
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from .config import REGIONS, AGE_BANDS, FREQ
+from .geography import DEFAULT as GEO, REGIONS as INSEE_REGIONS
+
+AGE_POP_SHARE = {"0-17": 0.2, "18-64": 0.6, "65+": 0.2}
+AGE_VAX_MULT = {"0-17": 0.5, "18-64": 1.0, "65+": 1.8}
+AGE_ER_MU = {"0-17": 5, "18-64": 8, "65+": 15}
+
+# table -> entrée de data_sources.yaml
+CFG_KEYS = {
+    "insee_population": "insee_population",
+    "sentinelles": "sentinelles_incidence",
+    "meteo": "meteo_temperature",
+    "oscour": "oscour_urgences",
+    "vaccination": "vaccination_doses",
+    "pharmacy_dispensing": "pharmacy_dispensing",
+    "region_mapping": "region_mapping",
+}
+
+
+def _by_age(age_bands, table, default):
+    return np.array([table.get(a, default) for a in age_bands], dtype=float)
+
+
+def _panel(index: pd.DataFrame, dates, values: np.ndarray, col: str) -> pd.DataFrame:
+    """index (n lignes) × dates (T) + values (n, T) -> DataFrame long [date, *index, col]."""
+    n, T = values.shape
+    out = index.iloc[np.repeat(np.arange(n), T)].reset_index(drop=True)
+    out.insert(0, "date", np.tile(np.asarray(dates), n))
+    out[col] = values.ravel()
+    return out
+
+
+def synthetic_tables(n_regions: int = len(REGIONS), departements: bool = False,
+                     age_bands=AGE_BANDS, n_pharmacies: int = 0, years: float = 2.5,
+                     start: str | None = None, seed: int = 42) -> dict:
+    """
+    {nom: DataFrame} aux schémas attendus par data_ingestion :
+      insee_population [region, (dep,) age_band, population]
+      sentinelles [date, region, incidence_per_100k] (hebdo)   meteo [date, region, tmean] (hebdo)
+      oscour [date, region, (dep,) age_band, er_visits, admissions]
+      vaccination [date, region, (dep,) age_band, doses] (dépend de l'incidence lissée)
+      region_mapping [insee, region, region_name]
+      pharmacy_dispensing [date, pharmacie, code_commune, region, population, doses] (mensuel, si n_pharmacies)
+      pharmacies [pharmacie, region_code3, code_commune, population, stock_initial_oct] (si n_pharmacies)
+    start : première semaine (défaut : `years` années avant la semaine courante, historique à jour)
+    """
+    rng = np.random.default_rng(seed)
+    regions = list(REGIONS[:n_regions])
+    ages = list(age_bands)
+    n_weeks = max(int(round(years * 52)), 1)
+    if start is None:
+        dates = pd.date_range(end=pd.Timestamp.now().normalize(), periods=n_weeks, freq=FREQ)
+    else:
+        dates = pd.date_range(start, periods=n_weeks, freq=FREQ)
+    R, A, T = len(regions), len(ages), len(dates)
+    t = np.linspace(0, 1, T)
+
+    if departements:
+        units = GEO.departements(regions)[["region", "dep"]].reset_index(drop=True)
+    else:
+        units = pd.DataFrame({"region": regions})
+    reg_idx = pd.Index(regions).get_indexer(units["region"])
+    U = len(units)
+    unit_age = units.iloc[np.repeat(np.arange(U), A)].reset_index(drop=True)
+    unit_age["age_band"] = np.tile(ages, U)
+    ua_reg = np.repeat(reg_idx, A)
+
+    # Population : unité × âge
+    base = (1_000_000 + 300_000 * rng.random(U)) / (np.bincount(reg_idx, minlength=R)[reg_idx])
+    share = _by_age(ages, AGE_POP_SHARE, 1.0 / A)
+    pop = unit_age.assign(population=(base[:, None] * share[None, :]).ravel().astype(np.int64))
+
+    # Exogènes régionaux (hebdo) : saisonnalité + bruit
+    inc = np.clip(np.sin(2 * np.pi * t * years)[None, :] * 50 + 80 + rng.standard_normal((R, T)) * 10, 0, None)
+    tmean = 12 + 8 * np.sin(2 * np.pi * t * years / 2.5)[None, :] + rng.standard_normal((R, T)) * 2
+    reg_df = pd.DataFrame({"region": regions})
+
+    # Urgences : unité × âge × semaine
+    mu = np.tile(_by_age(ages, AGE_ER_MU, 8.0), U)
+    er = np.maximum(0, mu[:, None] + rng.standard_normal((U * A, T)) * 2).astype(np.int64)
+    urg = _panel(unit_age, dates, er, "er_visits")
+    urg["admissions"] = (urg["er_visits"] * 0.2).astype(np.int64)
+
+    # Vaccination : suit l'incidence lissée (MA2) de la région
+    inc_ma = np.concatenate([inc[:, :1], (inc[:, 1:] + inc[:, :-1]) / 2], axis=1)
+    mult = np.tile(_by_age(ages, AGE_VAX_MULT, 1.0), U)[:, None]
+    doses = np.maximum(0, 50 * mult + inc_ma[ua_reg] * 0.3 * mult + rng.standard_normal((U * A, T)) * 5)
+
+    insee_of = {code: insee for insee, (code, _) in INSEE_REGIONS.items()}
+    tables = {
+        "insee_population": pop,
+        "sentinelles": _panel(reg_df, dates, inc, "incidence_per_100k"),
+        "meteo": _panel(reg_df, dates, tmean, "tmean"),
+        "oscour": urg,
+        "vaccination": _panel(unit_age, dates, doses, "doses"),
+        "region_mapping": pd.DataFrame({"insee": [insee_of.get(r, "") for r in regions], "region": regions,
+                                        "region_name": [f"R-{r}" for r in regions]}),
+    }
+    if n_pharmacies:
+        tables.update(_pharmacies(rng, regions, n_pharmacies, dates[0], dates[-1]))
+    return tables
+
+
+def _pharmacies(rng, regions, P: int, first, last) -> dict:
+    """Pharmacies réparties sur les départements des régions + délivrances mensuelles (Poisson saisonnier)."""
+    deps = GEO.departements(regions)
+    pick = rng.integers(0, len(deps), P)
+    dep = deps["dep"].to_numpy()[pick].astype(str)
+    num = rng.integers(1, 300, P)
+    # code commune INSEE : département (2 car.) + 3 chiffres, ou DROM (3 car.) + 2 chiffres
+    commune = np.where(np.char.str_len(dep) == 2,
+                       np.char.add(dep, np.char.zfill(num.astype(str), 3)),
+                       np.char.add(dep, np.char.zfill((num % 99 + 1).astype(str), 2)))
+    ids = np.char.add("PH", np.arange(P).astype(str))
+    scale = rng.gamma(2, 20, P)
+
+    months = pd.date_range(first.to_period("M").to_timestamp(), last, freq="MS")
+    M = len(months)
+    season = 1 + 0.9 * np.cos(2 * np.pi * (months.month.to_numpy() - 11) / 12)
+    mu = scale[:, None] * season[None, :] * (1 + 0.03 * np.arange(M) / 12)[None, :]
+    Y = rng.poisson(mu)
+    opened = np.arange(M)[None, :] >= (rng.integers(0, max(M // 3, 1), P) * (rng.random(P) < 0.2))[:, None]
+    p, m = np.nonzero(opened & (Y > 0))
+    population = (scale * 150).round()
+    region = deps["region"].to_numpy()[pick]
+    disp = pd.DataFrame({"date": months[m], "pharmacie": ids[p], "code_commune": commune[p],
+                         "region": region[p], "population": population[p], "doses": Y[p, m].astype(float)})
+    pharma = pd.DataFrame({"pharmacie": ids, "region_code3": region, "code_commune": commune,
+                           "population": population,
+                           "stock_initial_oct": np.maximum(100, (scale * 3).round()).astype(np.int64)})
+    return {"pharmacy_dispensing": disp, "pharmacies": pharma}
+
+
+def write_tables(tables: dict, out_dir) -> Path:
+    """Écrit chaque table en <out_dir>/<nom>.parquet + data_sources.yaml (chemins absolus) ; retourne le yaml."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    cfg = {}
+    for name, df in tables.items():
+        path = out_dir / f"{name}.parquet"
+        df.to_parquet(path, index=False)
+        if name in CFG_KEYS:
+            cfg[CFG_KEYS[name]] = path.resolve().as_posix()
+    cfg_path = out_dir / "data_sources.yaml"
+    cfg_path.write_text(yaml.safe_dump(cfg, sort_keys=True), encoding="utf-8")
+    return cfg_path
+
+
+def generate(out_dir, **params) -> Path:
+    """synthetic_tables(**params) écrites dans out_dir ; retourne le data_sources.yaml correspondant."""
+    return write_tables(synthetic_tables(**params), out_dir)
@@ -0,0 +1,217 @@
+"""
+Traces d'exécution : spans imbriqués (chargements, features, fits, réconciliation, exports).
+Chaque span mesure temps réel, temps CPU (processus), pic de RSS et nombre de lignes traitées.
+Sorties :
+  - JSON lines (une ligne par span) dans VAXFC_TRACE_FILE (défaut reports/traces.jsonl)
+  - métriques + artefacts MLflow (log_mlflow)
+  - trace Chrome (chrome://tracing, Perfetto) si VAXFC_TRACE_CHROME=1 (reports/chrome_trace.json)
+Modes (env VAXFC_TRACE) :
+  - "on" (défaut) : toutes les traces
+  - "sample" : une trace racine sur VAXFC_TRACE_RATE (défaut 0.1) est enregistrée avec tous ses spans ;
+    les autres ne coûtent qu'un test de contextvar par span (sûr en production)
+  - "off" : aucun enregistrement
+Les pools de threads propagent le span parent via in_context(fn).
+"""
+import contextvars
+import functools
+import itertools
+import json
+import os
+import random
+import resource
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .config import REPORTS_DIR
+
+MODE = os.environ.get("VAXFC_TRACE", "on")
+RATE = float(os.environ.get("VAXFC_TRACE_RATE", 0.1))
+TRACE_FILE = Path(os.environ.get("VAXFC_TRACE_FILE", REPORTS_DIR / "traces.jsonl"))
+CHROME = os.environ.get("VAXFC_TRACE_CHROME", "0") == "1"
+CHROME_FILE = REPORTS_DIR / "chrome_trace.json"
+
+_current = contextvars.ContextVar("vaxfc_span", default=None)
+_ids = itertools.count(1)
+_lock = threading.Lock()
+_PID = os.getpid()
+
+
+class Span:
+    __slots__ = ("trace", "id", "parent", "name", "attrs", "path", "spans", "_t0", "_c0", "ts")
+
+    def __init__(self, name, parent, attrs):
+        self.id = next(_ids)
+        self.parent = parent
+        self.name = name
+        self.attrs = attrs
+        self.path = f"{parent.path}/{name}" if parent else name
+        self.trace = parent.trace if parent else f"{_PID}-{self.id}"
+        self.spans = parent.spans if parent else []  # spans terminés de la trace (partagé)
+
+    def set(self, **attrs):
+        """Attributs libres (ex: series=..., status=...)."""
+        self.attrs.update(attrs)
+        return self
+
+    def rows(self, obj):
+        """Nombre de lignes traitées : entier, DataFrame/array, ou tuple (premier élément dimensionné)."""
+        n = _n_rows(obj)
+        if n is not None:
+            self.attrs["rows"] = n
+        return obj
+
+
+class _NoSpan:
+    """Span non enregistré (mode off / trace non échantillonnée)."""
+    def set(self, **attrs):
+        return self
+
+    def rows(self, obj):
+        return obj
+
+
+_NOOP = _NoSpan()
+_UNSAMPLED = object()  # marqueur de contextvar : trace racine écartée par l'échantillonnage
+
+
+def _n_rows(obj):
+    if isinstance(obj, int):
+        return obj
+    if isinstance(obj, tuple):
+        return next((n for n in map(_n_rows, obj) if n is not None), None)
+    if isinstance(obj, pd.DataFrame) or hasattr(obj, "shape"):
+        return int(obj.shape[0]) if len(obj.shape) else None
+    return None
+
+
+def _peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0  # ko sous Linux
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """with span("fit.lgbm", strategy=...) as sp: ... ; sp.rows(df)"""
+    parent = _current.get()
+    if MODE == "off" or parent is _UNSAMPLED:
+        yield _NOOP
+        return
+    if parent is None and MODE == "sample" and random.random() >= RATE:
+        token = _current.set(_UNSAMPLED)
+        try:
+            yield _NOOP
+        finally:
+            _current.reset(token)
+        return
+
+    sp = Span(name, parent, attrs)
+    token = _current.set(sp)
+    sp.ts = time.time()
+    sp._t0, sp._c0 = time.perf_counter(), time.process_time()
+    try:
+        yield sp
+    except BaseException as e:
+        sp.attrs["error"] = type(e).__name__
+        raise
+    finally:
+        _current.reset(token)
+        rec = {"trace": sp.trace, "id": sp.id, "parent": parent.id if parent else None,
+               "name": name, "path": sp.path, "ts": sp.ts,
+               "wall_s": round(time.perf_counter() - sp._t0, 6),
+               # temps CPU du processus : inclut les autres threads actifs pendant le span
+               "cpu_s": round(time.process_time() - sp._c0, 6),
+               "peak_rss_mb": round(_peak_rss_mb(), 1),
+               "thread": threading.get_ident(), **sp.attrs}
+        with _lock:
+            sp.spans.append(rec)
+        if parent is None:
+            _flush(sp.spans)
+
+
+def traced(name: str | None = None):
+    """Décorateur : un span par appel ; lignes = taille du résultat (DataFrame ou tuple)."""
+    def deco(fn):
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(label) as sp:
+                return sp.rows(fn(*args, **kwargs))
+        return wrapper
+    return deco
+
+
+def in_context(fn):
+    """fn exécutée dans une copie du contexte courant (spans enfants du span actif depuis un thread)."""
+    ctx = contextvars.copy_context()
+    return functools.partial(ctx.run, fn)
+
+
+def current():
+    sp = _current.get()
+    return sp if isinstance(sp, Span) else _NOOP
+
+
+def _flush(spans: list):
+    TRACE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with _lock, open(TRACE_FILE, "a", encoding="utf-8") as f:
+        for rec in spans:
+            f.write(json.dumps(rec, default=str) + "\n")
+    if CHROME:
+        write_chrome_trace(spans, CHROME_FILE)
+
+
+def chrome_events(spans: list) -> dict:
+    """Format Trace Event (phases "X") lisible par chrome://tracing / Perfetto."""
+    events = []
+    for r in spans:
+        args = {k: v for k, v in r.items() if k not in ("trace", "id", "parent", "name", "path", "ts", "thread")}
+        events.append({"name": r["name"], "ph": "X", "ts": r["ts"] * 1e6, "dur": r["wall_s"] * 1e6,
+                       "pid": _PID, "tid": r["thread"], "args": args})
+    return {"traceEvents": sorted(events, key=lambda e: e["ts"]), "displayTimeUnit": "ms"}
+
+
+def write_chrome_trace(spans: list, path: Path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(chrome_events(spans)), encoding="utf-8")
+
+
+def summary(spans: list) -> pd.DataFrame:
+    """Agrégat par chemin de span : appels, temps réel/CPU cumulés, pic RSS, lignes."""
+    if not spans:
+        return pd.DataFrame(columns=["path", "calls", "wall_s", "cpu_s", "peak_rss_mb", "rows"])
+    df = pd.DataFrame(spans)
+    if "rows" not in df.columns:
+        df["rows"] = np.nan
+    g = df.groupby("path")
+    out = g.agg(calls=("id", "size"), wall_s=("wall_s", "sum"), cpu_s=("cpu_s", "sum"),
+                peak_rss_mb=("peak_rss_mb", "max"))
+    out["rows"] = g["rows"].sum(min_count=1)  # NaN si aucun span du chemin ne compte de lignes
+    return out.reset_index().sort_values("wall_s", ascending=False)
+
+
+def log_mlflow(mlflow, root):
+    """
+    Métriques trace.<wall_s|cpu_s|peak_rss_mb>.<chemin pointé> (cumul par chemin de span)
+    + artefacts trace/spans.jsonl, trace/summary.csv (+ trace/chrome_trace.json).
+    `mlflow` : module mlflow (run actif) ou RunLogger de mlflow_utils (écritures tamponnées).
+    """
+    if not isinstance(root, Span):
+        return
+    spans = list(root.spans)
+    agg = summary(spans)
+    metrics = {}
+    for r in agg.itertuples(index=False):
+        for k in ("wall_s", "cpu_s", "peak_rss_mb"):
+            # '/' créerait des sous-dossiers dans le file store MLflow (collision parent/enfant)
+            metrics[f"trace.{k}.{r.path.replace('/', '.')}"] = float(getattr(r, k))
+    mlflow.log_metrics(metrics)
+    mlflow.log_text("\n".join(json.dumps(r, default=str) for r in spans), "trace/spans.jsonl")
+    mlflow.log_text(agg.to_csv(index=False), "trace/summary.csv")
+    if CHROME:
+        mlflow.log_dict(chrome_events(spans), "trace/chrome_trace.json")
@@ -4,176 +4,264 @@ Pipeline simple: features -> GBDT -> OOF metrics -> HTS (démo top-down) -> Expo
 import os
 from pathlib import Path
 import pandas as pd
-import numpy as np
+from . import feature_engineering, data_ingestion, climatology, geography, hts
+from . import reassort as reassort_export
 from .feature_engineering import build_feature_table
+from .models import gbdt_demand, ensemble as models_ensemble
 from .models.gbdt_demand import rolling_cv_fit_predict
-from .models.ensemble import fit_predict_ensemble
-from .hts import topdown_proportions, reconcile_topdown
-from .config import PROCESSED_DIR, MODELS_DIR
-from .mlflow_utils import setup_mlflow
+from .models.ensemble import lgbm_member, combine_members, save_lgbm_models
+from .models.baselines import seasonal_naive_future
+from .models.pharmacy_demand import fit_predict_pharmacies
+from .data_ingestion import (load_pharmacy_dispensing, load_sentinelles_incidence, load_meteo_temperature,
+                             source_files, check_granularity)
+from .hts import topdown_proportions, reconcile_topdown, reconcile_bottomup
+from .config import PROCESSED_DIR, INTERIM_DIR, MODELS_DIR, GRANULARITY
+from .dag import Stage, run_dag
+from . import artifacts
+from . import tracing
+from .tracing import span, traced
+from .mlflow_utils import start_run
 
 def run_pipeline():
-    mlflow = setup_mlflow()
-    with mlflow.start_run(run_name="GBDT_demand_weekly"):
-        X = build_feature_table(save=True)
-        oof, future_fc, models, metrics = rolling_cv_fit_predict(X)
+    with start_run("GBDT_demand_weekly") as mlflow:
+        with span("pipeline.weekly") as root:
+            X = build_feature_table(save=True)
+            oof, future_fc, models, metrics = rolling_cv_fit_predict(X)
 
-        # Log des métriques globales
-        if not metrics.empty:
-            mlflow.log_metric("SMAPE_mean", metrics["SMAPE"].mean())
-            mlflow.log_metric("MAE_mean", metrics["MAE"].mean())
+            # Log des métriques globales
+            if not metrics.empty:
+                mlflow.log_metric("SMAPE_mean", metrics["SMAPE"].mean())
+                mlflow.log_metric("MAE_mean", metrics["MAE"].mean())
+                mlflow.log_table(metrics, "metrics/by_series.parquet")  # une table, pas une métrique par série
 
-        # Exemple HTS: on crée un total national yhat et on le redistribue
-        if not future_fc.empty:
-            nat = (future_fc.groupby("date", as_index=False)["yhat"].sum()
-                   .rename(columns={"yhat":"national_total"}))
-            props = topdown_proportions(future_fc.rename(columns={"yhat":"yhat"}),
-                                        on=("region","age_band"), target="yhat")
-            reconciled = reconcile_topdown(nat, props, on=("region","age_band"),
-                                           total_col="national_total", out_col="yhat_reconciled")
+            # Exemple HTS: on crée un total national yhat et on le redistribue
+            if not future_fc.empty:
+                nat = (future_fc.groupby("date", as_index=False)["yhat"].sum()
+                       .rename(columns={"yhat":"national_total"}))
+                props = topdown_proportions(future_fc.rename(columns={"yhat":"yhat"}),
+                                            on=("region","age_band"), target="yhat")
+                reconciled = reconcile_topdown(nat, props, on=("region","age_band"),
+                                               total_col="national_total", out_col="yhat_reconciled")
 
-            reconciled.to_parquet("data/processed/forecast_reconciled_calibrated.parquet", index=False)
+                reconciled.to_parquet("data/processed/forecast_reconciled_calibrated.parquet", index=False)
 
-        metrics.to_csv(PROCESSED_DIR / "metrics_by_series.csv", index=False)
+            metrics.to_csv(PROCESSED_DIR / "metrics_by_series.csv", index=False)
+        tracing.log_mlflow(mlflow, root)
         return {"metrics": metrics.head(10).to_dict(orient="records")}
 
 
-def run_pipeline_ensemble():
-    mlflow = setup_mlflow()
-    with mlflow.start_run(run_name="GBDT_demand_monthly"):
-        X = build_feature_table(save=True)
-        feature_cols = X.attrs.get("FEATURE_COLS")  # past-only lags/MA + month/year
-        # 1) Entraînement ensemble
-        metrics_ens, future_fc = fit_predict_ensemble(
-            features_df=X, feature_cols=feature_cols,
-            min_train_months=8, horizon_months=int(os.environ.get("FORECAST_HORIZON_MONTHS", 6)), w_lgbm=0.7, w_base=0.3
-        )
-        # 2) Sauvegardes
-        outm = PROCESSED_DIR / "metrics_by_series.csv"
-        metrics_ens.to_csv(outm, index=False)
+# ==== Étapes de la pipeline mensuelle (src.dag) ====
+FEATURES_PATH = PROCESSED_DIR / "features.parquet"
+MEMBER_LGBM_OOF = INTERIM_DIR / "member_lgbm_oof.arrow"
+MEMBER_LGBM_FUTURE = INTERIM_DIR / "member_lgbm_future.arrow"
+MEMBER_BASELINE = INTERIM_DIR / "member_baseline.arrow"
+MEMBER_LGBM_MODELS = MODELS_DIR / "member_lgbm.pkl"  # modèles finaux (src.nowcast)
+METRICS_PATH = PROCESSED_DIR / "metrics_by_series.csv"
+FORECAST_PATH = PROCESSED_DIR / "forecast_reconciled.parquet"
+FORECAST_DEP_PATH = PROCESSED_DIR / "forecast_departement.parquet"
+FORECAST_CAL_PATH = PROCESSED_DIR / "forecast_reconciled_calibrated.parquet"
+REASSORT_CSV_PATH = PROCESSED_DIR / "reassort_plan_from_latest.csv"
+
+
+def pipeline_stages(granularity: str = GRANULARITY, horizon_months: int | None = None,
+                    w_lgbm: float = 0.7, w_base: float = 0.3) -> list:
+    """
+    features ➜ {lgbm, baseline} (en parallèle) ➜ ensemble ➜ calibrate ➜ reassort.
+    Les étapes échangent des tables Arrow en mémoire (src.artifacts), écrites sur disque à chaque frontière
+    d'étape (parquet/CSV publiés, Arrow IPC pour les membres intermédiaires) ; une étape n'en relit le fichier
+    que s'il a changé ou vient d'un run précédent. Chacune est sautée si ses intrants (fichiers, code, paramètres)
+    n'ont pas changé, ex : `--only calibrate` après une retouche de la calibration ne recalcule ni
+    les features ni les modèles.
+    """
+    H = int(horizon_months or os.environ.get("FORECAST_HORIZON_MONTHS", 6))
+    by_dep = granularity == "departement"
+    group_cols = ("region", "dep", "age_band") if by_dep else ("region", "age_band")
+    strategy = "global" if by_dep else "per_series"
+    month = str(pd.Timestamp.now(tz="Europe/Paris").to_period("M"))  # la table dépend du mois courant
+
+    def features(results):
+        return build_feature_table(save=True, granularity=granularity)
+
+    def lgbm(results):
+        X = artifacts.frame(FEATURES_PATH)
+        keys = list(X.attrs.get("GROUP_COLS", group_cols))
+        oof, fut, models = lgbm_member(X, group_cols=keys, min_train_months=8, horizon_months=H,
+                                       strategy=strategy, return_models=True)
+        artifacts.publish(MEMBER_LGBM_OOF, oof)
+        artifacts.publish(MEMBER_LGBM_FUTURE, fut)
+        series = None
+        if strategy == "global":  # séries retenues par le modèle global = celles de sa validation
+            series = oof[keys].drop_duplicates().itertuples(index=False, name=None) if not oof.empty else []
+        save_lgbm_models(MEMBER_LGBM_MODELS, models, keys, strategy, series)
 
+    def baseline(results):
+        X = artifacts.frame(FEATURES_PATH)
+        # cible y : NaN aux mois à prévoir (doses_per_100k y vaut 0, aucune ligne future sinon)
+        base = seasonal_naive_future(X, group_cols=X.attrs.get("GROUP_COLS", group_cols),
+                                     target="y", date_col="date")
+        artifacts.publish(MEMBER_BASELINE, base)
+
+    def ensemble(results):
+        X = artifacts.frame(FEATURES_PATH)
+        keys = tuple(X.attrs.get("GROUP_COLS", group_cols))
+        metrics_ens, future_fc = combine_members(
+            X, artifacts.frame(MEMBER_LGBM_OOF), artifacts.frame(MEMBER_LGBM_FUTURE),
+            artifacts.frame(MEMBER_BASELINE), keys, w_lgbm, w_base)
+        metrics_ens.to_csv(METRICS_PATH, index=False)
         # -> forecast_reconciled.parquet (champ yhat_ens) si on a du futur
         if not future_fc.empty:
             future_fc = future_fc.rename(columns={"yhat_ens":"yhat"})
-            (PROCESSED_DIR / "forecast_reconciled.parquet").unlink(missing_ok=True)
-            future_fc.to_parquet(PROCESSED_DIR / "forecast_reconciled.parquet", index=False)
-
-        # === Recalibration d’échelle + CSV opérationnel ===
-        fc_in  = PROCESSED_DIR / "forecast_reconciled.parquet"
-        fc_out = PROCESSED_DIR / "forecast_reconciled_calibrated.parquet"
-        feats  = PROCESSED_DIR / "features.parquet"
-        csv_plan = PROCESSED_DIR / "reassort_plan_from_latest.csv"
-
-        if fc_in.exists():
-            fc_cal = _calibrate_scale_after_model(fc_in, feats, fc_out)
-            _write_reassort_csv_from_latest(fc_cal, feats, csv_plan)
+            if by_dep:
+                # départements -> régions (bottom-up pondéré population) : sorties régionales inchangées
+                artifacts.publish(FORECAST_DEP_PATH, future_fc)
+                pop = X[[*keys, "population"]].drop_duplicates(list(keys))
+                future_fc = reconcile_bottomup(future_fc, pop, on_fine=keys, on=("region","age_band"))
+            FORECAST_PATH.unlink(missing_ok=True)
+            with span("export.forecast", rows=len(future_fc)):
+                artifacts.publish(FORECAST_PATH, future_fc)
+        else:
+            # pas de prévision de l'ancien run laissée en place : calibrate / reassort n'ont plus d'entrée
+            for path in (FORECAST_PATH, FORECAST_DEP_PATH):
+                path.unlink(missing_ok=True)
+            print("[ensemble] aucune ligne future à prévoir : forecast_reconciled.parquet supprimé, "
+                  "pas de calibration ni de plan de réassort")
+        return metrics_ens
+
+    def calibrate(results):
+        if FORECAST_PATH.exists():
+            _calibrate_scale_after_model(FORECAST_PATH, FEATURES_PATH, FORECAST_CAL_PATH)
+        else:
+            FORECAST_CAL_PATH.unlink(missing_ok=True)
+
+    def reassort(results):
+        if FORECAST_CAL_PATH.exists():
+            _write_reassort_csv_from_latest(artifacts.frame(FORECAST_CAL_PATH), FEATURES_PATH, REASSORT_CSV_PATH)
+        else:
+            REASSORT_CSV_PATH.unlink(missing_ok=True)
+
+    return [
+        Stage("features", features, inputs=source_files(), outputs=[FEATURES_PATH],
+              code=[build_feature_table, feature_engineering, data_ingestion, climatology, geography],
+              params={"granularity": granularity, "horizon": H, "month": month}),
+        Stage("lgbm", lgbm, inputs=[FEATURES_PATH], outputs=[MEMBER_LGBM_OOF, MEMBER_LGBM_FUTURE, MEMBER_LGBM_MODELS],
+              code=[models_ensemble, gbdt_demand], params={"horizon": H, "strategy": strategy}),
+        Stage("baseline", baseline, inputs=[FEATURES_PATH], outputs=[MEMBER_BASELINE],
+              code=[seasonal_naive_future]),
+        Stage("ensemble", ensemble, inputs=[FEATURES_PATH, MEMBER_LGBM_OOF, MEMBER_LGBM_FUTURE, MEMBER_BASELINE],
+              outputs=[METRICS_PATH, FORECAST_PATH] + ([FORECAST_DEP_PATH] if by_dep else []),
+              code=[models_ensemble, hts], params={"w_lgbm": w_lgbm, "w_base": w_base}),
+        Stage("calibrate", calibrate, inputs=[FORECAST_PATH, FEATURES_PATH], outputs=[FORECAST_CAL_PATH],
+              code=[_calibrate_scale_after_model, reassort_export]),
+        Stage("reassort", reassort, inputs=[FORECAST_CAL_PATH, FEATURES_PATH], outputs=[REASSORT_CSV_PATH],
+              code=[_write_reassort_csv_from_latest, reassort_export], params={"month": month}),
+    ]
+
+
+def run_pipeline_ensemble(only=None, force=(), max_workers: int = 2):
+    """
+    Pipeline mensuelle en DAG (cf. pipeline_stages) : seules les étapes dont les intrants ont changé
+    sont ré-exécutées. only/force : cf. dag.run_dag.
+    """
+    with start_run("GBDT_demand_monthly") as mlflow:
+        granularity = check_granularity(None)
+        INTERIM_DIR.mkdir(parents=True, exist_ok=True)
+        with span("pipeline.monthly", granularity=granularity) as root:
+            try:
+                stages = pipeline_stages(granularity)
+                results, report = run_dag(stages, only=only, force=force, max_workers=max_workers)
+            finally:
+                artifacts.clear()  # tables partagées : durée de vie limitée au run
+        tracing.log_mlflow(mlflow, root)
+        mlflow.log_param("granularity", granularity)
+        X = results.get("features")
+        if X is not None:
+            mlflow.log_metrics({f"load_s_{k.lstrip('_')}": v for k, v in X.attrs.get("LOAD_TIMINGS", {}).items()})
+        metrics_ens = results.get("ensemble")
+        if metrics_ens is None:
+            metrics_ens = pd.read_csv(METRICS_PATH) if METRICS_PATH.exists() else pd.DataFrame()
+        if not metrics_ens.empty:
+            mlflow.log_table(metrics_ens, "metrics/by_series.parquet")
+
+        # sorties réellement écrites par ce run : étapes exécutées, fichiers présents
+        written = [p.name for st in stages if report.get(st.name, {}).get("status") == "ran"
+                   for p in st.outputs if Path(p).parent == PROCESSED_DIR and Path(p).exists()]
+        if written:
             print("OK: fichiers écrits dans data/processed/ :")
-            print("- features.parquet")
-            print("- metrics_by_series.csv")
-            print("- forecast_reconciled.parquet")
-            print("- forecast_reconciled_calibrated.parquet")
-            print("- reassort_plan_from_latest.csv")
+            for name in written:
+                print(f"- {name}")
+
+        return {"metrics": metrics_ens.to_dict(orient="records"), "stages": report}
+
 
-        return {"metrics": metrics_ens.to_dict(orient="records")}
 
+def _regional_exog_monthly() -> pd.DataFrame:
+    """[date (1er du mois), region, incidence_per_100k, tmean] : exogènes régionaux mensuels (historique)."""
+    inc = load_sentinelles_incidence()
+    met = load_meteo_temperature()
+    out = []
+    for df, col in ((inc, "incidence_per_100k"), (met, "tmean")):
+        df["date"] = pd.to_datetime(df["date"]).dt.to_period("M").dt.to_timestamp()
+        out.append(df.groupby(["date","region"], as_index=False)[col].mean())
+    return out[0].merge(out[1], on=["date","region"], how="outer")
+
+
+def run_pipeline_pharmacies():
+    """
+    Maille pharmacie (FORECAST_GRANULARITY=pharmacie) : historique de délivrances par pharmacie
+    -> un LightGBM global (pharmacie/commune/région catégorielles) -> prévisions de toutes les
+    pharmacies en un predict. Écrit forecast_pharmacies.parquet et metrics_pharmacies.csv.
+    """
+    with start_run("GBDT_pharmacies_global") as mlflow:
+        with span("pipeline.pharmacies") as root:
+            with span("load.pharmacy_dispensing") as sp:
+                hist = sp.rows(load_pharmacy_dispensing())
+            with span("load.regional_exog") as sp:
+                exog = sp.rows(_regional_exog_monthly())
+            fc, metrics, model, timings = fit_predict_pharmacies(
+                hist, exog, horizon=int(os.environ.get("FORECAST_HORIZON_MONTHS", 6)))
+            with span("export.pharmacies", rows=len(fc)):
+                fc.to_parquet(PROCESSED_DIR / "forecast_pharmacies.parquet", index=False)
+                metrics.to_csv(PROCESSED_DIR / "metrics_pharmacies.csv", index=False)
+        tracing.log_mlflow(mlflow, root)
+        mlflow.log_param("granularity", "pharmacie")
+        mlflow.log_metrics({k: float(v) for k, v in timings.items()})
+        if not metrics.empty:
+            tot = metrics[metrics["region"] == "ALL"].iloc[0]
+            mlflow.log_metric("SMAPE_mean", tot["SMAPE"])
+            mlflow.log_metric("MAE_mean", tot["MAE"])
+            mlflow.log_table(metrics, "metrics/by_region.parquet")
+        print("OK: fichiers écrits dans data/processed/ :")
+        print("- forecast_pharmacies.parquet")
+        print("- metrics_pharmacies.csv")
+        return {"timings": timings, "metrics": metrics.to_dict(orient="records")}
 
 
+@traced("export.calibrate")
 def _calibrate_scale_after_model(parquet_in: Path, features_path: Path, parquet_out: Path) -> pd.DataFrame:
     """
-    Recalibre l'échelle des prévisions en 'par 100k' en s'alignant sur le même mois de l'année précédente.
-    - Calibrage robuste par tranche d'âge (médiane des ratios régionaux).
-    - Si pas dispo, fallback sur médiane globale, sinon 1.0.
+    Recalibre l'échelle des prévisions 'par 100k' sur le même mois N-1 (cf. src/reassort.py).
     Écrit un parquet *_calibrated.parquet et retourne le DataFrame calibré.
     """
-    fc = pd.read_parquet(parquet_in).copy()
-    # Détecte la colonne de prévision
-    pred_col = "yhat"
-    if "yhat_reconciled" in fc.columns:
-        pred_col = "yhat_reconciled"
-    if pred_col not in fc.columns:
-        raise ValueError("Aucune colonne de prévision trouvée (yhat / yhat_reconciled).")
-    fc["doses_per_100k_forecast"] = fc[pred_col].astype(float)
-
-    # Historique (réel/proxy appris)
-    feat = pd.read_parquet(features_path)[["date","region","age_band","doses_per_100k"]].copy()
-    feat["date"] = pd.to_datetime(feat["date"])
-    fc["date"] = pd.to_datetime(fc["date"])
-
-    # Associer à chaque date prédites le même mois N-1 (mois calendaire)
-    fc["_hist_date"] = (fc["date"] - pd.DateOffset(years=1)).dt.to_period("M").dt.to_timestamp()
-
-    cal = fc.merge(
-        feat.rename(columns={"date":"_hist_date"}),
-        on=["_hist_date","region","age_band"],
-        how="left",
-        suffixes=("", "_hist")
-    )
-
-    # Ratio = hist / forecast (uniquement là où c’est dispo et >0)
-    cal["ratio"] = cal["doses_per_100k"] / cal["doses_per_100k_forecast"]
-    # Garde les ratios valides
-    cal_valid = cal[np.isfinite(cal["ratio"]) & (cal["ratio"] > 0)].copy()
-
-    # Médiane par tranche d'âge (robuste), puis fallback globale
-    age_medians = cal_valid.groupby("age_band")["ratio"].median()
-    global_median = cal_valid["ratio"].median() if not cal_valid.empty else 1.0
-    # map et fallback
-    fc["scale_age"] = fc["age_band"].map(age_medians).fillna(global_median if np.isfinite(global_median) and global_median>0 else 1.0)
-    # bornes de sécurité pour éviter des explosions (laisser large, cas réel ~x7 chez toi)
-    fc["scale_age"] = fc["scale_age"].clip(lower=0.2, upper=10.0)
-
-    # Appliquer
-    fc["doses_per_100k_forecast"] = fc["doses_per_100k_forecast"] * fc["scale_age"]
-    # Nettoyage colonnes techniques
-    fc.drop(columns=[c for c in ["_hist_date","scale_age"] if c in fc.columns], inplace=True)
-
-    parquet_out = Path(parquet_out)
-    parquet_out.parent.mkdir(parents=True, exist_ok=True)
-    fc.to_parquet(parquet_out, index=False)
+    hist = reassort_export.prepare_history(reassort_export.region_history(features_path))
+    fc = reassort_export.calibrate(artifacts.frame(parquet_in), hist)
+    artifacts.publish(parquet_out, fc)
     return fc
 
 
+@traced("export.reassort")
 def _write_reassort_csv_from_latest(fc_calibrated: pd.DataFrame, features_path: Path, csv_out: Path):
     """
-    Produit le CSV opérationnel : date, region, age_band, doses_per_100k_forecast, qty, mean_hist, forecast_vs_hist_%
-    - mean_hist: moyenne des 12 derniers mois strictement avant la date prédit (par série).
-    - qty: +10% buffer puis arrondi par tranches de 100.
-    - filtre: à partir du MOIS SUIVANT (Europe/Paris).
+    Produit le CSV opérationnel : date, region, age_band, doses_per_100k_forecast, mean_hist, qty, forecast_vs_hist_%
+    à partir du mois suivant (cf. src/reassort.py).
     """
-    f = pd.read_parquet(features_path)[["date","region","age_band","doses_per_100k"]].copy()
-    f["date"] = pd.to_datetime(f["date"])
-
-    def trailing_mean_12m(hist_df: pd.DataFrame, when: pd.Timestamp) -> float:
-        hist = hist_df[hist_df["date"] < when].sort_values("date").tail(12)
-        return float(hist["doses_per_100k"].mean()) if len(hist) else np.nan
-
-    out_rows = []
-    for (r,a), g in fc_calibrated.groupby(["region","age_band"], sort=False):
-        hist = f[(f["region"]==r) & (f["age_band"]==a)]
-        gg = g.copy()
-        gg["mean_hist"] = gg["date"].apply(lambda d: trailing_mean_12m(hist, d))
-        out_rows.append(gg[["date","region","age_band","doses_per_100k_forecast","mean_hist"]])
-
-    out = pd.concat(out_rows, ignore_index=True)
-    # qty = +10% puis arrondi par 100
-    out["qty"] = (np.ceil((out["doses_per_100k_forecast"]*1.10)/100)*100).astype(int)
-    out["forecast_vs_hist_%"] = 100.0 * out["doses_per_100k_forecast"] / out["mean_hist"]
-
-    # Filtrer à partir du mois prochain (Europe/Paris)
-    next_month = (pd.Timestamp.now(tz="Europe/Paris").to_period("M").to_timestamp() + pd.offsets.MonthBegin(1)).tz_localize(None)
-    out = out[out["date"] >= next_month].sort_values(["date","region","age_band"]).reset_index(drop=True)
-
-    csv_out = Path(csv_out)
-    csv_out.parent.mkdir(parents=True, exist_ok=True)
-    out.to_csv(csv_out, index=False)
-    print(f"OK -> {csv_out} | lignes: {len(out)}")
+    hist = reassort_export.prepare_history(reassort_export.region_history(features_path))
+    out = reassort_export.reassort_plan(fc_calibrated, hist)
+    reassort_export.write_plan(out, csv_out)
+    tracing.current().rows(out)
 
 
 if __name__ == "__main__":
-    # Exécution directe du pipeline : features -> GBDT -> HTS -> métriques
-    res = run_pipeline_ensemble()
-    print(res)
-    print("OK: fichiers écrits dans data/processed/ :")
-    print("- features.parquet")
-    print("- metrics_by_series.csv")
-    print("- forecast_reconciled.parquet (si future_fc non vide)")
+    # équivalent à `python -m src train ...` (cf. src/cli.py)
+    from .cli import main
+    import sys
+    main(["train", *sys.argv[1:]])